@@ -1,11 +1,48 @@
+import hashlib
+import hmac
 import os
-from typing import List, Any, Tuple
-
+import queue
+import threading
+import weakref
+from collections import OrderedDict
+from typing import List, Any, Dict, Tuple, Callable, Optional, Union
+
+import cipher_base
+import galois
+import xor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_VECTORIZED_THRESHOLD = 1024
+_VECTORIZED_CHUNK = 1 << 20
+_PREFETCH_CHUNK = 1 << 16
+_PREFETCH_DEPTH = 4
+_GCM_CHUNK = 1 << 16
+_GCM_MAX_LENGTH = (1 << 36) - 32
+_SECTOR_SIZE = 512
+_SECTOR_BATCH = 1 << 16
+_KEY_SCHEDULE_CACHE_SIZE = 4096
+_BITSLICE_BLOCKS = 1024
+_INPLACE_CHUNK = 1 << 16
+_BACKENDS = ('auto', 'bitsliced')
+_COUNTER_MASK = (1 << 128) - 1
+_MAC_R = (1 << 128) | 0x87
+_MAC_HALF_R = (1 << 127) | 0x43
+
+
+_Buffer = Union[bytes, bytearray, memoryview]
 _State = List[List[int]]
 _Word = List[int]
 _SBox = Tuple[int]
 
 
+class InvalidTag(Exception):
+    pass
+
+
 def _str_to_bytes(s: str) -> bytes:
     split = [s[2 * i:2 * i + 2] for i in range(len(s) // 2)]
     mapped = list(map(lambda x: int(x, 16), split))
@@ -16,19 +53,266 @@ def _print_state(state: _State):
     print('\n'.join(map(lambda x: ' '.join([hex(y) for y in x]), state)))
 
 
-class _BaseAES:
+class _KeyScheduleCache:
+    def __init__(self, maxsize: int) -> None:
+        assert maxsize >= 0
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._schedules = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._schedules)
+
+    def get(self, key: bytes) -> '_AESEncryptor':
+        digest = hashlib.sha256(key).digest()
+        with self._lock:
+            encryptor = self._schedules.get(digest)
+            if encryptor is not None:
+                self._schedules.move_to_end(digest)
+                self.hits += 1
+                return encryptor
+            self.misses += 1
+
+        encryptor = _AESEncryptor(bytes(key))
+        with self._lock:
+            if self.maxsize > 0:
+                self._schedules[digest] = encryptor
+                if len(self._schedules) > self.maxsize:
+                    self._schedules.popitem(last=False)
+        return encryptor
+
+    def clear(self) -> None:
+        with self._lock:
+            self._schedules.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+key_schedule_cache = _KeyScheduleCache(_KEY_SCHEDULE_CACHE_SIZE)
+
+
+class _AESCore(cipher_base.ParallelMixin):
     def __init__(self, **kwargs) -> None:
         if 'key_length' in kwargs:
             key_length = kwargs['key_length']
             assert key_length in (128, 192, 256)
             self._K = os.urandom(key_length // 8)
+            self._encryptor = _AESEncryptor(self._K)
         else:
             assert 'key' in kwargs
             key = kwargs['key']
             assert len(key) in (128 // 8, 192 // 8, 256 // 8)
             self._K = key
+            self._encryptor = key_schedule_cache.get(key)
+
+        self._init_backend(**kwargs)
+
+    def _init_backend(self, **kwargs) -> None:
+        self._vector_encryptor = None
+        self._bitsliced_encryptor = None
+
+        self._backend = kwargs.get('backend', 'auto')
+        assert self._backend in _BACKENDS
 
-        self._encryptor = _AESEncryptor(self._K)
+        self._init_workers(kwargs.get('workers'))
+
+    def _worker_kwargs(self) -> Dict[str, Any]:
+        return {'key': self._K, 'backend': self._backend}
+
+    def _vectorized(self, length: int):
+        if self._backend == 'bitsliced':
+            if self._bitsliced_encryptor is None:
+                self._bitsliced_encryptor = _AESBitslicedEncryptor(self._encryptor)
+            return self._bitsliced_encryptor
+        if np is None or length < _VECTORIZED_THRESHOLD:
+            return None
+        if self._vector_encryptor is None:
+            self._vector_encryptor = _AESVectorEncryptor(self._encryptor)
+        return self._vector_encryptor
+
+    def _cipher_into(self, src: memoryview, dst: memoryview) -> None:
+        assert len(src) % 16 == 0
+
+        vectorized = self._vectorized(len(src))
+        if vectorized is not None:
+            dst[:] = vectorized.cipher_blocks(src)
+            return
+
+        cipher = self._encryptor.cipher
+        for i in range(0, len(src), 16):
+            dst[i:i + 16] = cipher(src[i:i + 16])
+
+    def _inv_cipher_into(self, src: memoryview, dst: memoryview) -> None:
+        assert len(src) % 16 == 0
+
+        vectorized = self._vectorized(len(src))
+        if vectorized is not None:
+            dst[:] = vectorized.inv_cipher_blocks(src)
+            return
+
+        inv_cipher = self._encryptor.inv_cipher
+        for i in range(0, len(src), 16):
+            dst[i:i + 16] = inv_cipher(src[i:i + 16])
+
+    def _cipher_blocks(self, data: bytes) -> bytes:
+        out = bytearray(len(data))
+        self._cipher_into(memoryview(data), memoryview(out))
+        return bytes(out)
+
+    def _inv_cipher_blocks(self, data: bytes) -> bytes:
+        out = bytearray(len(data))
+        self._inv_cipher_into(memoryview(data), memoryview(out))
+        return bytes(out)
+
+    def _ctr_into(self, src: memoryview, dst: memoryview, counter: int) -> int:
+        if self._parallel(len(src)):
+            chunk = cipher_base.PARALLEL_CHUNK
+            tasks = (
+                (bytes(src[i:i + chunk]), (counter + i // 16) & _COUNTER_MASK) for i in range(0, len(src), chunk)
+            )
+            self._map_workers_into('_ctr', tasks, dst)
+        else:
+            vectorized = self._vectorized(len(src))
+            if vectorized is not None:
+                dst[:] = vectorized.ctr(src, counter)
+            else:
+                cipher, xor = self._encryptor.cipher, self._xor_bytes
+                for i in range(0, len(src), 16):
+                    block = xor(src[i:i + 16], cipher(((counter + i // 16) & _COUNTER_MASK).to_bytes(16, 'big')))
+                    dst[i:i + len(block)] = block
+
+        return (counter + (len(src) + 15) // 16) & _COUNTER_MASK
+
+    def _ctr_blocks(self, text: _Buffer, counter: int) -> Tuple[bytes, int]:
+        out = bytearray(len(text))
+        counter = self._ctr_into(memoryview(text), memoryview(out), counter)
+        return bytes(out), counter
+
+    def _ctr(self, text: bytes, counter: int) -> bytes:
+        return self._ctr_blocks(text, counter)[0]
+
+    @staticmethod
+    def _xor_bytes(a: _Buffer, b: _Buffer) -> bytes:
+        return xor.xor_bytes(a, b)
+
+
+class _BaseAES(_AESCore):
+    _padded = False
+
+    def encryptor(self, iv: bytes) -> cipher_base.CipherContext:
+        return self._context(self._encrypt_blocks, self._initial_state(iv), True)
+
+    def decryptor(self, iv: bytes) -> cipher_base.CipherContext:
+        return self._context(self._decrypt_blocks, self._initial_state(iv), False)
+
+    def _keystream_context(self, iv: bytes) -> '_KeystreamContext':
+        return _KeystreamContext(self._encrypt_blocks, self._initial_state(iv), _PREFETCH_CHUNK, _PREFETCH_DEPTH)
+
+    def resume(self, checkpoint: bytes) -> cipher_base.CipherContext:
+        return cipher_base.CipherContext.restore(checkpoint, self._encrypt_blocks, self._decrypt_blocks, 16,
+                                                 *self._padding(), type(self).__name__)
+
+    def _context(self, process: Callable[[bytes, Any], Tuple[bytes, Any]], state: Any,
+                 encrypting: bool) -> cipher_base.CipherContext:
+        return cipher_base.CipherContext(process, state, encrypting, 16, *self._padding(), type(self).__name__)
+
+    def _padding(self) -> Tuple[Optional[Callable[[bytes, int], bytes]], Optional[Callable[[bytes], bytes]]]:
+        return (self._pad_final, self._unpad) if self._padded else (None, None)
+
+    def _initial_state(self, iv: bytes) -> Any:
+        assert len(iv) == 16
+        return bytes(iv)
+
+    def _encrypt(self, plaintext: _Buffer, state: Any, out: Optional[_Buffer]) -> Union[bytes, int]:
+        src = memoryview(plaintext)
+        tail = b''
+        if self._padded:
+            full = len(src) - len(src) % 16
+            if full < len(src) or full == 0:
+                tail = self._pad(bytes(src[full:]))
+            src = src[:full]
+
+        length = len(src) + len(tail)
+        dst = self._output(out, length)
+        if len(src) > 0:
+            state = self._encrypt_into(src, dst[:len(src)], state)
+        if len(tail) > 0:
+            self._encrypt_into(memoryview(tail), dst[len(src):], state)
+
+        return length if out is not None else bytes(dst)
+
+    def _decrypt(self, ciphertext: _Buffer, state: Any, out: Optional[_Buffer]) -> Union[bytes, int]:
+        src = memoryview(ciphertext)
+        if self._padded:
+            assert len(src) > 0 and len(src) % 16 == 0
+
+        dst = self._output(out, len(src))
+        if len(src) > 0:
+            self._decrypt_into(src, dst, state)
+
+        length = self._unpadded_length(dst) if self._padded else len(src)
+        return length if out is not None else bytes(dst[:length])
+
+    def _encrypt_blocks(self, plaintext: _Buffer, state: Any) -> Tuple[bytes, Any]:
+        out = bytearray(len(plaintext))
+        state = self._encrypt_into(memoryview(plaintext), memoryview(out), state)
+        return bytes(out), state
+
+    def _decrypt_blocks(self, ciphertext: _Buffer, state: Any) -> Tuple[bytes, Any]:
+        out = bytearray(len(ciphertext))
+        state = self._decrypt_into(memoryview(ciphertext), memoryview(out), state)
+        return bytes(out), state
+
+    def _inplace(self, buffer: _Buffer, state: Any, process: Callable[[memoryview, memoryview, Any], Any]) -> None:
+        view = memoryview(buffer).cast('B')
+        assert not view.readonly
+        for i in range(0, len(view), _INPLACE_CHUNK):
+            chunk = view[i:i + _INPLACE_CHUNK]
+            state = process(chunk, chunk, state)
+
+    def _lockstep(self, texts: List[bytes], ivs: List[bytes],
+                  step: Callable[[bytes, bytes], Tuple[bytes, bytes]]) -> List[bytes]:
+        assert len(texts) == len(ivs)
+        states = [self._initial_state(iv) for iv in ivs]
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        outputs = [[] for _ in texts]
+
+        active = len(order)
+        for offset in range(0, max(map(len, texts), default=0), 16):
+            while len(texts[order[active - 1]]) <= offset:
+                active -= 1
+            batch = order[:active]
+
+            blocks = b''.join(bytes(texts[i][offset:offset + 16]).ljust(16, b'\x00') for i in batch)
+            output, state = step(blocks, b''.join(states[i] for i in batch))
+            for k, i in enumerate(batch):
+                states[i] = state[16 * k:16 * k + 16]
+                outputs[i].append(output[16 * k:16 * k + min(16, len(texts[i]) - offset)])
+
+        return [b''.join(output) for output in outputs]
+
+    @staticmethod
+    def _pack(texts: List[_Buffer]) -> bytes:
+        return b''.join(bytes(text) + bytes(-len(text) % 16) for text in texts)
+
+    @staticmethod
+    def _unpack(data: bytes, lengths: List[int]) -> List[bytes]:
+        result = []
+        offset = 0
+        for length in lengths:
+            result.append(data[offset:offset + length])
+            offset += length + -length % 16
+        return result
+
+    @staticmethod
+    def _output(out: Optional[_Buffer], length: int) -> memoryview:
+        if out is None:
+            return memoryview(bytearray(length))
+        dst = memoryview(out).cast('B')
+        assert not dst.readonly and len(dst) >= length
+        return dst[:length]
 
     @staticmethod
     def _pad(plaintext: bytes) -> bytes:
@@ -38,16 +322,23 @@ class _BaseAES:
         padding = bytes([padding_len] * padding_len)
         return plaintext + padding
 
+    @staticmethod
+    def _pad_final(tail: bytes, processed: int) -> bytes:
+        return b'' if processed > 0 and len(tail) == 0 else _BaseAES._pad(tail)
+
     @staticmethod
     def _unpad(ciphertext: bytes) -> bytes:
+        return ciphertext[:_BaseAES._unpadded_length(ciphertext)]
+
+    @staticmethod
+    def _unpadded_length(ciphertext: _Buffer) -> int:
         assert len(ciphertext) > 0 and len(ciphertext) % 16 == 0
         padding_len = ciphertext[-1]
-        if padding_len > 16:
-            return ciphertext
+        if padding_len == 0 or padding_len > 16:
+            return len(ciphertext)
 
-        ciphertext, padding = ciphertext[:-padding_len], ciphertext[-padding_len:]
-        assert all(byte == padding_len for byte in padding)
-        return ciphertext
+        assert all(byte == padding_len for byte in ciphertext[-padding_len:])
+        return len(ciphertext) - padding_len
 
     @staticmethod
     def _split_blocks(plaintext: bytes, require_padding=True) -> List[bytes]:
@@ -55,10 +346,6 @@ class _BaseAES:
         assert (len(plaintext) > 0 and len(plaintext) % block_size == 0) or not require_padding
         return [plaintext[i:i + block_size] for i in range(0, len(plaintext), block_size)]
 
-    @staticmethod
-    def _xor_bytes(a: bytes, b: bytes) -> bytes:
-        return bytes(i ^ j for i, j in zip(a, b))
-
     @staticmethod
     def _inc_bytes(a: bytes):
         out = list(a)
@@ -72,182 +359,847 @@ class _BaseAES:
 
 
 class AES_ECB(_BaseAES):
+    _padded = True
+
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
 
-    def encrypt(self, plaintext: bytes) -> bytes:
-        plaintext = self._pad(plaintext)
+    def encrypt(self, plaintext: _Buffer, out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        return self._encrypt(plaintext, None, out)
+
+    def decrypt(self, ciphertext: _Buffer, out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        return self._decrypt(ciphertext, None, out)
 
-        blocks = []
-        for plaintext_block in self._split_blocks(plaintext):
-            blocks.append(self._encryptor.cipher(plaintext_block))
+    def encrypt_many(self, messages: List[_Buffer]) -> List[bytes]:
+        padded = [self._pad(bytes(message)) for message in messages]
+        return self._unpack(self._cipher_blocks(b''.join(padded)), [len(text) for text in padded])
 
-        return b''.join(blocks)
+    def decrypt_many(self, ciphertexts: List[_Buffer]) -> List[bytes]:
+        assert all(len(text) > 0 and len(text) % 16 == 0 for text in ciphertexts)
+        plaintexts = self._unpack(self._inv_cipher_blocks(self._pack(ciphertexts)), [len(text) for text in ciphertexts])
+        return [self._unpad(text) for text in plaintexts]
 
-    def decrypt(self, ciphertext: bytes) -> bytes:
-        blocks = list()
-        for ciphertext_block in self._split_blocks(ciphertext):
-            blocks.append(self._encryptor.inv_cipher(ciphertext_block))
+    def encryptor(self) -> cipher_base.CipherContext:
+        return self._context(self._encrypt_blocks, None, True)
 
-        return self._unpad(b''.join(blocks))
+    def decryptor(self) -> cipher_base.CipherContext:
+        return self._context(self._decrypt_blocks, None, False)
+
+    def _encrypt_into(self, src: memoryview, dst: memoryview, state: None) -> None:
+        self._cipher_into(src, dst)
+
+    def _decrypt_into(self, src: memoryview, dst: memoryview, state: None) -> None:
+        self._inv_cipher_into(src, dst)
 
 
 class AES_CBC(_BaseAES):
+    _padded = True
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    def encrypt(self, plaintext: bytes, iv: bytes) -> bytes:
-        assert len(iv) == 16
+    def encrypt(self, plaintext: _Buffer, iv: bytes, out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        return self._encrypt(plaintext, self._initial_state(iv), out)
 
-        plaintext = self._pad(plaintext)
+    def decrypt(self, ciphertext: _Buffer, iv: bytes, out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        return self._decrypt(ciphertext, self._initial_state(iv), out)
 
-        blocks = []
-        previous = iv
-        for plaintext_block in self._split_blocks(plaintext):
-            block = self._encryptor.cipher(self._xor_bytes(plaintext_block, previous))
-            blocks.append(block)
-            previous = block
+    def encrypt_many(self, messages: List[_Buffer], ivs: List[bytes]) -> List[bytes]:
+        def step(blocks: bytes, previous: bytes) -> Tuple[bytes, bytes]:
+            ciphertext = self._cipher_blocks(self._xor_bytes(blocks, previous))
+            return ciphertext, ciphertext
 
-        return b''.join(blocks)
+        return self._lockstep([self._pad(bytes(message)) for message in messages], ivs, step)
 
-    def decrypt(self, ciphertext: bytes, iv: bytes) -> bytes:
-        assert len(iv) == 16
+    def decrypt_many(self, ciphertexts: List[_Buffer], ivs: List[bytes]) -> List[bytes]:
+        assert len(ciphertexts) == len(ivs)
+        assert all(len(text) > 0 and len(text) % 16 == 0 for text in ciphertexts)
+        previous = b''.join(self._initial_state(iv) + bytes(text[:-16]) for text, iv in zip(ciphertexts, ivs))
+        plaintext = self._xor_bytes(self._inv_cipher_blocks(self._pack(ciphertexts)), previous)
+        return [self._unpad(text) for text in self._unpack(plaintext, [len(text) for text in ciphertexts])]
+
+    def _encrypt_into(self, src: memoryview, dst: memoryview, previous: bytes) -> bytes:
+        assert len(src) % 16 == 0
+
+        cipher, xor = self._encryptor.cipher, self._xor_bytes
+        for i in range(0, len(src), 16):
+            previous = cipher(xor(src[i:i + 16], previous))
+            dst[i:i + 16] = previous
 
-        blocks = []
-        previous = iv
-        for ciphertext_block in self._split_blocks(ciphertext):
-            blocks.append(self._xor_bytes(previous, self._encryptor.inv_cipher(ciphertext_block)))
-            previous = ciphertext_block
+        return previous
 
-        return self._unpad(b''.join(blocks))
+    def _decrypt_into(self, src: memoryview, dst: memoryview, previous: bytes) -> bytes:
+        assert len(src) % 16 == 0
+
+        following = bytes(src[-16:]) if len(src) > 0 else previous
+        if self._parallel(len(src)):
+            self._map_chained_chunks_into('_decrypt_chunk', src, previous, dst)
+        else:
+            self._decrypt_chunk_into(src, dst, previous)
+
+        return following
+
+    def _decrypt_chunk(self, ciphertext: bytes, previous: bytes) -> bytes:
+        plaintext = bytearray(len(ciphertext))
+        self._decrypt_chunk_into(memoryview(ciphertext), memoryview(plaintext), previous)
+        return bytes(plaintext)
+
+    def _decrypt_chunk_into(self, src: memoryview, dst: memoryview, previous: bytes) -> None:
+        vectorized = self._vectorized(len(src))
+        if vectorized is not None:
+            decrypted = vectorized.inv_cipher_blocks(src)
+            dst[:] = self._xor_bytes(previous + bytes(src[:-16]), decrypted)
+            return
+
+        inv_cipher, xor = self._encryptor.inv_cipher, self._xor_bytes
+        for i in range(0, len(src), 16):
+            block = bytes(src[i:i + 16])
+            dst[i:i + 16] = xor(previous, inv_cipher(block))
+            previous = block
 
 
 class AES_PCBC(_BaseAES):
+    _padded = True
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    def encrypt(self, plaintext: bytes, iv: bytes) -> bytes:
-        assert len(iv) == 16
+    def encrypt(self, plaintext: _Buffer, iv: bytes, out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        return self._encrypt(plaintext, self._initial_state(iv), out)
 
-        plaintext = self._pad(plaintext)
+    def decrypt(self, ciphertext: _Buffer, iv: bytes, out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        return self._decrypt(ciphertext, self._initial_state(iv), out)
 
-        blocks = []
-        prev_ciphertext = iv
-        prev_plaintext = bytes(16)
-        for plaintext_block in self._split_blocks(plaintext):
-            ciphertext_block = self._encryptor.cipher(
-                self._xor_bytes(plaintext_block, self._xor_bytes(prev_ciphertext, prev_plaintext))
-            )
-            blocks.append(ciphertext_block)
-            prev_ciphertext = ciphertext_block
-            prev_plaintext = plaintext_block
+    def encrypt_many(self, messages: List[_Buffer], ivs: List[bytes]) -> List[bytes]:
+        def step(blocks: bytes, chaining: bytes) -> Tuple[bytes, bytes]:
+            ciphertext = self._cipher_blocks(self._xor_bytes(blocks, chaining))
+            return ciphertext, self._xor_bytes(ciphertext, blocks)
 
-        return b''.join(blocks)
+        return self._lockstep([self._pad(bytes(message)) for message in messages], ivs, step)
 
-    def decrypt(self, ciphertext: bytes, iv: bytes) -> bytes:
-        assert len(iv) == 16
+    def decrypt_many(self, ciphertexts: List[_Buffer], ivs: List[bytes]) -> List[bytes]:
+        def step(blocks: bytes, chaining: bytes) -> Tuple[bytes, bytes]:
+            plaintext = self._xor_bytes(self._inv_cipher_blocks(blocks), chaining)
+            return plaintext, self._xor_bytes(blocks, plaintext)
 
-        blocks = []
-        prev_ciphertext = iv
-        prev_plaintext = bytes(16)
-        for ciphertext_block in self._split_blocks(ciphertext):
-            plaintext_block = self._xor_bytes(
-                self._xor_bytes(prev_ciphertext, prev_plaintext), self._encryptor.inv_cipher(ciphertext_block)
-            )
-            blocks.append(plaintext_block)
-            prev_ciphertext = ciphertext_block
-            prev_plaintext = plaintext_block
+        assert all(len(text) > 0 and len(text) % 16 == 0 for text in ciphertexts)
+        return [self._unpad(text) for text in self._lockstep(ciphertexts, ivs, step)]
 
-        return self._unpad(b''.join(blocks))
+    def _encrypt_into(self, src: memoryview, dst: memoryview, chaining: bytes) -> bytes:
+        assert len(src) % 16 == 0
+
+        cipher, xor = self._encryptor.cipher, self._xor_bytes
+        for i in range(0, len(src), 16):
+            plaintext_block = bytes(src[i:i + 16])
+            ciphertext_block = cipher(xor(plaintext_block, chaining))
+            dst[i:i + 16] = ciphertext_block
+            chaining = xor(ciphertext_block, plaintext_block)
+
+        return chaining
+
+    def _decrypt_into(self, src: memoryview, dst: memoryview, chaining: bytes) -> bytes:
+        assert len(src) % 16 == 0
+
+        inv_cipher, xor = self._encryptor.inv_cipher, self._xor_bytes
+        for i in range(0, len(src), 16):
+            ciphertext_block = bytes(src[i:i + 16])
+            plaintext_block = xor(chaining, inv_cipher(ciphertext_block))
+            dst[i:i + 16] = plaintext_block
+            chaining = xor(ciphertext_block, plaintext_block)
+
+        return chaining
 
 
 class AES_CFB(_BaseAES):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    def encrypt(self, plaintext: bytes, iv: bytes) -> bytes:
-        assert len(iv) == 16
+    def encrypt(self, plaintext: _Buffer, iv: bytes, out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        return self._encrypt(plaintext, self._initial_state(iv), out)
 
-        blocks = []
-        previous = iv
-        for plaintext_block in self._split_blocks(plaintext, require_padding=False):
-            block = self._xor_bytes(plaintext_block, self._encryptor.cipher(previous))
-            blocks.append(block)
-            previous = block
+    def decrypt(self, ciphertext: _Buffer, iv: bytes, out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        return self._decrypt(ciphertext, self._initial_state(iv), out)
 
-        return b''.join(blocks)
+    def encrypt_inplace(self, buffer: _Buffer, iv: bytes) -> None:
+        self._inplace(buffer, self._initial_state(iv), self._encrypt_into)
 
-    def decrypt(self, ciphertext: bytes, iv: bytes) -> bytes:
-        assert len(iv) == 16
+    def decrypt_inplace(self, buffer: _Buffer, iv: bytes) -> None:
+        self._inplace(buffer, self._initial_state(iv), self._decrypt_into)
 
-        blocks = []
-        prev_ciphertext = iv
-        for ciphertext_block in self._split_blocks(ciphertext, require_padding=False):
-            plaintext_block = self._xor_bytes(ciphertext_block, self._encryptor.cipher(prev_ciphertext))
-            blocks.append(plaintext_block)
-            prev_ciphertext = ciphertext_block
+    def encrypt_many(self, messages: List[_Buffer], ivs: List[bytes]) -> List[bytes]:
+        def step(blocks: bytes, previous: bytes) -> Tuple[bytes, bytes]:
+            ciphertext = self._xor_bytes(blocks, self._cipher_blocks(previous))
+            return ciphertext, ciphertext
+
+        return self._lockstep(messages, ivs, step)
+
+    def decrypt_many(self, ciphertexts: List[_Buffer], ivs: List[bytes]) -> List[bytes]:
+        assert len(ciphertexts) == len(ivs)
+        previous = b''.join(
+            self._initial_state(iv) + bytes(text[:(len(text) - 1) // 16 * 16]) if len(text) > 0 else b''
+            for text, iv in zip(ciphertexts, ivs)
+        )
+        plaintext = self._xor_bytes(self._pack(ciphertexts), self._cipher_blocks(previous))
+        return self._unpack(plaintext, [len(text) for text in ciphertexts])
 
-        return b''.join(blocks)
+    def _encrypt_into(self, src: memoryview, dst: memoryview, previous: bytes) -> bytes:
+        cipher, xor = self._encryptor.cipher, self._xor_bytes
+        for i in range(0, len(src), 16):
+            previous = xor(src[i:i + 16], cipher(previous))
+            dst[i:i + len(previous)] = previous
+
+        return previous
+
+    def _decrypt_into(self, src: memoryview, dst: memoryview, previous: bytes) -> bytes:
+        following = bytes(src[-16:]) if len(src) > 0 else previous
+        if self._parallel(len(src)):
+            self._map_chained_chunks_into('_decrypt_chunk', src, previous, dst)
+        else:
+            self._decrypt_chunk_into(src, dst, previous)
+
+        return following
+
+    def _decrypt_chunk(self, ciphertext: bytes, prev_ciphertext: bytes) -> bytes:
+        plaintext = bytearray(len(ciphertext))
+        self._decrypt_chunk_into(memoryview(ciphertext), memoryview(plaintext), prev_ciphertext)
+        return bytes(plaintext)
+
+    def _decrypt_chunk_into(self, src: memoryview, dst: memoryview, prev_ciphertext: bytes) -> None:
+        vectorized = self._vectorized(len(src))
+        if vectorized is not None:
+            full_blocks = (len(src) - 1) // 16 * 16
+            keystream = vectorized.cipher_blocks(prev_ciphertext + bytes(src[:full_blocks]))
+            dst[:] = self._xor_bytes(src, keystream)
+            return
+
+        cipher, xor = self._encryptor.cipher, self._xor_bytes
+        for i in range(0, len(src), 16):
+            ciphertext_block = bytes(src[i:i + 16])
+            dst[i:i + len(ciphertext_block)] = xor(ciphertext_block, cipher(prev_ciphertext))
+            prev_ciphertext = ciphertext_block
 
 
 class AES_OFB(_BaseAES):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    def encrypt(self, plaintext: bytes, iv: bytes) -> bytes:
-        assert len(iv) == 16
+    def encrypt(self, plaintext: _Buffer, iv: bytes, out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        return self._encrypt(plaintext, self._initial_state(iv), out)
 
-        blocks = []
-        previous = iv
-        for plaintext_block in self._split_blocks(plaintext, require_padding=False):
-            block = self._encryptor.cipher(previous)
-            ciphertext_block = self._xor_bytes(plaintext_block, block)
-            blocks.append(ciphertext_block)
-            previous = block
+    def decrypt(self, ciphertext: _Buffer, iv: bytes, out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        return self._decrypt(ciphertext, self._initial_state(iv), out)
 
-        return b''.join(blocks)
+    def encrypt_inplace(self, buffer: _Buffer, iv: bytes) -> None:
+        self._inplace(buffer, self._initial_state(iv), self._encrypt_into)
 
-    def decrypt(self, ciphertext: bytes, iv: bytes) -> bytes:
-        assert len(iv) == 16
+    def decrypt_inplace(self, buffer: _Buffer, iv: bytes) -> None:
+        self._inplace(buffer, self._initial_state(iv), self._decrypt_into)
 
-        blocks = []
-        previous = iv
-        for ciphertext_block in self._split_blocks(ciphertext, require_padding=False):
-            block = self._encryptor.cipher(previous)
-            plaintext_block = self._xor_bytes(ciphertext_block, block)
-            blocks.append(plaintext_block)
-            previous = block
+    def encrypt_many(self, messages: List[_Buffer], ivs: List[bytes]) -> List[bytes]:
+        def step(blocks: bytes, previous: bytes) -> Tuple[bytes, bytes]:
+            keystream = self._cipher_blocks(previous)
+            return self._xor_bytes(blocks, keystream), keystream
+
+        return self._lockstep(messages, ivs, step)
+
+    decrypt_many = encrypt_many
 
-        return b''.join(blocks)
+    def encryptor(self, iv: bytes, prefetch: bool = False) -> Union[cipher_base.CipherContext, '_KeystreamContext']:
+        return self._keystream_context(iv) if prefetch else super().encryptor(iv)
+
+    def decryptor(self, iv: bytes, prefetch: bool = False) -> Union[cipher_base.CipherContext, '_KeystreamContext']:
+        return self._keystream_context(iv) if prefetch else super().decryptor(iv)
+
+    def _encrypt_into(self, src: memoryview, dst: memoryview, previous: bytes) -> bytes:
+        cipher, xor = self._encryptor.cipher, self._xor_bytes
+        for i in range(0, len(src), 16):
+            previous = cipher(previous)
+            block = xor(src[i:i + 16], previous)
+            dst[i:i + len(block)] = block
+
+        return previous
+
+    _decrypt_into = _encrypt_into
 
 
 class AES_CTR(_BaseAES):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    def encrypt(self, plaintext: bytes, iv: bytes) -> bytes:
-        assert len(iv) == 16
+    def encrypt(self, plaintext: _Buffer, iv: bytes, out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        return self._encrypt(plaintext, self._initial_state(iv), out)
 
-        blocks = []
-        previousz = iv
-        for plaintext_block in self._split_blocks(plaintext, require_padding=False):
-            block = self._xor_bytes(plaintext_block, self._encryptor.cipher(previous))
-            blocks.append(block)
-            previous = self._inc_bytes(previous)
+    def decrypt(self, ciphertext: _Buffer, iv: bytes, out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        return self._decrypt(ciphertext, self._initial_state(iv), out)
 
-        return b''.join(blocks)
+    def encrypt_inplace(self, buffer: _Buffer, iv: bytes) -> None:
+        self._inplace(buffer, self._initial_state(iv), self._encrypt_into)
 
-    def decrypt(self, ciphertext: bytes, iv: bytes) -> bytes:
-        assert len(iv) == 16
+    def decrypt_inplace(self, buffer: _Buffer, iv: bytes) -> None:
+        self._inplace(buffer, self._initial_state(iv), self._decrypt_into)
+
+    def encrypt_many(self, messages: List[_Buffer], ivs: List[bytes]) -> List[bytes]:
+        assert len(messages) == len(ivs)
+        counters = []
+        for message, iv in zip(messages, ivs):
+            counter = self._initial_state(iv)
+            blocks = (len(message) + 15) // 16
+            counters.extend(((counter + i) & _COUNTER_MASK).to_bytes(16, 'big') for i in range(blocks))
+
+        ciphertext = self._xor_bytes(self._pack(messages), self._cipher_blocks(b''.join(counters)))
+        return self._unpack(ciphertext, [len(message) for message in messages])
+
+    decrypt_many = encrypt_many
+
+    def encryptor(self, iv: bytes, prefetch: bool = False) -> Union[cipher_base.CipherContext, '_KeystreamContext']:
+        return self._keystream_context(iv) if prefetch else super().encryptor(iv)
+
+    def decryptor(self, iv: bytes, prefetch: bool = False) -> Union[cipher_base.CipherContext, '_KeystreamContext']:
+        return self._keystream_context(iv) if prefetch else super().decryptor(iv)
+
+    def _initial_state(self, iv: bytes) -> int:
+        return int.from_bytes(super()._initial_state(iv), 'big')
+
+    def decrypt_range(self, ciphertext: _Buffer, iv: bytes, offset: int, length: int,
+                      out: Optional[_Buffer] = None) -> Union[bytes, int]:
+        assert 0 <= offset and 0 <= length and offset + length <= len(ciphertext)
+
+        src = memoryview(ciphertext)[offset:offset + length]
+        dst = self._output(out, length)
+        counter = (self._initial_state(iv) + offset // 16) & _COUNTER_MASK
 
-        blocks = []
-        nonce = iv
-        for ciphertext_block in self._split_blocks(ciphertext, require_padding=False):
-            block = self._xor_bytes(ciphertext_block, self._encryptor.cipher(nonce))
-            blocks.append(block)
-            nonce = self._inc_bytes(nonce)
+        head = min(length, -offset % 16)
+        if head > 0:
+            skip = offset % 16
+            keystream = self._encryptor.cipher(counter.to_bytes(16, 'big'))[skip:skip + head]
+            dst[:head] = self._xor_bytes(src[:head], keystream)
+            counter = (counter + 1) & _COUNTER_MASK
+        if head < length:
+            self._encrypt_into(src[head:], dst[head:], counter)
 
-        return b''.join(blocks)
+        return length if out is not None else bytes(dst)
+
+    def _encrypt_into(self, src: memoryview, dst: memoryview, counter: int) -> int:
+        return self._ctr_into(src, dst, counter)
+
+    _decrypt_into = _encrypt_into
+
+
+class AES_GCM(_AESCore):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._ghash_table = _ghash_table(int.from_bytes(self._encryptor.cipher(bytes(16)), 'big'))
+
+    def encrypt(self, plaintext: _Buffer, iv: bytes, associated_data: bytes = b'') -> bytes:
+        context = self.encryptor(iv, associated_data)
+        ciphertext = context.update(plaintext) + context.finalize()
+        return ciphertext + context.tag
+
+    def decrypt(self, ciphertext: _Buffer, iv: bytes, associated_data: bytes = b'') -> bytes:
+        assert len(ciphertext) >= 16
+        ciphertext = memoryview(ciphertext)
+        context = self.decryptor(iv, bytes(ciphertext[-16:]), associated_data)
+        return context.update(ciphertext[:-16]) + context.finalize()
+
+    def encryptor(self, iv: bytes, associated_data: bytes = b'') -> '_GCMContext':
+        return _GCMContext(self, self._initial_state(iv), associated_data, None)
+
+    def decryptor(self, iv: bytes, tag: bytes, associated_data: bytes = b'') -> '_GCMContext':
+        assert len(tag) == 16
+        return _GCMContext(self, self._initial_state(iv), associated_data, tag)
+
+    def _initial_state(self, iv: bytes) -> int:
+        assert len(iv) == 12
+        return int.from_bytes(iv, 'big') << 32 | 1
+
+
+class AES_XTS(_AESCore):
+    def __init__(self, **kwargs):
+        if 'key_length' in kwargs:
+            key_length = kwargs['key_length']
+            assert key_length in (256, 512)
+            key = os.urandom(key_length // 8)
+            schedule = _AESEncryptor
+        else:
+            assert 'key' in kwargs
+            key = kwargs['key']
+            assert len(key) in (256 // 8, 512 // 8)
+            schedule = key_schedule_cache.get
+
+        half = len(key) // 2
+        assert key[:half] != key[half:]
+        self._K = key
+        self._encryptor = schedule(bytes(key[:half]))
+        self._tweak_encryptor = schedule(bytes(key[half:]))
+        self._init_backend(**kwargs)
+
+    def encrypt(self, plaintext: _Buffer, sector: int) -> bytes:
+        return self._sector(memoryview(plaintext), sector, True)
+
+    def decrypt(self, ciphertext: _Buffer, sector: int) -> bytes:
+        return self._sector(memoryview(ciphertext), sector, False)
+
+    def encrypt_sectors(self, plaintext: _Buffer, first_sector: int, sector_size: int = _SECTOR_SIZE) -> bytes:
+        return self._map_sectors(memoryview(plaintext), first_sector, sector_size, True)
+
+    def decrypt_sectors(self, ciphertext: _Buffer, first_sector: int, sector_size: int = _SECTOR_SIZE) -> bytes:
+        return self._map_sectors(memoryview(ciphertext), first_sector, sector_size, False)
+
+    def _map_sectors(self, text: memoryview, first_sector: int, sector_size: int, encrypting: bool) -> bytes:
+        assert sector_size > 0 and sector_size % 16 == 0
+        assert len(text) % sector_size == 0
+
+        out = bytearray(len(text))
+        if self._parallel(len(text)):
+            chunk = max(sector_size, cipher_base.PARALLEL_CHUNK // sector_size * sector_size)
+            tasks = (
+                (bytes(text[i:i + chunk]), first_sector + i // sector_size, sector_size, encrypting)
+                for i in range(0, len(text), chunk)
+            )
+            self._map_workers_into('_sectors', tasks, memoryview(out))
+        else:
+            self._sectors_into(text, memoryview(out), first_sector, sector_size, encrypting)
+        return bytes(out)
+
+    def _sectors(self, text: _Buffer, first_sector: int, sector_size: int, encrypting: bool) -> bytes:
+        out = bytearray(len(text))
+        self._sectors_into(memoryview(text), memoryview(out), first_sector, sector_size, encrypting)
+        return bytes(out)
+
+    def _sectors_into(self, src: memoryview, dst: memoryview, first_sector: int, sector_size: int,
+                      encrypting: bool) -> None:
+        batch = max(sector_size, _SECTOR_BATCH // sector_size * sector_size)
+        for i in range(0, len(src), batch):
+            chunk = src[i:i + batch]
+            tweaks = b''.join(
+                self._tweaks(first_sector + (i + j) // sector_size, sector_size // 16)
+                for j in range(0, len(chunk), sector_size)
+            )
+            dst[i:i + len(chunk)] = self._xex(chunk, tweaks, encrypting)
+
+    def _sector(self, text: memoryview, sector: int, encrypting: bool) -> bytes:
+        assert len(text) >= 16
+
+        full_blocks, partial = divmod(len(text), 16)
+        tweaks = self._tweaks(sector, full_blocks + (partial > 0))
+        if partial == 0:
+            return self._xex(text, tweaks, encrypting)
+
+        end = 16 * (full_blocks - 1)
+        output = self._xex(text[:end], tweaks[:end], encrypting)
+
+        previous_tweak, last_tweak = tweaks[end:end + 16], tweaks[end + 16:]
+        if not encrypting:
+            previous_tweak, last_tweak = last_tweak, previous_tweak
+        stolen = self._xex(text[end:end + 16], previous_tweak, encrypting)
+        last = self._xex(bytes(text[end + 16:]) + stolen[partial:], last_tweak, encrypting)
+        return output + last + stolen[:partial]
+
+    def _xex(self, text: _Buffer, tweaks: bytes, encrypting: bool) -> bytes:
+        out = bytearray(len(text))
+        if encrypting:
+            self._cipher_into(memoryview(self._xor_bytes(text, tweaks)), memoryview(out))
+        else:
+            self._inv_cipher_into(memoryview(self._xor_bytes(text, tweaks)), memoryview(out))
+        return self._xor_bytes(out, tweaks)
+
+    def _tweaks(self, sector: int, blocks: int) -> bytes:
+        assert 0 <= sector <= _COUNTER_MASK
+
+        tweak = int.from_bytes(self._tweak_encryptor.cipher(sector.to_bytes(16, 'little')), 'little')
+        tweaks = []
+        for _ in range(blocks):
+            tweaks.append(tweak.to_bytes(16, 'little'))
+            tweak <<= 1
+            if tweak >> 128:
+                tweak ^= (1 << 128) | 0x87
+        return b''.join(tweaks)
+
+
+class AES_CMAC(_AESCore):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        subkeys = self._encryptor.mac_subkeys
+        self._k1, self._k2 = subkeys[1], subkeys[2]
+
+    def mac(self, message: _Buffer) -> bytes:
+        context = self.authenticator()
+        context.update(message)
+        return context.finalize()
+
+    def verify(self, message: _Buffer, tag: bytes) -> None:
+        context = self.authenticator()
+        context.update(message)
+        context.verify(tag)
+
+    def authenticator(self) -> '_MACContext':
+        return _MACContext(self._chain, self._tag, 0)
+
+    def _chain(self, data: memoryview, state: int) -> int:
+        cipher = self._encryptor.cipher
+        for i in range(0, len(data), 16):
+            state = int.from_bytes(cipher((state ^ int.from_bytes(data[i:i + 16], 'big')).to_bytes(16, 'big')), 'big')
+        return state
+
+    def _tag(self, last: bytes, state: int) -> bytes:
+        if len(last) == 16:
+            state ^= int.from_bytes(last, 'big') ^ self._k1
+        else:
+            state ^= int.from_bytes(_mac_pad(last), 'big') ^ self._k2
+        return self._encryptor.cipher(state.to_bytes(16, 'big'))
+
+
+class AES_PMAC(_AESCore):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._offsets = self._encryptor.mac_subkeys
+
+    def mac(self, message: _Buffer) -> bytes:
+        context = self.authenticator()
+        context.update(message)
+        return context.finalize()
+
+    def verify(self, message: _Buffer, tag: bytes) -> None:
+        context = self.authenticator()
+        context.update(message)
+        context.verify(tag)
+
+    def authenticator(self) -> '_MACContext':
+        return _MACContext(self._sum, self._tag, (0, 0))
+
+    def _sum(self, data: memoryview, state: Tuple[int, int]) -> Tuple[int, int]:
+        blocks, checksum = state
+        if self._parallel(len(data)):
+            chunk = cipher_base.PARALLEL_CHUNK
+            tasks = ((bytes(data[i:i + chunk]), blocks + i // 16) for i in range(0, len(data), chunk))
+            partial_sums = self._map_workers('_partial_sum', tasks)
+        else:
+            partial_sums = [self._partial_sum(data, blocks)]
+        for partial_sum in partial_sums:
+            checksum ^= partial_sum
+        return blocks + len(data) // 16, checksum
+
+    def _partial_sum(self, data: _Buffer, blocks: int) -> int:
+        encrypted = self._cipher_blocks(self._xor_bytes(data, self._offset_blocks(blocks, len(data) // 16)))
+        checksum = 0
+        for i in range(0, len(encrypted), 16):
+            checksum ^= int.from_bytes(encrypted[i:i + 16], 'big')
+        return checksum
+
+    def _offset_blocks(self, blocks: int, count: int) -> bytes:
+        offsets = self._offsets
+        gray = blocks ^ (blocks >> 1)
+        offset = 0
+        for i in range(gray.bit_length()):
+            if gray >> i & 1:
+                offset ^= offsets[i]
+
+        result = []
+        for i in range(blocks + 1, blocks + count + 1):
+            offset ^= offsets[(i & -i).bit_length() - 1]
+            result.append(offset.to_bytes(16, 'big'))
+        return b''.join(result)
+
+    def _tag(self, last: bytes, state: Tuple[int, int]) -> bytes:
+        checksum = state[1]
+        if len(last) == 16:
+            checksum ^= int.from_bytes(last, 'big') ^ self._offsets[-1]
+        else:
+            checksum ^= int.from_bytes(_mac_pad(last), 'big')
+        return self._encryptor.cipher(checksum.to_bytes(16, 'big'))
+
+
+class AES_MultiKey:
+    def __init__(self, keys: List[bytes]) -> None:
+        assert len(keys) > 0
+        assert len(keys[0]) in (128 // 8, 192 // 8, 256 // 8)
+        assert all(len(key) == len(keys[0]) for key in keys)
+
+        self._encryptors = [key_schedule_cache.get(key) for key in keys]
+        self._vector_encryptor = None
+
+    def encrypt_blocks(self, data: _Buffer, key_indices: List[int]) -> bytes:
+        vectorized = self._vectorized(data, key_indices)
+        if vectorized is not None:
+            return vectorized.cipher_blocks(data, key_indices)
+        return b''.join(self._encryptors[index].cipher(data[16 * i:16 * i + 16]) for i, index in enumerate(key_indices))
+
+    def decrypt_blocks(self, data: _Buffer, key_indices: List[int]) -> bytes:
+        vectorized = self._vectorized(data, key_indices)
+        if vectorized is not None:
+            return vectorized.inv_cipher_blocks(data, key_indices)
+        return b''.join(
+            self._encryptors[index].inv_cipher(data[16 * i:16 * i + 16]) for i, index in enumerate(key_indices)
+        )
+
+    def ctr_many(self, messages: List[_Buffer], key_indices: List[int], ivs: List[bytes]) -> List[bytes]:
+        assert len(messages) == len(key_indices) == len(ivs)
+        counters = []
+        block_indices = []
+        for message, index, iv in zip(messages, key_indices, ivs):
+            assert len(iv) == 16
+            counter = int.from_bytes(iv, 'big')
+            blocks = (len(message) + 15) // 16
+            counters.extend(((counter + i) & _COUNTER_MASK).to_bytes(16, 'big') for i in range(blocks))
+            block_indices.extend([index] * blocks)
+
+        keystream = self.encrypt_blocks(b''.join(counters), block_indices)
+        ciphertext = _BaseAES._xor_bytes(_BaseAES._pack(messages), keystream)
+        return _BaseAES._unpack(ciphertext, [len(message) for message in messages])
+
+    def _vectorized(self, data: _Buffer, key_indices: List[int]):
+        assert len(data) == 16 * len(key_indices)
+        assert all(0 <= index < len(self._encryptors) for index in key_indices)
+        if np is None or len(data) < _VECTORIZED_THRESHOLD:
+            return None
+        if self._vector_encryptor is None:
+            self._vector_encryptor = _AESMultiKeyVectorEncryptor(self._encryptors)
+        return self._vector_encryptor
+
+
+class _KeystreamContext:
+    block_size = 16
+
+    def __init__(self, generate: Callable[[bytes, Any], Tuple[bytes, Any]], state: Any, chunk_size: int,
+                 depth: int) -> None:
+        assert chunk_size > 0 and chunk_size % 16 == 0
+        assert depth > 0
+
+        self._keystream = b''
+        self._offset = 0
+        self._finalized = False
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=_prefetch_keystream,
+                                        args=(self._queue, self._stop, generate, state, chunk_size), daemon=True)
+        self._thread.start()
+        self._finalizer = weakref.finalize(self, self._stop.set)
+
+    def __enter__(self) -> '_KeystreamContext':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def update(self, data: _Buffer) -> bytes:
+        assert not self._finalized
+        data = memoryview(data)
+        out = bytearray(len(data))
+
+        position = 0
+        while position < len(data):
+            if self._offset == len(self._keystream):
+                self._keystream = self._next_chunk()
+                self._offset = 0
+            length = min(len(data) - position, len(self._keystream) - self._offset)
+            out[position:position + length] = _BaseAES._xor_bytes(
+                data[position:position + length], self._keystream[self._offset:self._offset + length]
+            )
+            position += length
+            self._offset += length
+
+        return bytes(out)
+
+    def finalize(self) -> bytes:
+        assert not self._finalized
+        self._finalized = True
+        self.close()
+        return b''
+
+    def close(self) -> None:
+        self._finalizer()
+        while self._thread.is_alive():
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._thread.join()
+
+    def _next_chunk(self) -> bytes:
+        chunk = self._queue.get()
+        if isinstance(chunk, BaseException):
+            self._finalized = True
+            self.close()
+            raise chunk
+        return chunk
+
+
+def _prefetch_keystream(chunks: queue.Queue, stop: threading.Event,
+                        generate: Callable[[bytes, Any], Tuple[bytes, Any]], state: Any, chunk_size: int) -> None:
+    def put(item: Any) -> None:
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    zeros = bytes(chunk_size)
+    try:
+        while not stop.is_set():
+            keystream, state = generate(zeros, state)
+            put(keystream)
+    except BaseException as e:
+        put(e)
+
+
+class _GCMContext:
+    block_size = 16
+
+    def __init__(self, algorithm: AES_GCM, counter: int, associated_data: bytes, tag: Optional[bytes]) -> None:
+        self._algorithm = algorithm
+        self._initial_counter = counter
+        self._ctr = cipher_base.CipherContext(algorithm._ctr_blocks, (counter + 1) & _COUNTER_MASK, True)
+        self._ghash = _GHash(algorithm._ghash_table)
+        self._ghash.update(associated_data)
+        self._ghash.pad()
+        self._associated_length = len(associated_data)
+        self._length = 0
+        self._expected_tag = tag
+        self.tag = None
+
+    def update(self, data: _Buffer) -> bytes:
+        data = memoryview(data)
+        output = []
+        for i in range(0, len(data), _GCM_CHUNK):
+            chunk = data[i:i + _GCM_CHUNK]
+            output.append(self._ctr.update(chunk))
+            self._authenticate(chunk, output[-1])
+        return b''.join(output)
+
+    def finalize(self) -> bytes:
+        output = self._ctr.finalize()
+        self._authenticate(b'', output)
+        self._ghash.pad()
+        self._ghash.update(((self._associated_length * 8) << 64 | self._length * 8).to_bytes(16, 'big'))
+
+        mask = self._algorithm._encryptor.cipher(self._initial_counter.to_bytes(16, 'big'))
+        tag = _BaseAES._xor_bytes(mask, self._ghash.digest())
+        if self._expected_tag is None:
+            self.tag = tag
+        elif not hmac.compare_digest(tag, self._expected_tag):
+            raise InvalidTag('authentication tag mismatch')
+        return output
+
+    def _authenticate(self, data: _Buffer, output: bytes) -> None:
+        ciphertext = output if self._expected_tag is None else data
+        self._ghash.update(ciphertext)
+        self._length += len(ciphertext)
+        assert self._length <= _GCM_MAX_LENGTH
+
+
+class _MACContext:
+    def __init__(self, process: Callable[[memoryview, Any], Any], tag: Callable[[bytes, Any], bytes],
+                 state: Any) -> None:
+        self._process = process
+        self._tag = tag
+        self._state = state
+        self._buffer = b''
+        self._finalized = False
+
+    def update(self, data: _Buffer) -> None:
+        assert not self._finalized
+        buffer = self._buffer + data if self._buffer else memoryview(data)
+
+        available = (len(buffer) - 1) // 16 * 16 if len(buffer) > 0 else 0
+        if available > 0:
+            self._state = self._process(memoryview(buffer)[:available], self._state)
+        self._buffer = bytes(buffer[available:])
+
+    def finalize(self) -> bytes:
+        assert not self._finalized
+        self._finalized = True
+        return self._tag(self._buffer, self._state)
+
+    def verify(self, tag: bytes) -> None:
+        if not hmac.compare_digest(self.finalize(), tag):
+            raise InvalidTag('authentication tag mismatch')
+
+
+def _ghash_multiply_x(v: int) -> int:
+    return (v >> 1) ^ _GHASH_R if v & 1 else v >> 1
+
+
+def _ghash_reduction_table() -> Tuple[int]:
+    table = []
+    for b in range(256):
+        for _ in range(8):
+            b = _ghash_multiply_x(b)
+        table.append(b)
+    return tuple(table)
+
+
+def _ghash_table(h: int) -> Tuple[int]:
+    table = [0] * 256
+    bit = 0x80
+    while bit:
+        table[bit] = h
+        h = _ghash_multiply_x(h)
+        bit >>= 1
+    for i in (2, 4, 8, 16, 32, 64, 128):
+        for j in range(1, i):
+            table[i + j] = table[i] ^ table[j]
+    return tuple(table)
+
+
+_GHASH_R = 0xE1 << 120
+_GHASH_REDUCTION = _ghash_reduction_table()
+
+
+class _GHash:
+    def __init__(self, table: Tuple[int]) -> None:
+        self._table = table
+        self._y = 0
+        self._buffer = b''
+
+    def update(self, data: _Buffer) -> None:
+        buffer = self._buffer + data if self._buffer else bytes(data)
+        full = len(buffer) - len(buffer) % 16
+
+        y, multiply = self._y, self._multiply
+        for i in range(0, full, 16):
+            y = multiply(y ^ int.from_bytes(buffer[i:i + 16], 'big'))
+
+        self._y = y
+        self._buffer = buffer[full:]
+
+    def pad(self) -> None:
+        if self._buffer:
+            self.update(bytes(16 - len(self._buffer)))
+
+    def digest(self) -> bytes:
+        assert not self._buffer
+        return self._y.to_bytes(16, 'big')
+
+    def _multiply(self, x: int) -> int:
+        table, reduction = self._table, _GHASH_REDUCTION
+        z = 0
+        for _ in range(16):
+            z = (z >> 8) ^ reduction[z & 0xff] ^ table[x & 0xff]
+            x >>= 8
+        return z
+
+
+def _mac_double(v: int) -> int:
+    v <<= 1
+    return v ^ _MAC_R if v >> 128 else v
+
+
+def _mac_halve(v: int) -> int:
+    return (v >> 1) ^ _MAC_HALF_R if v & 1 else v >> 1
+
+
+def _mac_pad(last: bytes) -> bytes:
+    return last + b'\x80' + bytes(15 - len(last))
+
+
+def _mac_subkeys(encryptor: '_AESEncryptor') -> Tuple[int]:
+    l = int.from_bytes(encryptor.cipher(bytes(16)), 'big')
+    subkeys = [l]
+    for _ in range(127):
+        subkeys.append(_mac_double(subkeys[-1]))
+    subkeys.append(_mac_halve(l))
+    return tuple(subkeys)
 
 
 class _AESEncryptor:
@@ -314,6 +1266,15 @@ class _AESEncryptor:
         self._Nk = len(key) // self._Nb
         self._key = key
         self._round_keys = self._key_expansion(key)
+        self._round_key_words = self._columns_to_words(self._round_keys)
+        self._inv_round_key_words = self._inv_key_expansion(self._round_key_words, self._Nr)
+        self._mac_subkeys = None
+
+    @property
+    def mac_subkeys(self) -> Tuple[int]:
+        if self._mac_subkeys is None:
+            self._mac_subkeys = _mac_subkeys(self)
+        return self._mac_subkeys
 
     def _key_expansion(self, key: bytes) -> List[List[_Word]]:
         result = list()
@@ -337,42 +1298,82 @@ class _AESEncryptor:
 
         return [result[4 * i: 4 * (i + 1)] for i in range(len(result) // 4)]
 
-    def cipher(self, _in: bytes):
+    @staticmethod
+    def _columns_to_words(round_keys: List[List[_Word]]) -> List[int]:
+        words = list()
+        for round_key in round_keys:
+            for c in range(_AESEncryptor._Nb):
+                words.append(
+                    (round_key[0][c] << 24) | (round_key[1][c] << 16) | (round_key[2][c] << 8) | round_key[3][c]
+                )
+        return words
+
+    def cipher(self, _in: bytes) -> bytes:
         assert len(_in) == self._Nb * self._Nb
-        state = self._in_to_state(_in)
+        Te0, Te1, Te2, Te3, S = _Te0, _Te1, _Te2, _Te3, self._S_box
+        rk = self._round_key_words
 
-        self._add_round_key(state, self._round_keys[0])
+        s0 = ((_in[0] << 24) | (_in[4] << 16) | (_in[8] << 8) | _in[12]) ^ rk[0]
+        s1 = ((_in[1] << 24) | (_in[5] << 16) | (_in[9] << 8) | _in[13]) ^ rk[1]
+        s2 = ((_in[2] << 24) | (_in[6] << 16) | (_in[10] << 8) | _in[14]) ^ rk[2]
+        s3 = ((_in[3] << 24) | (_in[7] << 16) | (_in[11] << 8) | _in[15]) ^ rk[3]
 
-        for round in range(1, self._Nr):
-            self._sub_bytes(state)
-            self._shift_rows(state)
-            self._mix_columns(state, False)
-            self._add_round_key(state, self._round_keys[round])
+        for k in range(4, 4 * self._Nr, 4):
+            s0, s1, s2, s3 = \
+                Te0[s0 >> 24] ^ Te1[(s1 >> 16) & 0xff] ^ Te2[(s2 >> 8) & 0xff] ^ Te3[s3 & 0xff] ^ rk[k], \
+                Te0[s1 >> 24] ^ Te1[(s2 >> 16) & 0xff] ^ Te2[(s3 >> 8) & 0xff] ^ Te3[s0 & 0xff] ^ rk[k + 1], \
+                Te0[s2 >> 24] ^ Te1[(s3 >> 16) & 0xff] ^ Te2[(s0 >> 8) & 0xff] ^ Te3[s1 & 0xff] ^ rk[k + 2], \
+                Te0[s3 >> 24] ^ Te1[(s0 >> 16) & 0xff] ^ Te2[(s1 >> 8) & 0xff] ^ Te3[s2 & 0xff] ^ rk[k + 3]
 
-        self._sub_bytes(state)
-        self._shift_rows(state)
-        self._add_round_key(state, self._round_keys[-1])
+        t0 = (S[s0 >> 24] << 24) | (S[(s1 >> 16) & 0xff] << 16) | (S[(s2 >> 8) & 0xff] << 8) | S[s3 & 0xff]
+        t1 = (S[s1 >> 24] << 24) | (S[(s2 >> 16) & 0xff] << 16) | (S[(s3 >> 8) & 0xff] << 8) | S[s0 & 0xff]
+        t2 = (S[s2 >> 24] << 24) | (S[(s3 >> 16) & 0xff] << 16) | (S[(s0 >> 8) & 0xff] << 8) | S[s1 & 0xff]
+        t3 = (S[s3 >> 24] << 24) | (S[(s0 >> 16) & 0xff] << 16) | (S[(s1 >> 8) & 0xff] << 8) | S[s2 & 0xff]
 
-        return _AESEncryptor._state_to_out(state)
+        return _AESEncryptor._words_to_out(t0 ^ rk[-4], t1 ^ rk[-3], t2 ^ rk[-2], t3 ^ rk[-1])
 
-    def inv_cipher(self, _in: bytes):
-        assert len(_in) == self._Nb * self._Nb
+    @staticmethod
+    def _words_to_out(c0: int, c1: int, c2: int, c3: int) -> bytes:
+        return bytes((
+            c0 >> 24, c1 >> 24, c2 >> 24, c3 >> 24,
+            (c0 >> 16) & 0xff, (c1 >> 16) & 0xff, (c2 >> 16) & 0xff, (c3 >> 16) & 0xff,
+            (c0 >> 8) & 0xff, (c1 >> 8) & 0xff, (c2 >> 8) & 0xff, (c3 >> 8) & 0xff,
+            c0 & 0xff, c1 & 0xff, c2 & 0xff, c3 & 0xff
+        ))
 
-        state = self._in_to_state(_in)
+    @staticmethod
+    def _inv_key_expansion(round_key_words: List[int], Nr: int) -> List[int]:
+        Td0, Td1, Td2, Td3, S = _Td0, _Td1, _Td2, _Td3, _AESEncryptor._S_box
+        result = list(round_key_words[4 * Nr:])
+        for round in reversed(range(1, Nr)):
+            for w in round_key_words[4 * round:4 * (round + 1)]:
+                result.append(Td0[S[w >> 24]] ^ Td1[S[(w >> 16) & 0xff]] ^ Td2[S[(w >> 8) & 0xff]] ^ Td3[S[w & 0xff]])
+        result.extend(round_key_words[:4])
+        return result
 
-        self._add_round_key(state, self._round_keys[-1])
-        self._inv_shift_rows(state)
-        self._inv_sub_bytes(state)
+    def inv_cipher(self, _in: bytes) -> bytes:
+        assert len(_in) == self._Nb * self._Nb
+        Td0, Td1, Td2, Td3, S = _Td0, _Td1, _Td2, _Td3, self._inv_S_box
+        rk = self._inv_round_key_words
 
-        for round in reversed(range(1, self._Nr)):
-            self._add_round_key(state, self._round_keys[round])
-            self._mix_columns(state, True)
-            self._inv_shift_rows(state)
-            self._inv_sub_bytes(state)
+        s0 = ((_in[0] << 24) | (_in[4] << 16) | (_in[8] << 8) | _in[12]) ^ rk[0]
+        s1 = ((_in[1] << 24) | (_in[5] << 16) | (_in[9] << 8) | _in[13]) ^ rk[1]
+        s2 = ((_in[2] << 24) | (_in[6] << 16) | (_in[10] << 8) | _in[14]) ^ rk[2]
+        s3 = ((_in[3] << 24) | (_in[7] << 16) | (_in[11] << 8) | _in[15]) ^ rk[3]
+
+        for k in range(4, 4 * self._Nr, 4):
+            s0, s1, s2, s3 = \
+                Td0[s0 >> 24] ^ Td1[(s3 >> 16) & 0xff] ^ Td2[(s2 >> 8) & 0xff] ^ Td3[s1 & 0xff] ^ rk[k], \
+                Td0[s1 >> 24] ^ Td1[(s0 >> 16) & 0xff] ^ Td2[(s3 >> 8) & 0xff] ^ Td3[s2 & 0xff] ^ rk[k + 1], \
+                Td0[s2 >> 24] ^ Td1[(s1 >> 16) & 0xff] ^ Td2[(s0 >> 8) & 0xff] ^ Td3[s3 & 0xff] ^ rk[k + 2], \
+                Td0[s3 >> 24] ^ Td1[(s2 >> 16) & 0xff] ^ Td2[(s1 >> 8) & 0xff] ^ Td3[s0 & 0xff] ^ rk[k + 3]
 
-        self._add_round_key(state, self._round_keys[0])
+        t0 = (S[s0 >> 24] << 24) | (S[(s3 >> 16) & 0xff] << 16) | (S[(s2 >> 8) & 0xff] << 8) | S[s1 & 0xff]
+        t1 = (S[s1 >> 24] << 24) | (S[(s0 >> 16) & 0xff] << 16) | (S[(s3 >> 8) & 0xff] << 8) | S[s2 & 0xff]
+        t2 = (S[s2 >> 24] << 24) | (S[(s1 >> 16) & 0xff] << 16) | (S[(s0 >> 8) & 0xff] << 8) | S[s3 & 0xff]
+        t3 = (S[s3 >> 24] << 24) | (S[(s2 >> 16) & 0xff] << 16) | (S[(s1 >> 8) & 0xff] << 8) | S[s0 & 0xff]
 
-        return _AESEncryptor._state_to_out(state)
+        return _AESEncryptor._words_to_out(t0 ^ rk[-4], t1 ^ rk[-3], t2 ^ rk[-2], t3 ^ rk[-1])
 
     @staticmethod
     def _in_to_state(_in: bytes) -> _State:
@@ -401,35 +1402,10 @@ class _AESEncryptor:
     @staticmethod
     def _mix_column(column, isInv):
         if isInv:
-            mult = [14, 9, 13, 11]
+            matrix = _AESEncryptor._inv_mix_columns_matrix
         else:
-            mult = [2, 1, 1, 3]
-        cpy = list(column)
-        g = _AESEncryptor._galois_multiplication
-
-        column[0] = g(cpy[0], mult[0]) ^ g(cpy[3], mult[1]) ^ \
-                    g(cpy[2], mult[2]) ^ g(cpy[1], mult[3])
-        column[1] = g(cpy[1], mult[0]) ^ g(cpy[0], mult[1]) ^ \
-                    g(cpy[3], mult[2]) ^ g(cpy[2], mult[3])
-        column[2] = g(cpy[2], mult[0]) ^ g(cpy[1], mult[1]) ^ \
-                    g(cpy[0], mult[2]) ^ g(cpy[3], mult[3])
-        column[3] = g(cpy[3], mult[0]) ^ g(cpy[2], mult[1]) ^ \
-                    g(cpy[1], mult[2]) ^ g(cpy[0], mult[3])
-        return column
-
-    @staticmethod
-    def _galois_multiplication(a, b):
-        p = 0
-        for counter in range(8):
-            if b & 1:
-                p ^= a
-            hi_bit_set = a & 0x80
-            a <<= 1
-            a &= 0xff
-            if hi_bit_set:
-                a ^= 0x1b
-            b >>= 1
-        return p
+            matrix = _AESEncryptor._mix_columns_matrix
+        return galois.AES_FIELD.multiply_matrix(matrix, column)
 
     @staticmethod
     def _add_round_key(state: _State, w: List[_Word]) -> None:
@@ -480,5 +1456,324 @@ class _AESEncryptor:
         return result
 
 
+def _t_tables(S_box: _SBox, coefficients: List[int]) -> Tuple[Tuple[int], ...]:
+    g = galois.AES_FIELD.multiply
+    a, b, c, d = coefficients
+    t0 = tuple((g(s, a) << 24) | (g(s, b) << 16) | (g(s, c) << 8) | g(s, d) for s in S_box)
+    rotated = [t0]
+    for _ in range(3):
+        rotated.append(tuple(((t >> 8) | (t << 24)) & 0xffffffff for t in rotated[-1]))
+    return tuple(rotated)
+
+
+_Te0, _Te1, _Te2, _Te3 = _t_tables(_AESEncryptor._S_box, [2, 1, 1, 3])
+_Td0, _Td1, _Td2, _Td3 = _t_tables(_AESEncryptor._inv_S_box, [14, 9, 13, 11])
+
+
+class _AESVectorEncryptor:
+    def __init__(self, encryptor: _AESEncryptor) -> None:
+        assert np is not None
+        self._Nr = encryptor._Nr
+        self._round_key_words = np.array(encryptor._round_key_words, dtype=np.uint32)
+        self._inv_round_key_words = np.array(encryptor._inv_round_key_words, dtype=np.uint32)
+
+    def cipher_blocks(self, data: bytes) -> bytes:
+        return self._process_chunks(data, self._encrypt_columns, self._round_key_words)
+
+    def inv_cipher_blocks(self, data: bytes) -> bytes:
+        return self._process_chunks(data, self._decrypt_columns, self._inv_round_key_words)
+
+    def ctr(self, data: bytes, counter: int) -> bytes:
+        result = []
+        for start in range(0, len(data), _VECTORIZED_CHUNK):
+            chunk = np.frombuffer(data, dtype=np.uint8, count=min(_VECTORIZED_CHUNK, len(data) - start), offset=start)
+            n_blocks = (len(chunk) + 15) // 16
+            counters = self._counter_blocks(counter + start // 16, n_blocks)
+            columns = self._encrypt_columns(self._to_columns(counters), self._round_key_words, self._Nr)
+            keystream = self._from_columns(columns)
+            result.append((chunk ^ keystream.reshape(-1)[:len(chunk)]).tobytes())
+        return b''.join(result)
+
+    def _process_chunks(self, data: bytes, process, rk) -> bytes:
+        assert len(data) % 16 == 0
+        result = []
+        for start in range(0, len(data), _VECTORIZED_CHUNK):
+            count = min(_VECTORIZED_CHUNK, len(data) - start)
+            blocks = np.frombuffer(data, dtype=np.uint8, count=count, offset=start).reshape(-1, 16)
+            result.append(self._from_columns(process(self._to_columns(blocks), rk, self._Nr)).tobytes())
+        return b''.join(result)
+
+    @staticmethod
+    def _counter_blocks(counter: int, n_blocks: int):
+        counter &= (1 << 128) - 1
+        high = np.uint64(counter >> 64)
+        low = np.uint64(counter & 0xffffffffffffffff)
+        lows = low + np.arange(n_blocks, dtype=np.uint64)
+        highs = high + (lows < low).astype(np.uint64)
+        return np.stack([highs, lows], axis=1).astype('>u8').view(np.uint8).reshape(-1, 16)
+
+    @staticmethod
+    def _to_columns(blocks):
+        columns = np.ascontiguousarray(blocks.reshape(-1, 4, 4).transpose(0, 2, 1)).view('>u4')
+        return [columns[:, c].astype(np.uint32) for c in range(4)]
+
+    @staticmethod
+    def _from_columns(columns):
+        stacked = np.stack(columns, axis=1).astype('>u4').view(np.uint8).reshape(-1, 4, 4)
+        return np.ascontiguousarray(stacked.transpose(0, 2, 1)).reshape(-1, 16)
+
+    @staticmethod
+    def _encrypt_columns(columns, rk, Nr: int):
+        Te0, Te1, Te2, Te3, S = _Te0_array, _Te1_array, _Te2_array, _Te3_array, _S_box_array
+        s0, s1, s2, s3 = (columns[c] ^ rk[c] for c in range(4))
+
+        for k in range(4, 4 * Nr, 4):
+            s0, s1, s2, s3 = \
+                Te0[s0 >> 24] ^ Te1[(s1 >> 16) & 0xff] ^ Te2[(s2 >> 8) & 0xff] ^ Te3[s3 & 0xff] ^ rk[k], \
+                Te0[s1 >> 24] ^ Te1[(s2 >> 16) & 0xff] ^ Te2[(s3 >> 8) & 0xff] ^ Te3[s0 & 0xff] ^ rk[k + 1], \
+                Te0[s2 >> 24] ^ Te1[(s3 >> 16) & 0xff] ^ Te2[(s0 >> 8) & 0xff] ^ Te3[s1 & 0xff] ^ rk[k + 2], \
+                Te0[s3 >> 24] ^ Te1[(s0 >> 16) & 0xff] ^ Te2[(s1 >> 8) & 0xff] ^ Te3[s2 & 0xff] ^ rk[k + 3]
+
+        return [
+            ((S[s0 >> 24] << 24) | (S[(s1 >> 16) & 0xff] << 16) | (S[(s2 >> 8) & 0xff] << 8) | S[s3 & 0xff]) ^ rk[-4],
+            ((S[s1 >> 24] << 24) | (S[(s2 >> 16) & 0xff] << 16) | (S[(s3 >> 8) & 0xff] << 8) | S[s0 & 0xff]) ^ rk[-3],
+            ((S[s2 >> 24] << 24) | (S[(s3 >> 16) & 0xff] << 16) | (S[(s0 >> 8) & 0xff] << 8) | S[s1 & 0xff]) ^ rk[-2],
+            ((S[s3 >> 24] << 24) | (S[(s0 >> 16) & 0xff] << 16) | (S[(s1 >> 8) & 0xff] << 8) | S[s2 & 0xff]) ^ rk[-1]
+        ]
+
+    @staticmethod
+    def _decrypt_columns(columns, rk, Nr: int):
+        Td0, Td1, Td2, Td3, S = _Td0_array, _Td1_array, _Td2_array, _Td3_array, _inv_S_box_array
+        s0, s1, s2, s3 = (columns[c] ^ rk[c] for c in range(4))
+
+        for k in range(4, 4 * Nr, 4):
+            s0, s1, s2, s3 = \
+                Td0[s0 >> 24] ^ Td1[(s3 >> 16) & 0xff] ^ Td2[(s2 >> 8) & 0xff] ^ Td3[s1 & 0xff] ^ rk[k], \
+                Td0[s1 >> 24] ^ Td1[(s0 >> 16) & 0xff] ^ Td2[(s3 >> 8) & 0xff] ^ Td3[s2 & 0xff] ^ rk[k + 1], \
+                Td0[s2 >> 24] ^ Td1[(s1 >> 16) & 0xff] ^ Td2[(s0 >> 8) & 0xff] ^ Td3[s3 & 0xff] ^ rk[k + 2], \
+                Td0[s3 >> 24] ^ Td1[(s2 >> 16) & 0xff] ^ Td2[(s1 >> 8) & 0xff] ^ Td3[s0 & 0xff] ^ rk[k + 3]
+
+        return [
+            ((S[s0 >> 24] << 24) | (S[(s3 >> 16) & 0xff] << 16) | (S[(s2 >> 8) & 0xff] << 8) | S[s1 & 0xff]) ^ rk[-4],
+            ((S[s1 >> 24] << 24) | (S[(s0 >> 16) & 0xff] << 16) | (S[(s3 >> 8) & 0xff] << 8) | S[s2 & 0xff]) ^ rk[-3],
+            ((S[s2 >> 24] << 24) | (S[(s1 >> 16) & 0xff] << 16) | (S[(s0 >> 8) & 0xff] << 8) | S[s3 & 0xff]) ^ rk[-2],
+            ((S[s3 >> 24] << 24) | (S[(s2 >> 16) & 0xff] << 16) | (S[(s1 >> 8) & 0xff] << 8) | S[s0 & 0xff]) ^ rk[-1]
+        ]
+
+
+class _AESMultiKeyVectorEncryptor:
+    def __init__(self, encryptors: List[_AESEncryptor]) -> None:
+        assert np is not None
+        self._Nr = encryptors[0]._Nr
+        self._round_key_words = np.array([encryptor._round_key_words for encryptor in encryptors], dtype=np.uint32)
+        self._inv_round_key_words = np.array(
+            [encryptor._inv_round_key_words for encryptor in encryptors], dtype=np.uint32
+        )
+
+    def cipher_blocks(self, data: _Buffer, key_indices: List[int]) -> bytes:
+        return self._process_chunks(data, key_indices, _AESVectorEncryptor._encrypt_columns, self._round_key_words)
+
+    def inv_cipher_blocks(self, data: _Buffer, key_indices: List[int]) -> bytes:
+        return self._process_chunks(data, key_indices, _AESVectorEncryptor._decrypt_columns, self._inv_round_key_words)
+
+    def _process_chunks(self, data: _Buffer, key_indices: List[int], process, round_key_words) -> bytes:
+        assert len(data) % 16 == 0
+        key_indices = np.asarray(key_indices, dtype=np.intp)
+        result = []
+        for start in range(0, len(data), _VECTORIZED_CHUNK):
+            count = min(_VECTORIZED_CHUNK, len(data) - start)
+            blocks = np.frombuffer(data, dtype=np.uint8, count=count, offset=start).reshape(-1, 16)
+            rk = round_key_words[key_indices[start // 16:(start + count) // 16]].T[:, :, np.newaxis]
+            columns = process(_AESVectorEncryptor._to_columns(blocks), rk, self._Nr)
+            result.append(_AESVectorEncryptor._from_columns(columns).tobytes())
+        return b''.join(result)
+
+
+class _AESBitslicedEncryptor:
+    def __init__(self, encryptor: _AESEncryptor) -> None:
+        self._Nr = encryptor._Nr
+        self._round_keys = [bytes(sum(round_key, [])) for round_key in encryptor._round_keys]
+        self._round_key_planes = {}
+
+    def cipher_blocks(self, data: _Buffer) -> bytes:
+        return self._process_batches(data, self._encrypt_planes)
+
+    def inv_cipher_blocks(self, data: _Buffer) -> bytes:
+        return self._process_batches(data, self._decrypt_planes)
+
+    def ctr(self, data: _Buffer, counter: int) -> bytes:
+        n_blocks = (len(data) + 15) // 16
+        counters = b''.join(((counter + i) & _COUNTER_MASK).to_bytes(16, 'big') for i in range(n_blocks))
+        return _BaseAES._xor_bytes(data, self.cipher_blocks(counters))
+
+    def _process_batches(self, data: _Buffer, process: Callable[[List[int], int], List[int]]) -> bytes:
+        assert len(data) % 16 == 0
+        result = []
+        for start in range(0, len(data), 16 * _BITSLICE_BLOCKS):
+            batch = bytes(data[start:start + 16 * _BITSLICE_BLOCKS])
+            n = len(batch) // 16
+            result.append(self._from_planes(process(self._to_planes(batch), n), n))
+        return b''.join(result)
+
+    @staticmethod
+    def _to_planes(batch: bytes) -> List[int]:
+        columns = [batch[p::16] for p in reversed(range(16))]
+        return [int(b''.join(column.translate(table) for column in columns), 2) for table in _BITSLICE_BIT_TABLES]
+
+    @staticmethod
+    def _from_planes(planes: List[int], n: int) -> bytes:
+        width = 16 * n
+        combined = 0
+        for b, plane in enumerate(planes):
+            combined |= int.from_bytes(format(plane, '0{}b'.format(width)).encode().translate(_BITSLICE_BYTE_TABLE),
+                                       'big') << b
+        transposed = combined.to_bytes(width, 'big')
+
+        result = bytearray(width)
+        for p in range(16):
+            result[p::16] = transposed[(15 - p) * n:(16 - p) * n]
+        return bytes(result)
+
+    def _key_planes(self, n: int) -> List[List[int]]:
+        planes = self._round_key_planes.get(n)
+        if planes is None:
+            lane = (1 << n) - 1
+            planes = [
+                [sum(lane << (p * n) for p in range(16) if (round_key[p] >> b) & 1) for b in range(8)]
+                for round_key in self._round_keys
+            ]
+            self._round_key_planes[n] = planes
+        return planes
+
+    def _encrypt_planes(self, planes: List[int], n: int) -> List[int]:
+        keys = self._key_planes(n)
+        full = (1 << (16 * n)) - 1
+        shifts = _bitsliced_shift_rows_masks(n, 1)
+
+        planes = [a ^ k for a, k in zip(planes, keys[0])]
+        for round in range(1, self._Nr):
+            planes = self._shift_rows(self._sub_bytes(planes, full), shifts)
+            planes = [a ^ k for a, k in zip(self._mix_columns(planes, n, full), keys[round])]
+        planes = self._shift_rows(self._sub_bytes(planes, full), shifts)
+        return [a ^ k for a, k in zip(planes, keys[-1])]
+
+    def _decrypt_planes(self, planes: List[int], n: int) -> List[int]:
+        keys = self._key_planes(n)
+        full = (1 << (16 * n)) - 1
+        shifts = _bitsliced_shift_rows_masks(n, 3)
+
+        planes = [a ^ k for a, k in zip(planes, keys[-1])]
+        planes = self._inv_sub_bytes(self._shift_rows(planes, shifts), full)
+        for round in reversed(range(1, self._Nr)):
+            planes = self._inv_mix_columns([a ^ k for a, k in zip(planes, keys[round])], n, full)
+            planes = self._inv_sub_bytes(self._shift_rows(planes, shifts), full)
+        return [a ^ k for a, k in zip(planes, keys[0])]
+
+    @staticmethod
+    def _sub_bytes(a: List[int], full: int) -> List[int]:
+        x = _AESBitslicedEncryptor._inverse(a)
+        return [
+            x[i] ^ x[(i + 4) % 8] ^ x[(i + 5) % 8] ^ x[(i + 6) % 8] ^ x[(i + 7) % 8] ^ (full if (0x63 >> i) & 1 else 0)
+            for i in range(8)
+        ]
+
+    @staticmethod
+    def _inv_sub_bytes(a: List[int], full: int) -> List[int]:
+        x = [a[(i + 2) % 8] ^ a[(i + 5) % 8] ^ a[(i + 7) % 8] ^ (full if (0x05 >> i) & 1 else 0) for i in range(8)]
+        return _AESBitslicedEncryptor._inverse(x)
+
+    @staticmethod
+    def _inverse(x: List[int]) -> List[int]:
+        multiply, square = _AESBitslicedEncryptor._multiply, _AESBitslicedEncryptor._square
+        x2 = square(x)
+        x3 = multiply(x2, x)
+        x12 = square(square(x3))
+        x15 = multiply(x12, x3)
+        x240 = square(square(square(square(x15))))
+        return multiply(multiply(x240, x12), x2)
+
+    @staticmethod
+    def _multiply(a: List[int], b: List[int]) -> List[int]:
+        c = [0] * 15
+        for i in range(8):
+            ai = a[i]
+            for j in range(8):
+                c[i + j] ^= ai & b[j]
+        return _AESBitslicedEncryptor._reduce(c)
+
+    @staticmethod
+    def _square(a: List[int]) -> List[int]:
+        c = [0] * 15
+        for i in range(8):
+            c[2 * i] = a[i]
+        return _AESBitslicedEncryptor._reduce(c)
+
+    @staticmethod
+    def _reduce(c: List[int]) -> List[int]:
+        for k in range(14, 7, -1):
+            ck = c[k]
+            c[k - 4] ^= ck
+            c[k - 5] ^= ck
+            c[k - 7] ^= ck
+            c[k - 8] ^= ck
+        return c[:8]
+
+    @staticmethod
+    def _shift_rows(planes: List[int], shifts: List[Tuple[int, int]]) -> List[int]:
+        result = []
+        for a in planes:
+            shifted = 0
+            for shift, mask in shifts:
+                shifted |= ((a << shift) if shift >= 0 else (a >> -shift)) & mask
+            result.append(shifted)
+        return result
+
+    @staticmethod
+    def _mix_columns(a: List[int], n: int, full: int) -> List[int]:
+        rotate = _AESBitslicedEncryptor._rotate_rows
+        a1 = [rotate(x, 1, n, full) for x in a]
+        a2 = [rotate(x, 2, n, full) for x in a]
+        a3 = [rotate(x, 3, n, full) for x in a]
+        doubled = _AESBitslicedEncryptor._xtime([x ^ y for x, y in zip(a, a1)])
+        return [d ^ x ^ y ^ z for d, x, y, z in zip(doubled, a1, a2, a3)]
+
+    @staticmethod
+    def _inv_mix_columns(a: List[int], n: int, full: int) -> List[int]:
+        xtime, rotate = _AESBitslicedEncryptor._xtime, _AESBitslicedEncryptor._rotate_rows
+        uv = xtime(xtime([x ^ rotate(x, 2, n, full) for x in a]))
+        return _AESBitslicedEncryptor._mix_columns([x ^ y for x, y in zip(a, uv)], n, full)
+
+    @staticmethod
+    def _rotate_rows(x: int, rows: int, n: int, full: int) -> int:
+        return ((x >> (4 * rows * n)) | (x << (4 * (4 - rows) * n))) & full
+
+    @staticmethod
+    def _xtime(a: List[int]) -> List[int]:
+        return [a[7], a[0] ^ a[7], a[1], a[2] ^ a[7], a[3] ^ a[7], a[4], a[5], a[6]]
+
+
+def _bitsliced_shift_rows_masks(n: int, direction: int) -> List[Tuple[int, int]]:
+    lane = (1 << n) - 1
+    masks = {}
+    for r in range(4):
+        for c in range(4):
+            source = 4 * r + (c + direction * r) % 4
+            destination = 4 * r + c
+            shift = (destination - source) * n
+            masks[shift] = masks.get(shift, 0) | (lane << (destination * n))
+    return list(masks.items())
+
+
+_BITSLICE_BIT_TABLES = [bytes(0x30 + ((v >> b) & 1) for v in range(256)) for b in range(8)]
+_BITSLICE_BYTE_TABLE = bytes.maketrans(b'01', b'\x00\x01')
+
+
+if np is not None:
+    _Te0_array, _Te1_array, _Te2_array, _Te3_array = (np.array(t, dtype=np.uint32) for t in (_Te0, _Te1, _Te2, _Te3))
+    _Td0_array, _Td1_array, _Td2_array, _Td3_array = (np.array(t, dtype=np.uint32) for t in (_Td0, _Td1, _Td2, _Td3))
+    _S_box_array = np.array(_AESEncryptor._S_box, dtype=np.uint32)
+    _inv_S_box_array = np.array(_AESEncryptor._inv_S_box, dtype=np.uint32)
+
+
 if __name__ == '__main__':
     pass
@@ -1,5 +1,9 @@
+import mmap
 import unittest
+from unittest import mock
+
 import aes
+import cipher_base
 
 
 def _default_key() -> bytes:
@@ -10,6 +14,48 @@ def _default_iv() -> bytes:
     return b'\x00\x01\x02\x03\x04\x05\x06\x07\x08\x09\x0a\x0b\x0c\x0d\x0e\x0f'
 
 
+def _feed(context, data: bytes) -> bytes:
+    chunk_sizes = [0, 1, 15, 16, 17, 5, 32, 3, 48, 100]
+    output = []
+    position = 0
+    i = 0
+    while position < len(data):
+        size = chunk_sizes[i % len(chunk_sizes)]
+        output.append(context.update(data[position:position + size]))
+        position += size
+        i += 1
+    output.append(context.finalize())
+    return b''.join(output)
+
+
+def _reference_cipher(encryptor, _in: bytes) -> bytes:
+    state = encryptor._in_to_state(_in)
+    encryptor._add_round_key(state, encryptor._round_keys[0])
+    for round in range(1, encryptor._Nr):
+        encryptor._sub_bytes(state)
+        encryptor._shift_rows(state)
+        encryptor._mix_columns(state, False)
+        encryptor._add_round_key(state, encryptor._round_keys[round])
+    encryptor._sub_bytes(state)
+    encryptor._shift_rows(state)
+    encryptor._add_round_key(state, encryptor._round_keys[-1])
+    return encryptor._state_to_out(state)
+
+
+def _reference_inv_cipher(encryptor, _in: bytes) -> bytes:
+    state = encryptor._in_to_state(_in)
+    encryptor._add_round_key(state, encryptor._round_keys[-1])
+    encryptor._inv_shift_rows(state)
+    encryptor._inv_sub_bytes(state)
+    for round in reversed(range(1, encryptor._Nr)):
+        encryptor._add_round_key(state, encryptor._round_keys[round])
+        encryptor._mix_columns(state, True)
+        encryptor._inv_shift_rows(state)
+        encryptor._inv_sub_bytes(state)
+    encryptor._add_round_key(state, encryptor._round_keys[0])
+    return encryptor._state_to_out(state)
+
+
 class TestEncryptDecryptKeyLength(unittest.TestCase):
     _plaintext = b'The Advanced Encryption Standard Rijndael (AES), also known by its original name (Dutch pronunciation),[3] is a specification for the encryption of electronic data established by the U.S. National Institute of Standards and Technology (NIST) in 2001'
 
@@ -89,17 +135,825 @@ class TestAESEncryptDecrypt(unittest.TestCase):
     def _helper_test_encrypt_decrypt(self, encryptor, iv=None):
         for plaintext in self._tests:
             if iv is None:
-                self.assertEqual(plaintext, encryptor._decrypt_block(encryptor._encrypt_block(plaintext)))
+                self.assertEqual(plaintext, encryptor.decrypt(encryptor.encrypt(plaintext)))
             else:
-                self.assertEqual(plaintext, encryptor._decrypt_block(encryptor._encrypt_block(plaintext, iv), iv))
+                self.assertEqual(plaintext, encryptor.decrypt(encryptor.encrypt(plaintext, iv), iv))
 
     def _helper_test_encrypt_decrypt_loop(self, encryptor, iv=None):
         for plaintext_length in range(1, 100):
             plaintext = b'a' * plaintext_length
             if iv is None:
-                self.assertEqual(plaintext, encryptor._decrypt_block(encryptor._encrypt_block(plaintext)))
+                self.assertEqual(plaintext, encryptor.decrypt(encryptor.encrypt(plaintext)))
             else:
-                self.assertEqual(plaintext, encryptor._decrypt_block(encryptor._encrypt_block(plaintext, iv), iv))
+                self.assertEqual(plaintext, encryptor.decrypt(encryptor.encrypt(plaintext, iv), iv))
+
+
+@unittest.skipIf(aes.np is None, 'numpy is not installed')
+class TestAESVectorEncryptor(unittest.TestCase):
+    _data = bytes((i * 131 + 7) % 256 for i in range(16 * 300))
+
+    def test_cipher_blocks(self):
+        for key_length in (16, 24, 32):
+            encryptor = aes._AESEncryptor(bytes(range(key_length)))
+            vectorized = aes._AESVectorEncryptor(encryptor)
+            expected = b''.join(encryptor.cipher(block) for block in aes._BaseAES._split_blocks(self._data))
+            self.assertEqual(expected, vectorized.cipher_blocks(self._data))
+            self.assertEqual(self._data, vectorized.inv_cipher_blocks(expected))
+
+    def test_ctr(self):
+        encryptor = aes._AESEncryptor(_default_key())
+        vectorized = aes._AESVectorEncryptor(encryptor)
+        for iv in (_default_iv(), b'\x00' * 8 + b'\xff' * 8, b'\xff' * 16):
+            data = self._data[:-5]
+            expected = []
+            counter = iv
+            for block in aes._BaseAES._split_blocks(data, require_padding=False):
+                expected.append(aes._BaseAES._xor_bytes(block, encryptor.cipher(counter)))
+                counter = aes._BaseAES._inc_bytes(counter)
+            self.assertEqual(b''.join(expected), vectorized.ctr(data, int.from_bytes(iv, 'big')))
+
+    def test_modes_above_threshold(self):
+        plaintext = self._data + b'tail'
+        self.assertGreater(len(plaintext), aes._VECTORIZED_THRESHOLD)
+        algorithms = [
+            (aes.AES_ECB(key=_default_key()), ()),
+            (aes.AES_CBC(key=_default_key()), (_default_iv(),)),
+            (aes.AES_CFB(key=_default_key()), (_default_iv(),)),
+            (aes.AES_CTR(key=_default_key()), (_default_iv(),))
+        ]
+        for algorithm, args in algorithms:
+            ciphertext = algorithm.encrypt(plaintext, *args)
+            self.assertEqual(plaintext, algorithm.decrypt(ciphertext, *args))
+            self.assertIsNotNone(algorithm._vector_encryptor)
+
+
+class TestAESBitslicedEncryptor(unittest.TestCase):
+    _data = bytes((i * 71 + 5) % 256 for i in range(16 * 37))
+
+    def test_transpose(self):
+        bitsliced = aes._AESBitslicedEncryptor
+        self.assertEqual(self._data, bitsliced._from_planes(bitsliced._to_planes(self._data), 37))
+
+    def test_sub_bytes(self):
+        bitsliced = aes._AESBitslicedEncryptor
+        values = bytes(range(256))
+        planes = bitsliced._to_planes(values)
+        full = (1 << 256) - 1
+        self.assertEqual(bytes(aes._AESEncryptor._S_box[v] for v in values),
+                         bitsliced._from_planes(bitsliced._sub_bytes(planes, full), 16))
+        self.assertEqual(bytes(aes._AESEncryptor._inv_S_box[v] for v in values),
+                         bitsliced._from_planes(bitsliced._inv_sub_bytes(planes, full), 16))
+
+    def test_cipher_blocks(self):
+        for key_length in (16, 24, 32):
+            encryptor = aes._AESEncryptor(bytes(range(key_length)))
+            expected = b''.join(encryptor.cipher(self._data[i:i + 16]) for i in range(0, len(self._data), 16))
+            with mock.patch.object(aes, '_BITSLICE_BLOCKS', 8):
+                bitsliced = aes._AESBitslicedEncryptor(encryptor)
+                self.assertEqual(expected, bitsliced.cipher_blocks(self._data))
+                self.assertEqual(self._data, bitsliced.inv_cipher_blocks(expected))
+
+    def test_modes(self):
+        for mode, args in ((aes.AES_ECB, ()), (aes.AES_CTR, (_default_iv(),)), (aes.AES_CTR, (b'\xff' * 16,))):
+            plaintext = self._data[:-3]
+            ciphertext = mode(key=_default_key()).encrypt(plaintext, *args)
+            algorithm = mode(key=_default_key(), backend='bitsliced')
+            self.assertEqual(ciphertext, algorithm.encrypt(plaintext, *args))
+            self.assertEqual(plaintext, algorithm.decrypt(ciphertext, *args))
+            self.assertIsNotNone(algorithm._bitsliced_encryptor)
+
+    def test_invalid_backend(self):
+        with self.assertRaises(AssertionError):
+            aes.AES_ECB(key=_default_key(), backend='gpu')
+
+
+class _RecordingPool:
+    def __init__(self) -> None:
+        self.submitted = 0
+        self.pending = 0
+        self.max_pending = 0
+
+    def submit(self, function, *args):
+        self.submitted += 1
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        return _RecordingFuture(self, function(*args))
+
+    def shutdown(self) -> None:
+        pass
+
+
+class _RecordingFuture:
+    def __init__(self, pool: _RecordingPool, result) -> None:
+        self._pool = pool
+        self._result = result
+
+    def result(self):
+        self._pool.pending -= 1
+        return self._result
+
+
+class TestAESParallel(unittest.TestCase):
+    _data = bytes((i * 131 + 7) % 256 for i in range(16 * 40 + 9))
+
+    def test_bounded_window(self):
+        serial = aes.AES_CTR(key=_default_key())
+        parallel = aes.AES_CTR(key=_default_key(), workers=2)
+        parallel._pool = _RecordingPool()
+        with mock.patch.object(cipher_base, 'PARALLEL_CHUNK', 32), \
+                mock.patch.object(cipher_base, '_worker_mode', serial):
+            self.assertEqual(serial.encrypt(self._data, _default_iv()), parallel.encrypt(self._data, _default_iv()))
+        self.assertEqual(21, parallel._pool.submitted)
+        self.assertEqual(4, parallel._pool.max_pending)
+
+    def test_ctr(self):
+        serial = aes.AES_CTR(key=_default_key())
+        for iv in (_default_iv(), b'\xff' * 16):
+            with mock.patch.object(cipher_base, 'PARALLEL_CHUNK', 64), \
+                    aes.AES_CTR(key=_default_key(), workers=2) as parallel:
+                ciphertext = parallel.encrypt(self._data, iv)
+                self.assertEqual(serial.encrypt(self._data, iv), ciphertext)
+                self.assertEqual(self._data, parallel.decrypt(ciphertext, iv))
+
+    def test_cbc_decrypt(self):
+        self._helper_test_parallel_decrypt(aes.AES_CBC)
+
+    def test_cfb_decrypt(self):
+        self._helper_test_parallel_decrypt(aes.AES_CFB)
+
+    def test_chained_window(self):
+        for mode in (aes.AES_CBC, aes.AES_CFB):
+            serial = mode(key=_default_key())
+            ciphertext = serial.encrypt(self._data, _default_iv())
+            parallel = mode(key=_default_key(), workers=2)
+            parallel._pool = _RecordingPool()
+            with mock.patch.object(cipher_base, 'PARALLEL_CHUNK', 32), \
+                    mock.patch.object(cipher_base, '_worker_mode', serial):
+                self.assertEqual(self._data, parallel.decrypt(ciphertext, _default_iv()))
+            self.assertEqual(4, parallel._pool.max_pending)
+
+        ciphertext = bytearray(aes.AES_CFB(key=_default_key()).encrypt(self._data, _default_iv()))
+        parallel = aes.AES_CFB(key=_default_key(), workers=2)
+        parallel._pool = _RecordingPool()
+        with mock.patch.object(cipher_base, 'PARALLEL_CHUNK', 32), \
+                mock.patch.object(cipher_base, '_worker_mode', aes.AES_CFB(key=_default_key())):
+            parallel.decrypt_inplace(ciphertext, _default_iv())
+        self.assertEqual(self._data, bytes(ciphertext))
+
+    def _helper_test_parallel_decrypt(self, mode):
+        ciphertext = mode(key=_default_key()).encrypt(self._data, _default_iv())
+        with mock.patch.object(cipher_base, 'PARALLEL_CHUNK', 64), mode(key=_default_key(), workers=2) as parallel:
+            self.assertEqual(self._data, parallel.decrypt(ciphertext, _default_iv()))
+            self.assertIsNotNone(parallel._pool)
+
+
+class TestAESCipherContext(unittest.TestCase):
+    def test_ecb(self):
+        self._helper_test_context(aes.AES_ECB(key=_default_key()))
+
+    def test_cbc(self):
+        self._helper_test_context(aes.AES_CBC(key=_default_key()), _default_iv())
+
+    def test_pcbc(self):
+        self._helper_test_context(aes.AES_PCBC(key=_default_key()), _default_iv())
+
+    def test_cfb(self):
+        self._helper_test_context(aes.AES_CFB(key=_default_key()), _default_iv())
+
+    def test_ofb(self):
+        self._helper_test_context(aes.AES_OFB(key=_default_key()), _default_iv())
+
+    def test_ctr(self):
+        self._helper_test_context(aes.AES_CTR(key=_default_key()), _default_iv())
+
+    def test_finalize_twice(self):
+        context = aes.AES_CBC(key=_default_key()).encryptor(_default_iv())
+        context.finalize()
+        with self.assertRaises(AssertionError):
+            context.finalize()
+        with self.assertRaises(AssertionError):
+            context.update(b'a')
+
+    def _helper_test_context(self, algorithm, iv=None):
+        args = () if iv is None else (iv,)
+        for length in (0, 1, 16, 31, 32, 200, 256):
+            plaintext = bytes((i * 7 + length) % 256 for i in range(length))
+            ciphertext = algorithm.encrypt(plaintext, *args)
+
+            encryptor = algorithm.encryptor(*args)
+            self.assertEqual(ciphertext, _feed(encryptor, plaintext))
+
+            decryptor = algorithm.decryptor(*args)
+            self.assertEqual(plaintext, _feed(decryptor, ciphertext))
+
+
+class TestAESKeystreamPrefetch(unittest.TestCase):
+    def test_ofb(self):
+        self._helper_test_prefetch(aes.AES_OFB(key=_default_key()))
+
+    def test_ctr(self):
+        self._helper_test_prefetch(aes.AES_CTR(key=_default_key()))
+
+    def test_ctr_wrap(self):
+        self._helper_test_prefetch(aes.AES_CTR(key=_default_key()), b'\xff' * 16)
+
+    def test_finalize_twice(self):
+        context = aes.AES_CTR(key=_default_key()).encryptor(_default_iv(), prefetch=True)
+        self.assertEqual(b'', context.finalize())
+        with self.assertRaises(AssertionError):
+            context.finalize()
+        with self.assertRaises(AssertionError):
+            context.update(b'a')
+
+    def test_generator_error(self):
+        def generate(data, state):
+            raise ValueError()
+
+        context = aes._KeystreamContext(generate, None, 16, 1)
+        with self.assertRaises(ValueError):
+            context.update(b'a')
+
+    def test_context_manager(self):
+        algorithm = aes.AES_CTR(key=_default_key())
+        with algorithm.encryptor(_default_iv(), prefetch=True) as context:
+            self.assertEqual(algorithm.encrypt(b'a' * 100, _default_iv()), context.update(b'a' * 100))
+        self.assertFalse(context._thread.is_alive())
+
+    def test_abandoned_context_stops_thread(self):
+        with mock.patch.object(aes, '_PREFETCH_CHUNK', 48), mock.patch.object(aes, '_PREFETCH_DEPTH', 2):
+            context = aes.AES_CTR(key=_default_key()).encryptor(_default_iv(), prefetch=True)
+        context.update(b'a' * 20)
+        thread = context._thread
+        del context
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+
+    def _helper_test_prefetch(self, algorithm, iv=_default_iv()):
+        for length in (0, 1, 16, 31, 200, 1000):
+            plaintext = bytes((i * 13 + length) % 256 for i in range(length))
+            ciphertext = algorithm.encrypt(plaintext, iv)
+
+            with mock.patch.object(aes, '_PREFETCH_CHUNK', 48), mock.patch.object(aes, '_PREFETCH_DEPTH', 2):
+                encryptor = algorithm.encryptor(iv, prefetch=True)
+                decryptor = algorithm.decryptor(iv, prefetch=True)
+            self.assertEqual(ciphertext, _feed(encryptor, plaintext))
+            self.assertEqual(plaintext, _feed(decryptor, ciphertext))
+
+
+class TestAESDecryptRange(unittest.TestCase):
+    _data = bytes((i * 29 + 3) % 256 for i in range(16 * 20 + 7))
+
+    def test_decrypt_range(self):
+        for iv in (_default_iv(), b'\xff' * 16):
+            algorithm = aes.AES_CTR(key=_default_key())
+            ciphertext = algorithm.encrypt(self._data, iv)
+            for offset, length in ((0, 0), (0, 16), (5, 3), (5, 11), (5, 40), (16, 32), (17, 200), (300, 27)):
+                expected = self._data[offset:offset + length]
+                self.assertEqual(expected, algorithm.decrypt_range(ciphertext, iv, offset, length))
+
+                out = bytearray(length)
+                self.assertEqual(length, algorithm.decrypt_range(memoryview(ciphertext), iv, offset, length, out))
+                self.assertEqual(expected, bytes(out))
+
+    def test_out_of_bounds(self):
+        with self.assertRaises(AssertionError):
+            aes.AES_CTR(key=_default_key()).decrypt_range(b'a' * 20, _default_iv(), 10, 11)
+
+
+def _bitwise_ghash_multiply(x: int, y: int) -> int:
+    z, v = 0, y
+    for i in reversed(range(128)):
+        if (x >> i) & 1:
+            z ^= v
+        v = (v >> 1) ^ (0xE1 << 120) if v & 1 else v >> 1
+    return z
+
+
+class TestAESGCM(unittest.TestCase):
+    _data = bytes((i * 37 + 11) % 256 for i in range(16 * 12 + 5))
+
+    def test_ghash_multiply(self):
+        for h in (1 << 127, 0x66e94bd4ef8a2c3b884cfa59ca342b2e, (1 << 128) - 1):
+            ghash = aes._GHash(aes._ghash_table(h))
+            for x in (0, 1, 1 << 127, 0x0388dace60b6a392f328c2b971b2fe78, (1 << 128) - 1, 0x1234 << 64):
+                self.assertEqual(_bitwise_ghash_multiply(x, h), ghash._multiply(x))
+
+    def test_ghash(self):
+        ghash = aes._GHash(aes._ghash_table(0x66e94bd4ef8a2c3b884cfa59ca342b2e))
+        ghash.update(aes._str_to_bytes('0388dace60b6a392f328c2b971b2fe78'))
+        ghash.update((128).to_bytes(16, 'big'))
+        self.assertEqual(aes._str_to_bytes('f38cbb1ad69223dcc3457ae5b6b0f885'), ghash.digest())
+
+    def test_encrypt_decrypt(self):
+        algorithm = aes.AES_GCM(key=_default_key())
+        ctr = aes.AES_CTR(key=_default_key())
+        for length in (0, 1, 16, 31, 197):
+            plaintext = self._data[:length]
+            for associated_data in (b'', b'header', bytes(40)):
+                ciphertext = algorithm.encrypt(plaintext, _default_iv()[:12], associated_data)
+                self.assertEqual(length + 16, len(ciphertext))
+                self.assertEqual(ctr.encrypt(plaintext, _default_iv()[:12] + b'\x00\x00\x00\x02'), ciphertext[:-16])
+                self.assertEqual(plaintext, algorithm.decrypt(ciphertext, _default_iv()[:12], associated_data))
+
+    def test_context(self):
+        algorithm = aes.AES_GCM(key=_default_key())
+        ciphertext = algorithm.encrypt(self._data, _default_iv()[:12], b'header')
+
+        encryptor = algorithm.encryptor(_default_iv()[:12], b'header')
+        self.assertEqual(ciphertext[:-16], _feed(encryptor, self._data))
+        self.assertEqual(ciphertext[-16:], encryptor.tag)
+
+        decryptor = algorithm.decryptor(_default_iv()[:12], ciphertext[-16:], b'header')
+        self.assertEqual(self._data, _feed(decryptor, ciphertext[:-16]))
+
+    def test_authentication(self):
+        algorithm = aes.AES_GCM(key=_default_key())
+        ciphertext = algorithm.encrypt(self._data, _default_iv()[:12], b'header')
+        tampered = bytearray(ciphertext)
+        tampered[7] ^= 1
+        for args in ((bytes(tampered), b'header'), (ciphertext, b'headers'), (ciphertext[:-1] + b'\x00', b'header')):
+            with self.assertRaises(aes.InvalidTag):
+                algorithm.decrypt(args[0], _default_iv()[:12], args[1])
+
+    def test_iv_length(self):
+        with self.assertRaises(AssertionError):
+            aes.AES_GCM(key=_default_key()).encrypt(b'a', _default_iv())
+
+
+class TestAESXTS(unittest.TestCase):
+    _key = _default_key() + _default_iv()
+    _data = bytes((i * 53 + 1) % 256 for i in range(16 * 32))
+
+    def test_encrypt_decrypt(self):
+        algorithm = aes.AES_XTS(key=self._key)
+        for length in (16, 17, 31, 32, 47, 100, 512):
+            plaintext = self._data[:length]
+            ciphertext = algorithm.encrypt(plaintext, 7)
+            self.assertEqual(length, len(ciphertext))
+            self.assertNotEqual(ciphertext, algorithm.encrypt(plaintext, 8))
+            self.assertEqual(plaintext, algorithm.decrypt(ciphertext, 7))
+
+    def test_ciphertext_stealing(self):
+        algorithm = aes.AES_XTS(key=self._key)
+        ciphertext = algorithm.encrypt(self._data[:40], 3)
+        self.assertEqual(algorithm.encrypt(self._data[:16], 3), ciphertext[:16])
+        self.assertEqual(algorithm.encrypt(self._data[:32], 3)[16:24], ciphertext[32:])
+
+    def test_sectors(self):
+        algorithm = aes.AES_XTS(key=self._key)
+        ciphertext = algorithm.encrypt_sectors(self._data, 100, 64)
+        for i in range(0, len(self._data), 64):
+            self.assertEqual(algorithm.encrypt(self._data[i:i + 64], 100 + i // 64), ciphertext[i:i + 64])
+        self.assertEqual(self._data, algorithm.decrypt_sectors(ciphertext, 100, 64))
+
+    def test_parallel_sectors(self):
+        ciphertext = aes.AES_XTS(key=self._key).encrypt_sectors(self._data, 5, 32)
+        with mock.patch.object(cipher_base, 'PARALLEL_CHUNK', 64), aes.AES_XTS(key=self._key, workers=2) as parallel:
+            self.assertEqual(ciphertext, parallel.encrypt_sectors(self._data, 5, 32))
+            self.assertEqual(self._data, parallel.decrypt_sectors(ciphertext, 5, 32))
+            self.assertIsNotNone(parallel._pool)
+
+    def test_sector_batches(self):
+        algorithm = aes.AES_XTS(key=self._key)
+        for sector_size in (32, 64, 512):
+            ciphertext = algorithm.encrypt_sectors(self._data, 9, sector_size)
+            with mock.patch.object(aes, '_SECTOR_BATCH', 96):
+                self.assertEqual(ciphertext, algorithm.encrypt_sectors(self._data, 9, sector_size))
+                self.assertEqual(self._data, algorithm.decrypt_sectors(ciphertext, 9, sector_size))
+
+    def test_parallel_window(self):
+        serial = aes.AES_XTS(key=self._key)
+        parallel = aes.AES_XTS(key=self._key, workers=2)
+        parallel._pool = _RecordingPool()
+        with mock.patch.object(cipher_base, 'PARALLEL_CHUNK', 32), \
+                mock.patch.object(cipher_base, '_worker_mode', serial):
+            self.assertEqual(serial.encrypt_sectors(self._data, 5, 32), parallel.encrypt_sectors(self._data, 5, 32))
+        self.assertEqual(16, parallel._pool.submitted)
+        self.assertEqual(4, parallel._pool.max_pending)
+
+    def test_tweaks(self):
+        algorithm = aes.AES_XTS(key=self._key)
+        with mock.patch.object(algorithm._tweak_encryptor, 'cipher', return_value=b'\x01' + b'\x00' * 14 + b'\xc0'):
+            tweaks = algorithm._tweaks(0, 3)
+        self.assertEqual(b'\x01' + b'\x00' * 14 + b'\xc0', tweaks[:16])
+        self.assertEqual(b'\x85' + b'\x00' * 14 + b'\x80', tweaks[16:32])
+        self.assertEqual(b'\x8d\x01' + b'\x00' * 14, tweaks[32:])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(AssertionError):
+            aes.AES_XTS(key=_default_key() * 2)
+        with self.assertRaises(AssertionError):
+            aes.AES_XTS(key=self._key).encrypt(b'a' * 15, 0)
+        with self.assertRaises(AssertionError):
+            aes.AES_XTS(key=self._key).encrypt_sectors(b'a' * 100, 0, 64)
+
+    def test_no_chaining_api(self):
+        algorithm = aes.AES_XTS(key=self._key)
+        for name in ('encryptor', 'decryptor', 'resume'):
+            self.assertFalse(hasattr(algorithm, name))
+
+    def test_generated_key_skips_cache(self):
+        with mock.patch.object(aes, 'key_schedule_cache', aes._KeyScheduleCache(16)) as cache:
+            algorithm = aes.AES_XTS(key_length=256)
+            self.assertEqual((0, 0, 0), (cache.hits, cache.misses, len(cache)))
+            plaintext = self._data[:100]
+            self.assertEqual(plaintext, algorithm.decrypt(algorithm.encrypt(plaintext, 1), 1))
+            aes.AES_XTS(key=self._key)
+            self.assertEqual((0, 2, 2), (cache.hits, cache.misses, len(cache)))
+
+
+def _reference_double(block: bytes) -> bytes:
+    shifted = bytes(((block[i] << 1) | (block[i + 1] >> 7 if i < 15 else 0)) & 0xff for i in range(16))
+    return shifted[:15] + bytes([shifted[15] ^ 0x87]) if block[0] & 0x80 else shifted
+
+
+def _reference_mac_pad(last: bytes) -> bytes:
+    return last + b'\x80' + bytes(15 - len(last)) if len(last) < 16 else last
+
+
+def _reference_cmac(encryptor, message: bytes) -> bytes:
+    k1 = _reference_double(encryptor.cipher(bytes(16)))
+    k2 = _reference_double(k1)
+    blocks = [message[i:i + 16] for i in range(0, len(message), 16)] or [b'']
+    last = aes._BaseAES._xor_bytes(_reference_mac_pad(blocks[-1]), k1 if len(blocks[-1]) == 16 else k2)
+    state = bytes(16)
+    for block in blocks[:-1] + [last]:
+        state = encryptor.cipher(aes._BaseAES._xor_bytes(state, block))
+    return state
+
+
+def _reference_pmac(encryptor, message: bytes) -> bytes:
+    l = encryptor.cipher(bytes(16))
+    powers = [l]
+    for _ in range(64):
+        powers.append(_reference_double(powers[-1]))
+    l_inverse = int.from_bytes(l, 'big')
+    l_inverse = (l_inverse >> 1) ^ ((1 << 127) | 0x43) if l_inverse & 1 else l_inverse >> 1
+
+    blocks = [message[i:i + 16] for i in range(0, len(message), 16)] or [b'']
+    offset, checksum = bytes(16), bytes(16)
+    for i, block in enumerate(blocks[:-1], 1):
+        ntz = (i & -i).bit_length() - 1
+        offset = aes._BaseAES._xor_bytes(offset, powers[ntz])
+        checksum = aes._BaseAES._xor_bytes(checksum, encryptor.cipher(aes._BaseAES._xor_bytes(block, offset)))
+    checksum = aes._BaseAES._xor_bytes(checksum, _reference_mac_pad(blocks[-1]))
+    if len(blocks[-1]) == 16:
+        checksum = aes._BaseAES._xor_bytes(checksum, l_inverse.to_bytes(16, 'big'))
+    return encryptor.cipher(checksum)
+
+
+class TestAESMAC(unittest.TestCase):
+    _data = bytes((i * 29 + 11) % 256 for i in range(5000))
+
+    def test_subkeys(self):
+        l = int('7df76b0c1ab899b33e42f047b91b546f', 16)
+        k1 = aes._mac_double(l)
+        self.assertEqual(int('fbeed618357133667c85e08f7236a8de', 16), k1)
+        self.assertEqual(int('f7ddac306ae266ccf90bc11ee46d513b', 16), aes._mac_double(k1))
+        self.assertEqual(l, aes._mac_halve(k1))
+
+    def test_subkey_cache(self):
+        with mock.patch.object(aes, 'key_schedule_cache', aes._KeyScheduleCache(16)) as cache:
+            cmac, pmac = aes.AES_CMAC(key=_default_key()), aes.AES_PMAC(key=_default_key())
+            self.assertIs(cache.get(_default_key()).mac_subkeys, pmac._offsets)
+            self.assertEqual((cmac._k1, cmac._k2), pmac._offsets[1:3])
+            cache.clear()
+            self.assertIsNot(pmac._offsets, aes.AES_PMAC(key=_default_key())._offsets)
+            aes.AES_CMAC(key_length=128)
+            aes.AES_PMAC(key_length=128)
+            self.assertEqual(1, len(cache))
+
+    def test_no_chaining_api(self):
+        for algorithm in (aes.AES_CMAC(key=_default_key()), aes.AES_PMAC(key=_default_key())):
+            for name in ('encryptor', 'decryptor', 'resume'):
+                self.assertFalse(hasattr(algorithm, name))
+
+    def test_cmac(self):
+        algorithm = aes.AES_CMAC(key=_default_key())
+        for length in (0, 1, 15, 16, 17, 32, 33, 100, 5000):
+            message = self._data[:length]
+            self.assertEqual(_reference_cmac(algorithm._encryptor, message), algorithm.mac(message))
+
+    def test_pmac(self):
+        algorithm = aes.AES_PMAC(key=_default_key())
+        for length in (0, 1, 15, 16, 17, 32, 33, 100, 5000):
+            message = self._data[:length]
+            self.assertEqual(_reference_pmac(algorithm._encryptor, message), algorithm.mac(message))
+
+    def test_streaming(self):
+        for algorithm in (aes.AES_CMAC(key=_default_key()), aes.AES_PMAC(key=_default_key())):
+            for chunk_size in (1, 16, 17, 1000):
+                context = algorithm.authenticator()
+                for i in range(0, len(self._data), chunk_size):
+                    context.update(self._data[i:i + chunk_size])
+                self.assertEqual(algorithm.mac(self._data), context.finalize())
+
+    def test_parallel_pmac(self):
+        tag = aes.AES_PMAC(key=_default_key()).mac(self._data)
+        with mock.patch.object(cipher_base, 'PARALLEL_CHUNK', 64), \
+                aes.AES_PMAC(key=_default_key(), workers=2) as parallel:
+            self.assertEqual(tag, parallel.mac(self._data))
+            context = parallel.authenticator()
+            context.update(self._data[:37])
+            context.update(self._data[37:])
+            self.assertEqual(tag, context.finalize())
+            self.assertIsNotNone(parallel._pool)
+
+    def test_parallel_pmac_window(self):
+        serial = aes.AES_PMAC(key=_default_key())
+        parallel = aes.AES_PMAC(key=_default_key(), workers=2)
+        parallel._pool = _RecordingPool()
+        with mock.patch.object(cipher_base, 'PARALLEL_CHUNK', 32), \
+                mock.patch.object(cipher_base, '_worker_mode', serial):
+            self.assertEqual(serial.mac(self._data), parallel.mac(self._data))
+        self.assertGreater(parallel._pool.submitted, 4)
+        self.assertEqual(4, parallel._pool.max_pending)
+
+    def test_verify(self):
+        for algorithm in (aes.AES_CMAC(key=_default_key()), aes.AES_PMAC(key=_default_key())):
+            tag = algorithm.mac(self._data[:100])
+            algorithm.verify(self._data[:100], tag)
+            with self.assertRaises(aes.InvalidTag):
+                algorithm.verify(self._data[:99], tag)
+            with self.assertRaises(aes.InvalidTag):
+                algorithm.verify(self._data[:100], bytes(16))
+            context = algorithm.authenticator()
+            context.finalize()
+            with self.assertRaises(AssertionError):
+                context.update(b'a')
+
+
+class TestKeyScheduleCache(unittest.TestCase):
+    def test_get(self):
+        cache = aes._KeyScheduleCache(2)
+        first = cache.get(_default_key())
+        self.assertIs(first, cache.get(bytearray(_default_key())))
+        self.assertEqual(_reference_cipher(first, _default_iv()), first.cipher(_default_iv()))
+        self.assertEqual((1, 1, 1), (cache.hits, cache.misses, len(cache)))
+
+    def test_eviction(self):
+        cache = aes._KeyScheduleCache(2)
+        keys = [bytes([i]) * 16 for i in range(3)]
+        first = cache.get(keys[0])
+        cache.get(keys[1])
+        cache.get(keys[0])
+        cache.get(keys[2])
+        self.assertIs(first, cache.get(keys[0]))
+        cache.get(keys[1])
+        self.assertEqual((2, 4, 2), (cache.hits, cache.misses, len(cache)))
+
+        cache.clear()
+        self.assertEqual((0, 0, 0), (cache.hits, cache.misses, len(cache)))
+
+    def test_disabled(self):
+        cache = aes._KeyScheduleCache(0)
+        self.assertIsNot(cache.get(_default_key()), cache.get(_default_key()))
+        self.assertEqual((0, 2, 0), (cache.hits, cache.misses, len(cache)))
+
+    def test_modes(self):
+        with mock.patch.object(aes, 'key_schedule_cache', aes._KeyScheduleCache(16)) as cache:
+            ecb = aes.AES_ECB(key=_default_key())
+            ctr = aes.AES_CTR(key=_default_key())
+            self.assertIs(ecb._encryptor, ctr._encryptor)
+            aes.AES_CBC(key_length=128)
+            self.assertEqual((1, 1, 1), (cache.hits, cache.misses, len(cache)))
+
+
+class TestAESMessageBatch(unittest.TestCase):
+    _messages = [bytes((i * 7 + length) % 256 for i in range(length)) for length in (0, 1, 15, 16, 17, 100, 64, 33)] * 8
+    _ivs = [bytes([i]) * 16 for i in range(64)]
+
+    def test_ecb(self):
+        algorithm = aes.AES_ECB(key=_default_key())
+        ciphertexts = algorithm.encrypt_many(self._messages)
+        self.assertEqual([algorithm.encrypt(message) for message in self._messages], ciphertexts)
+        self.assertEqual([algorithm.decrypt(text) for text in ciphertexts], algorithm.decrypt_many(ciphertexts))
+
+    def test_cbc(self):
+        self._helper_test_batch(aes.AES_CBC(key=_default_key()))
+
+    def test_pcbc(self):
+        self._helper_test_batch(aes.AES_PCBC(key=_default_key()))
+
+    def test_cfb(self):
+        self._helper_test_batch(aes.AES_CFB(key=_default_key()))
+
+    def test_ofb(self):
+        self._helper_test_batch(aes.AES_OFB(key=_default_key()))
+
+    def test_ctr(self):
+        self._helper_test_batch(aes.AES_CTR(key=_default_key()))
+        self._helper_test_batch(aes.AES_CTR(key=_default_key()), [b'\xff' * 16] * len(self._messages))
+
+    def test_empty(self):
+        self.assertEqual([], aes.AES_CBC(key=_default_key()).encrypt_many([], []))
+        self.assertEqual([], aes.AES_CTR(key=_default_key()).decrypt_many([], []))
+
+    def test_mismatched_ivs(self):
+        with self.assertRaises(AssertionError):
+            aes.AES_CBC(key=_default_key()).encrypt_many(self._messages, self._ivs[:-1])
+
+    def _helper_test_batch(self, algorithm, ivs=None):
+        ivs = self._ivs if ivs is None else ivs
+        ciphertexts = algorithm.encrypt_many(self._messages, ivs)
+        self.assertEqual([algorithm.encrypt(message, iv) for message, iv in zip(self._messages, ivs)], ciphertexts)
+        self.assertEqual([algorithm.decrypt(text, iv) for text, iv in zip(ciphertexts, ivs)],
+                         algorithm.decrypt_many(ciphertexts, ivs))
+
+
+class TestAESMultiKey(unittest.TestCase):
+    _keys = [bytes([i]) * 16 for i in range(5)]
+    _data = bytes((i * 19 + 2) % 256 for i in range(16 * 80))
+    _key_indices = [(i * 3) % 5 for i in range(80)]
+
+    def test_blocks(self):
+        algorithm = aes.AES_MultiKey(self._keys)
+        for length in (2, 80):
+            data, indices = self._data[:16 * length], self._key_indices[:length]
+            ciphertext = algorithm.encrypt_blocks(data, indices)
+            expected = b''.join(
+                aes.AES_ECB(key=self._keys[index]).encrypt(data[16 * i:16 * i + 16])
+                for i, index in enumerate(indices)
+            )
+            self.assertEqual(expected, ciphertext)
+            self.assertEqual(data, algorithm.decrypt_blocks(ciphertext, indices))
+
+    @unittest.skipIf(aes.np is None, 'numpy is not installed')
+    def test_vectorized(self):
+        algorithm = aes.AES_MultiKey(self._keys)
+        ciphertext = algorithm.encrypt_blocks(self._data, self._key_indices)
+        self.assertIsNotNone(algorithm._vector_encryptor)
+        with mock.patch.object(aes, 'np', None):
+            self.assertEqual(ciphertext, aes.AES_MultiKey(self._keys).encrypt_blocks(self._data, self._key_indices))
+
+    def test_ctr_many(self):
+        messages = [self._data[:length] for length in (0, 1, 16, 33, 200, 500)]
+        indices = [4, 0, 1, 1, 3, 2]
+        ivs = [_default_iv(), b'\xff' * 16] * 3
+        expected = [
+            aes.AES_CTR(key=self._keys[index]).encrypt(message, iv)
+            for message, index, iv in zip(messages, indices, ivs)
+        ]
+        self.assertEqual(expected, aes.AES_MultiKey(self._keys).ctr_many(messages, indices, ivs))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(AssertionError):
+            aes.AES_MultiKey([_default_key(), bytes(24)])
+        with self.assertRaises(AssertionError):
+            aes.AES_MultiKey(self._keys).encrypt_blocks(self._data[:32], [0, 5])
+        with self.assertRaises(AssertionError):
+            aes.AES_MultiKey(self._keys).encrypt_blocks(self._data[:32], [0])
+
+
+class TestAESInPlace(unittest.TestCase):
+    _data = bytes((i * 23 + 4) % 256 for i in range(16 * 9 + 5))
+
+    def test_cfb(self):
+        self._helper_test_inplace(aes.AES_CFB(key=_default_key()))
+
+    def test_ofb(self):
+        self._helper_test_inplace(aes.AES_OFB(key=_default_key()))
+
+    def test_ctr(self):
+        self._helper_test_inplace(aes.AES_CTR(key=_default_key()))
+
+    def test_mmap(self):
+        algorithm = aes.AES_CTR(key=_default_key())
+        with mmap.mmap(-1, len(self._data)) as buffer:
+            buffer[:] = self._data
+            algorithm.encrypt_inplace(buffer, _default_iv())
+            self.assertEqual(algorithm.encrypt(self._data, _default_iv()), buffer[:])
+
+    def test_readonly(self):
+        with self.assertRaises(AssertionError):
+            aes.AES_CTR(key=_default_key()).encrypt_inplace(self._data, _default_iv())
+
+    def _helper_test_inplace(self, algorithm):
+        expected = algorithm.encrypt(self._data, _default_iv())
+        for chunk in (32, 1 << 16):
+            with mock.patch.object(aes, '_INPLACE_CHUNK', chunk):
+                buffer = bytearray(self._data)
+                algorithm.encrypt_inplace(buffer, _default_iv())
+                self.assertEqual(expected, bytes(buffer))
+
+                algorithm.decrypt_inplace(memoryview(buffer), _default_iv())
+                self.assertEqual(self._data, bytes(buffer))
+
+
+class TestAESCheckpoint(unittest.TestCase):
+    _data = bytes((i * 61 + 8) % 256 for i in range(16 * 10 + 7))
+
+    def test_ecb(self):
+        self._helper_test_checkpoint(aes.AES_ECB)
+
+    def test_cbc(self):
+        self._helper_test_checkpoint(aes.AES_CBC, _default_iv())
+
+    def test_pcbc(self):
+        self._helper_test_checkpoint(aes.AES_PCBC, _default_iv())
+
+    def test_cfb(self):
+        self._helper_test_checkpoint(aes.AES_CFB, _default_iv())
+
+    def test_ofb(self):
+        self._helper_test_checkpoint(aes.AES_OFB, _default_iv())
+
+    def test_ctr(self):
+        self._helper_test_checkpoint(aes.AES_CTR, _default_iv())
+        self._helper_test_checkpoint(aes.AES_CTR, b'\xff' * 16)
+
+    def test_mismatched_mode(self):
+        checkpoint = aes.AES_CBC(key=_default_key()).encryptor(_default_iv()).checkpoint()
+        with self.assertRaises(AssertionError):
+            aes.AES_CTR(key=_default_key()).resume(checkpoint)
+        with self.assertRaises(AssertionError):
+            aes.AES_CBC(key=_default_key()).resume(checkpoint[:-1])
+        with self.assertRaises(AssertionError):
+            aes.AES_PCBC(key=_default_key()).resume(checkpoint)
+        checkpoint = aes.AES_CFB(key=_default_key()).encryptor(_default_iv()).checkpoint()
+        with self.assertRaises(AssertionError):
+            aes.AES_OFB(key=_default_key()).resume(checkpoint)
+
+    def test_block_size(self):
+        checkpoint = bytearray(aes.AES_CBC(key=_default_key()).encryptor(_default_iv()).checkpoint())
+        checkpoint[1] = 32
+        with self.assertRaises(AssertionError):
+            aes.AES_CBC(key=_default_key()).resume(bytes(checkpoint))
+
+    def test_finalized(self):
+        context = aes.AES_CTR(key=_default_key()).encryptor(_default_iv())
+        context.finalize()
+        with self.assertRaises(AssertionError):
+            context.checkpoint()
+
+    def _helper_test_checkpoint(self, mode, iv=None):
+        args = () if iv is None else (iv,)
+        ciphertext = mode(key=_default_key()).encrypt(self._data, *args)
+        for split in (0, 5, 16, 37, 160, len(self._data)):
+            encryptor = mode(key=_default_key()).encryptor(*args)
+            head = encryptor.update(self._data[:split])
+            checkpoint = encryptor.checkpoint()
+            self.assertEqual(split, encryptor.position)
+
+            resumed = mode(key=_default_key()).resume(checkpoint)
+            self.assertEqual(ciphertext, head + resumed.update(self._data[split:]) + resumed.finalize())
+
+            decryptor = mode(key=_default_key()).decryptor(*args)
+            head = decryptor.update(ciphertext[:split])
+            resumed = mode(key=_default_key()).resume(decryptor.checkpoint())
+            self.assertEqual(self._data, head + resumed.update(ciphertext[split:]) + resumed.finalize())
+
+
+class TestAESOutputBuffer(unittest.TestCase):
+    def test_ecb(self):
+        self._helper_test_output_buffer(aes.AES_ECB(key=_default_key()))
+
+    def test_cbc(self):
+        self._helper_test_output_buffer(aes.AES_CBC(key=_default_key()), _default_iv())
+
+    def test_pcbc(self):
+        self._helper_test_output_buffer(aes.AES_PCBC(key=_default_key()), _default_iv())
+
+    def test_cfb(self):
+        self._helper_test_output_buffer(aes.AES_CFB(key=_default_key()), _default_iv())
+
+    def test_ofb(self):
+        self._helper_test_output_buffer(aes.AES_OFB(key=_default_key()), _default_iv())
+
+    def test_ctr(self):
+        self._helper_test_output_buffer(aes.AES_CTR(key=_default_key()), _default_iv())
+
+    def test_small_buffer(self):
+        with self.assertRaises(AssertionError):
+            aes.AES_CTR(key=_default_key()).encrypt(b'a' * 20, _default_iv(), bytearray(19))
+        with self.assertRaises(AssertionError):
+            aes.AES_CBC(key=_default_key()).encrypt(b'a' * 20, _default_iv(), bytearray(20))
+        with self.assertRaises(AssertionError):
+            aes.AES_CTR(key=_default_key()).encrypt(b'a' * 20, _default_iv(), b'\x00' * 20)
+
+    def test_in_place(self):
+        algorithm = aes.AES_CBC(key=_default_key())
+        plaintext = bytes(range(64))
+        buffer = bytearray(plaintext)
+        self.assertEqual(64, algorithm.encrypt(buffer, _default_iv(), buffer))
+        self.assertEqual(algorithm.encrypt(plaintext, _default_iv()), bytes(buffer))
+        self.assertEqual(64, algorithm.decrypt(buffer, _default_iv(), buffer))
+        self.assertEqual(plaintext, bytes(buffer))
+
+    def _helper_test_output_buffer(self, algorithm, iv=None):
+        args = () if iv is None else (iv,)
+        for length in (0, 1, 16, 31, 200):
+            plaintext = bytes((i * 11 + length) % 256 for i in range(length))
+            ciphertext = algorithm.encrypt(plaintext, *args)
+
+            out = bytearray(len(ciphertext) + 5)
+            self.assertEqual(len(ciphertext), algorithm.encrypt(memoryview(plaintext), *args, out))
+            self.assertEqual(ciphertext, bytes(out[:len(ciphertext)]))
+
+            out = bytearray(len(ciphertext))
+            written = algorithm.decrypt(bytearray(ciphertext), *args, memoryview(out))
+            self.assertEqual(len(plaintext), written)
+            self.assertEqual(plaintext, bytes(out[:written]))
 
 
 class TestAESUtility(unittest.TestCase):
@@ -113,6 +967,7 @@ class TestAESUtility(unittest.TestCase):
         self.assertEqual(b'', aes.AES_ECB._unpad(b'\x10\x10\x10\x10\x10\x10\x10\x10\x10\x10\x10\x10\x10\x10\x10\x10'))
         self.assertEqual(b'a', aes.AES_ECB._unpad(b'a\x0f\x0f\x0f\x0f\x0f\x0f\x0f\x0f\x0f\x0f\x0f\x0f\x0f\x0f\x0f'))
         self.assertEqual(b'aaaaaaaaaaaaaaaa', aes.AES_ECB._unpad(b'aaaaaaaaaaaaaaaa'))
+        self.assertEqual(b'aaaaaaaaaaaaaaa\x00', aes.AES_ECB._unpad(b'aaaaaaaaaaaaaaa\x00'))
         with self.assertRaises(AssertionError):
             aes.AES_ECB._unpad(b'aaaaaaaaaaaaaaaaa')
 
@@ -410,6 +1265,15 @@ class TestAESEncryptorCipher(unittest.TestCase):
         self.assertEqual(out, encryptor._state_to_out(execution_data[-1][0]))
 
 
+    def test_cipher_matches_round_functions(self):
+        for key_length in (16, 24, 32):
+            key = bytes(range(key_length))
+            encryptor = aes._AESEncryptor(key)
+            for i in range(32):
+                _in = bytes((i * 37 + j * 11) % 256 for j in range(16))
+                self.assertEqual(_reference_cipher(encryptor, _in), encryptor.cipher(_in))
+
+
 class TestAESEncryptorInvCipher(unittest.TestCase):
     def test_inv_cipher(self):
         encryptor = aes._AESEncryptor(_default_key())
@@ -419,6 +1283,15 @@ class TestAESEncryptorInvCipher(unittest.TestCase):
 
         self.assertEqual(_in, encryptor.inv_cipher(out))
 
+    def test_inv_cipher_matches_round_functions(self):
+        for key_length in (16, 24, 32):
+            key = bytes(range(key_length))
+            encryptor = aes._AESEncryptor(key)
+            for i in range(32):
+                _in = bytes((i * 37 + j * 11) % 256 for j in range(16))
+                self.assertEqual(_reference_inv_cipher(encryptor, _in), encryptor.inv_cipher(_in))
+                self.assertEqual(_in, encryptor.inv_cipher(encryptor.cipher(_in)))
+
 
 class TestAESEncryptorUtility(unittest.TestCase):
     def test_key_expansion(self):
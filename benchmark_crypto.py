@@ -1,6 +1,10 @@
+import mmap
+import multiprocessing
 import os.path
 import cProfile
+from contextlib import contextmanager
 import aes
+import cipher_io
 import kalyna
 import rc4
 import salsa20
@@ -20,6 +24,13 @@ def _load_file(file_name: str):
         return read_file.read()
 
 
+@contextmanager
+def _map_file(file_name: str):
+    with open(os.path.join(_data_dir, file_name), 'rb') as read_file:
+        with mmap.mmap(read_file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            yield content
+
+
 def _write_file(file_name: str, content: bytes):
     with open(os.path.join(_data_dir, file_name), 'wb') as write_file:
         write_file.write(content)
@@ -27,93 +38,124 @@ def _write_file(file_name: str, content: bytes):
 
 def benchmark_encrypt(content, algorithm, iv=None):
     if iv is None:
-        _ = algorithm._encrypt_block(content)
+        _ = algorithm.encrypt(content)
     else:
-        _ = algorithm._encrypt_block(content, iv)
+        _ = algorithm.encrypt(content, iv)
 
 
 def benchmark_decrypt(content, algorithm, iv=None):
     if iv is None:
-        _ = algorithm._decrypt_block(content)
+        _ = algorithm.decrypt(content)
     else:
-        _ = algorithm._decrypt_block(content, iv)
+        _ = algorithm.decrypt(content, iv)
 
 
 content_1kb = _load_file("1kb")
 content_1mb = _load_file("1mb")
 
 
-# content_1gb = _load_file("1gb")
+def _benchmark_aes_ecb():
+    cProfile.run('benchmark_encrypt(content_1kb, aes.AES_ECB(key_length=128))')
+    cProfile.run('benchmark_encrypt(content_1mb, aes.AES_ECB(key_length=128))')
 
+    cProfile.run('benchmark_decrypt(content_1kb, aes.AES_ECB(key_length=128))')
+    cProfile.run('benchmark_decrypt(content_1mb, aes.AES_ECB(key_length=128))')
 
-def _benchmark_aes_ecb():
-    cProfile.run('benchmark_encrypt(content_1kb, aes.AES(key_length=128))')
-    cProfile.run('benchmark_encrypt(content_1mb, aes.AES(key_length=128))')
-    cProfile.run('benchmark_encrypt(content_1gb, aes.AES(key_length=128))')
+    with _map_file('1gb') as content_1gb:
+        cProfile.runctx('benchmark_encrypt(content_1gb, aes.AES_ECB(key_length=128))', globals(), locals())
+        cProfile.runctx('benchmark_decrypt(content_1gb, aes.AES_ECB(key_length=128))', globals(), locals())
 
-    cProfile.run('benchmark_decrypt(content_1kb, aes.AES(key_length=128))')
-    cProfile.run('benchmark_decrypt(content_1mb, aes.AES(key_length=128))')
-    cProfile.run('benchmark_decrypt(content_1gb, aes.AES(key_length=128))')
+    cProfile.run("benchmark_encrypt(content_1mb, aes.AES_ECB(key_length=128, backend='bitsliced'))")
 
 
 def _benchmark_aes_cbc():
-    cProfile.run('benchmark_encrypt(content_1kb, aes.AES_CBC(block_size=128, key_length=128), _iv)')
-    cProfile.run('benchmark_encrypt(content_1mb, aes.AES_CBC(block_size=128, key_length=128), _iv)')
-    # cProfile.run('benchmark_encrypt(content_1gb, aes.AES_CBC(block_size=128, key_length=128), _iv)')
+    cProfile.run('benchmark_encrypt(content_1kb, aes.AES_CBC(key_length=128), _iv)')
+    cProfile.run('benchmark_encrypt(content_1mb, aes.AES_CBC(key_length=128), _iv)')
+    # cProfile.run('benchmark_encrypt(content_1gb, aes.AES_CBC(key_length=128), _iv)')
 
-    cProfile.run('benchmark_decrypt(content_1kb, aes.AES_CBC(block_size=128, key_length=128), _iv)')
-    cProfile.run('benchmark_decrypt(content_1mb, aes.AES_CBC(block_size=128, key_length=128), _iv)')
-    # cProfile.run('benchmark_decrypt(content_1gb, aes.AES_CBC(block_size=128, key_length=128), _iv)')
+    cProfile.run('benchmark_decrypt(content_1kb, aes.AES_CBC(key_length=128), _iv)')
+    cProfile.run('benchmark_decrypt(content_1mb, aes.AES_CBC(key_length=128), _iv)')
+    # cProfile.run('benchmark_decrypt(content_1gb, aes.AES_CBC(key_length=128), _iv)')
 
 
 def _benchmark_aes_pcbc():
-    cProfile.run('benchmark_encrypt(content_1kb, aes.AES_PCBC(block_size=128, key_length=128), _iv)')
-    cProfile.run('benchmark_encrypt(content_1mb, aes.AES_PCBC(block_size=128, key_length=128), _iv)')
-    # cProfile.run('benchmark_encrypt(content_1gb, aes.AES_PCBC(block_size=128, key_length=128), _iv)')
+    cProfile.run('benchmark_encrypt(content_1kb, aes.AES_PCBC(key_length=128), _iv)')
+    cProfile.run('benchmark_encrypt(content_1mb, aes.AES_PCBC(key_length=128), _iv)')
+    # cProfile.run('benchmark_encrypt(content_1gb, aes.AES_PCBC(key_length=128), _iv)')
 
-    cProfile.run('benchmark_decrypt(content_1kb, aes.AES_PCBC(block_size=128, key_length=128), _iv)')
-    cProfile.run('benchmark_decrypt(content_1mb, aes.AES_PCBC(block_size=128, key_length=128), _iv)')
-    # cProfile.run('benchmark_decrypt(content_1gb, aes.AES_PCBC(block_size=128, key_length=128), _iv)')
+    cProfile.run('benchmark_decrypt(content_1kb, aes.AES_PCBC(key_length=128), _iv)')
+    cProfile.run('benchmark_decrypt(content_1mb, aes.AES_PCBC(key_length=128), _iv)')
+    # cProfile.run('benchmark_decrypt(content_1gb, aes.AES_PCBC(key_length=128), _iv)')
 
 
 def _benchmark_aes_cfb():
-    cProfile.run('benchmark_encrypt(content_1kb, aes.AES_CFB(block_size=128, key_length=128), _iv)')
-    cProfile.run('benchmark_encrypt(content_1mb, aes.AES_CFB(block_size=128, key_length=128), _iv)')
-    # cProfile.run('benchmark_encrypt(content_1gb, aes.AES_CFB(block_size=128, key_length=128), _iv)')
+    cProfile.run('benchmark_encrypt(content_1kb, aes.AES_CFB(key_length=128), _iv)')
+    cProfile.run('benchmark_encrypt(content_1mb, aes.AES_CFB(key_length=128), _iv)')
+    # cProfile.run('benchmark_encrypt(content_1gb, aes.AES_CFB(key_length=128), _iv)')
 
-    cProfile.run('benchmark_decrypt(content_1kb, aes.AES_CFB(block_size=128, key_length=128), _iv)')
-    cProfile.run('benchmark_decrypt(content_1mb, aes.AES_CFB(block_size=128, key_length=128), _iv)')
-    # cProfile.run('benchmark_decrypt(content_1gb, aes.AES_CFB(block_size=128, key_length=128), _iv)')
+    cProfile.run('benchmark_decrypt(content_1kb, aes.AES_CFB(key_length=128), _iv)')
+    cProfile.run('benchmark_decrypt(content_1mb, aes.AES_CFB(key_length=128), _iv)')
+    # cProfile.run('benchmark_decrypt(content_1gb, aes.AES_CFB(key_length=128), _iv)')
 
 
 def _benchmark_aes_ofb():
-    cProfile.run('benchmark_encrypt(content_1kb, aes.AES_OFB(block_size=128, key_length=128), _iv)')
-    cProfile.run('benchmark_encrypt(content_1mb, aes.AES_OFB(block_size=128, key_length=128), _iv)')
-    # cProfile.run('benchmark_encrypt(content_1gb, aes.AES_OFB(block_size=128, key_length=128), _iv)')
+    cProfile.run('benchmark_encrypt(content_1kb, aes.AES_OFB(key_length=128), _iv)')
+    cProfile.run('benchmark_encrypt(content_1mb, aes.AES_OFB(key_length=128), _iv)')
+    # cProfile.run('benchmark_encrypt(content_1gb, aes.AES_OFB(key_length=128), _iv)')
 
-    cProfile.run('benchmark_decrypt(content_1kb, aes.AES_OFB(block_size=128, key_length=128), _iv)')
-    cProfile.run('benchmark_decrypt(content_1mb, aes.AES_OFB(block_size=128, key_length=128), _iv)')
-    # cProfile.run('benchmark_decrypt(content_1gb, aes.AES_OFB(block_size=128, key_length=128), _iv)')
+    cProfile.run('benchmark_decrypt(content_1kb, aes.AES_OFB(key_length=128), _iv)')
+    cProfile.run('benchmark_decrypt(content_1mb, aes.AES_OFB(key_length=128), _iv)')
+    # cProfile.run('benchmark_decrypt(content_1gb, aes.AES_OFB(key_length=128), _iv)')
 
 
 def _benchmark_aes_ctr():
-    cProfile.run('benchmark_encrypt(content_1kb, aes.AES_CTR(block_size=128, key_length=128), _iv)')
-    cProfile.run('benchmark_encrypt(content_1mb, aes.AES_CTR(block_size=128, key_length=128), _iv)')
-    # cProfile.run('benchmark_encrypt(content_1gb, aes.AES_CTR(block_size=128, key_length=128), _iv)')
+    cProfile.run('benchmark_encrypt(content_1kb, aes.AES_CTR(key_length=128), _iv)')
+    cProfile.run('benchmark_encrypt(content_1mb, aes.AES_CTR(key_length=128), _iv)')
+
+    cProfile.run('benchmark_decrypt(content_1kb, aes.AES_CTR(key_length=128), _iv)')
+    cProfile.run('benchmark_decrypt(content_1mb, aes.AES_CTR(key_length=128), _iv)')
+
+    with _map_file('1gb') as content_1gb:
+        cProfile.runctx('benchmark_encrypt(content_1gb, aes.AES_CTR(key_length=128), _iv)', globals(), locals())
+        cProfile.runctx('benchmark_decrypt(content_1gb, aes.AES_CTR(key_length=128), _iv)', globals(), locals())
+
+    cProfile.run("benchmark_encrypt(content_1mb, aes.AES_CTR(key_length=128, backend='bitsliced'), _iv)")
 
-    cProfile.run('benchmark_decrypt(content_1kb, aes.AES_CTR(block_size=128, key_length=128), _iv)')
-    cProfile.run('benchmark_decrypt(content_1mb, aes.AES_CTR(block_size=128, key_length=128), _iv)')
-    # cProfile.run('benchmark_decrypt(content_1gb, aes.AES_CTR(block_size=128, key_length=128), _iv)')
+
+def _benchmark_aes_gcm():
+    cProfile.run('benchmark_encrypt(content_1kb, aes.AES_GCM(key_length=128), _iv[:12])')
+    cProfile.run('benchmark_encrypt(content_1mb, aes.AES_GCM(key_length=128), _iv[:12])')
+    # cProfile.run('benchmark_encrypt(content_1gb, aes.AES_GCM(key_length=128), _iv[:12])')
+
+
+def _benchmark_aes_ctr_file():
+    source = os.path.join(_data_dir, '1gb')
+    destination = os.path.join(_data_dir, '1gb.enc')
+    cProfile.runctx('cipher_io.process_file(aes.AES_CTR(key_length=128).encryptor(_iv), source, destination)',
+                    globals(), locals())
+
+
+def _run_in_process(benchmark):
+    process = multiprocessing.Process(target=benchmark)
+    process.start()
+    process.join()
 
 
 def _benchmark_kalyna():
     cProfile.run('benchmark_encrypt(content_1kb, kalyna.Kalyna(block_size=128, key_length=128))')
-    # cProfile.run('benchmark_encrypt(content_1mb, kalyna.Kalyna(block_size=128, key_length=128))')
-    # cProfile.run('benchmark_encrypt(content_1gb, kalyna.Kalyna(block_size=128, key_length=128))')
+    cProfile.run('benchmark_encrypt(content_1mb, kalyna.Kalyna(block_size=128, key_length=128))')
 
     cProfile.run('benchmark_decrypt(content_1kb, kalyna.Kalyna(block_size=128, key_length=128))')
-    # cProfile.run('benchmark_decrypt(content_1mb, kalyna.Kalyna(block_size=128, key_length=128))')
-    # cProfile.run('benchmark_decrypt(content_1gb, kalyna.Kalyna(block_size=128, key_length=128))')
+    cProfile.run('benchmark_decrypt(content_1mb, kalyna.Kalyna(block_size=128, key_length=128))')
+
+    with _map_file('1gb') as content_1gb:
+        cProfile.runctx('benchmark_encrypt(content_1gb, kalyna.Kalyna(block_size=128, key_length=128))',
+                        globals(), locals())
+        cProfile.runctx('benchmark_decrypt(content_1gb, kalyna.Kalyna(block_size=128, key_length=128))',
+                        globals(), locals())
+
+    cProfile.run('benchmark_encrypt(content_1mb, kalyna.Kalyna_CTR(block_size=128, key_length=128), _iv)')
+    cProfile.run('benchmark_encrypt(content_1mb, kalyna.Kalyna_CBC(block_size=128, key_length=128), _iv)')
 
 
 def _benchmark_rc4():
@@ -136,5 +178,7 @@ if __name__ == '__main__':
     _benchmark_aes_cfb()
     _benchmark_aes_ofb()
     _benchmark_aes_ctr()
+    _benchmark_aes_gcm()
+    _run_in_process(_benchmark_aes_ctr_file)
     _benchmark_rc4()
     _benchmark_salsa20()
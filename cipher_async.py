@@ -0,0 +1,77 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Optional
+
+_CHUNK_SIZE = 1 << 16
+_OFFLOAD_THRESHOLD = 4096
+
+
+class CipherReader:
+    def __init__(self, context, reader: asyncio.StreamReader, chunk_size: int = _CHUNK_SIZE,
+                 executor: Optional[Executor] = None, offload_threshold: int = _OFFLOAD_THRESHOLD) -> None:
+        assert chunk_size > 0
+        self._context = context
+        self._reader = reader
+        self._chunk_size = chunk_size
+        self._executor = executor
+        self._offload_threshold = offload_threshold
+        self._finalized = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        while not self._finalized:
+            data = await self.read()
+            if data:
+                return data
+        raise StopAsyncIteration
+
+    async def read(self) -> bytes:
+        if self._finalized:
+            return b''
+        chunk = await self._reader.read(self._chunk_size)
+        if chunk:
+            return await _run(self._context.update, chunk, self._executor, self._offload_threshold)
+        self._finalized = True
+        return self._context.finalize()
+
+
+class CipherWriter:
+    def __init__(self, context, writer: asyncio.StreamWriter, executor: Optional[Executor] = None,
+                 offload_threshold: int = _OFFLOAD_THRESHOLD) -> None:
+        self._context = context
+        self._writer = writer
+        self._executor = executor
+        self._offload_threshold = offload_threshold
+        self.written = 0
+
+    async def write(self, data: bytes) -> None:
+        await self._write(await _run(self._context.update, data, self._executor, self._offload_threshold))
+
+    async def finalize(self) -> None:
+        await self._write(self._context.finalize())
+
+    async def _write(self, data: bytes) -> None:
+        if data:
+            self._writer.write(data)
+            self.written += len(data)
+        await self._writer.drain()
+
+
+async def pipe(context, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, chunk_size: int = _CHUNK_SIZE,
+               executor: Optional[Executor] = None, offload_threshold: int = _OFFLOAD_THRESHOLD) -> int:
+    cipher_writer = CipherWriter(context, writer, executor, offload_threshold)
+    while True:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            break
+        await cipher_writer.write(chunk)
+    await cipher_writer.finalize()
+    return cipher_writer.written
+
+
+async def _run(process, data: bytes, executor: Optional[Executor], offload_threshold: int) -> bytes:
+    if len(data) < offload_threshold:
+        return process(data)
+    return await asyncio.get_running_loop().run_in_executor(executor, process, data)
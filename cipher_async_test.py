@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+
+import aes
+import cipher_async
+
+
+def _key() -> bytes:
+    return b'\x2b\x7e\x15\x16\x28\xae\xd2\xa6\xab\xf7\x15\x88\x09\xcf\x4f\x3c'
+
+
+def _iv() -> bytes:
+    return b'\x00\x01\x02\x03\x04\x05\x06\x07\x08\x09\x0a\x0b\x0c\x0d\x0e\x0f'
+
+
+class _BufferWriter:
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+        self.drains = 0
+
+    def write(self, data: bytes) -> None:
+        self.buffer += data
+
+    async def drain(self) -> None:
+        self.drains += 1
+
+
+def _reader(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+class CipherAsyncTest(unittest.IsolatedAsyncioTestCase):
+    _data = bytes((i * 41 + 9) % 256 for i in range(1000))
+
+    async def test_pipe_cbc(self):
+        await self._helper_test_pipe(aes.AES_CBC(key=_key()))
+
+    async def test_pipe_ctr(self):
+        await self._helper_test_pipe(aes.AES_CTR(key=_key()))
+
+    async def test_reader(self):
+        algorithm = aes.AES_CBC(key=_key())
+        ciphertext = algorithm.encrypt(self._data, _iv())
+        for offload_threshold in (0, 1 << 20):
+            reader = cipher_async.CipherReader(algorithm.decryptor(_iv()), _reader(ciphertext), 48,
+                                               offload_threshold=offload_threshold)
+            chunks = [chunk async for chunk in reader]
+            self.assertEqual(self._data, b''.join(chunks))
+            self.assertEqual(b'', await reader.read())
+
+    async def test_pipe_error(self):
+        writer = _BufferWriter()
+        with self.assertRaises(AssertionError):
+            await cipher_async.pipe(aes.AES_CBC(key=_key()).decryptor(_iv()), _reader(b'a' * 20), writer)
+
+    async def test_socket(self):
+        algorithm = aes.AES_CTR(key=_key())
+
+        async def handle(reader, writer):
+            await cipher_async.pipe(algorithm.encryptor(_iv()), reader, writer, 100, offload_threshold=0)
+            writer.close()
+
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        async with server:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(self._data)
+            writer.write_eof()
+            self.assertEqual(algorithm.encrypt(self._data, _iv()), await reader.read())
+            writer.close()
+            await writer.wait_closed()
+
+    async def _helper_test_pipe(self, algorithm):
+        expected = algorithm.encrypt(self._data, _iv())
+        for chunk_size, offload_threshold in ((1, 1 << 20), (48, 0), (100, 64), (4096, 0)):
+            writer = _BufferWriter()
+            written = await cipher_async.pipe(algorithm.encryptor(_iv()), _reader(self._data), writer, chunk_size,
+                                              offload_threshold=offload_threshold)
+            self.assertEqual(len(expected), written)
+            self.assertEqual(expected, bytes(writer.buffer))
+            self.assertEqual((len(self._data) + chunk_size - 1) // chunk_size + 1, writer.drains)
+
+
+if __name__ == '__main__':
+    unittest.main()
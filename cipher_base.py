@@ -0,0 +1,171 @@
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+PARALLEL_CHUNK = 1 << 20
+
+_CHECKPOINT_VERSION = 2
+_CHECKPOINT_HEADER = struct.Struct('>BBBBBQB')
+_STATE_NONE = 0
+_STATE_BLOCK = 1
+_STATE_COUNTER = 2
+
+_Buffer = Union[bytes, bytearray, memoryview]
+
+_worker_mode = None
+
+
+def _init_worker(mode_class: type, kwargs: Dict[str, Any]) -> None:
+    global _worker_mode
+    _worker_mode = mode_class(**kwargs)
+
+
+def _call_worker(method_name: str, *args) -> Any:
+    return getattr(_worker_mode, method_name)(*args)
+
+
+class ParallelMixin:
+    def _init_workers(self, workers: Optional[int]) -> None:
+        assert workers is None or workers > 0
+        self._workers = workers
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _parallel(self, length: int) -> bool:
+        return self._workers is not None and self._workers > 1 and length > PARALLEL_CHUNK
+
+    def _map_workers(self, method_name: str, tasks: Iterable[Tuple]) -> Iterator[Any]:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._workers, initializer=_init_worker, initargs=(type(self), self._worker_kwargs())
+            )
+        futures = deque()
+        for task in tasks:
+            if len(futures) == 2 * self._workers:
+                yield futures.popleft().result()
+            futures.append(self._pool.submit(_call_worker, method_name, *task))
+        while futures:
+            yield futures.popleft().result()
+
+    def _map_workers_into(self, method_name: str, tasks: Iterable[Tuple], dst: memoryview) -> None:
+        offset = 0
+        for result in self._map_workers(method_name, tasks):
+            dst[offset:offset + len(result)] = result
+            offset += len(result)
+
+    def _map_chained_chunks_into(self, method_name: str, text: memoryview, iv: bytes, dst: memoryview) -> None:
+        n = len(iv)
+        chunk = max(n, PARALLEL_CHUNK // n * n)
+        offsets = range(0, len(text), chunk)
+        ivs = [bytes(text[i - n:i]) if i > 0 else iv for i in offsets]
+        tasks = ((bytes(text[i:i + chunk]), chunk_iv) for i, chunk_iv in zip(offsets, ivs))
+        self._map_workers_into(method_name, tasks, dst)
+
+
+class CipherContext:
+    def __init__(self, process: Callable[[bytes, Any], Tuple[bytes, Any]], state: Any, encrypting: bool,
+                 block_size: int = 16, pad: Optional[Callable[[bytes, int], bytes]] = None,
+                 unpad: Optional[Callable[[bytes], bytes]] = None, mode: str = '') -> None:
+        assert (pad is None) == (unpad is None)
+        self.block_size = block_size
+        self._process = process
+        self._state = state
+        self._encrypting = encrypting
+        self._pad = pad
+        self._unpad = unpad
+        self._mode = mode
+        self._buffer = b''
+        self._processed = 0
+        self._finalized = False
+
+    def update(self, data: _Buffer) -> bytes:
+        assert not self._finalized
+        buffer = self._buffer + data if self._buffer else bytes(data)
+
+        available = len(buffer) - len(buffer) % self.block_size
+        if self._pad is not None and not self._encrypting and available == len(buffer):
+            available -= self.block_size
+        if available <= 0:
+            self._buffer = buffer
+            return b''
+
+        output, self._state = self._process(memoryview(buffer)[:available], self._state)
+        self._buffer = buffer[available:]
+        self._processed += available
+        return output
+
+    def finalize(self) -> bytes:
+        assert not self._finalized
+        self._finalized = True
+        buffer, self._buffer = self._buffer, b''
+
+        if self._pad is not None and self._encrypting:
+            padded = self._pad(buffer, self._processed)
+            return self._process(padded, self._state)[0] if padded else b''
+        if self._pad is not None:
+            assert len(buffer) == self.block_size
+            return self._unpad(self._process(buffer, self._state)[0])
+        if len(buffer) == 0:
+            return b''
+        return self._process(buffer, self._state)[0]
+
+    @property
+    def position(self) -> int:
+        return self._processed + len(self._buffer)
+
+    def checkpoint(self) -> bytes:
+        assert not self._finalized
+        if self._state is None:
+            kind, state = _STATE_NONE, b''
+        elif isinstance(self._state, int):
+            kind, state = _STATE_COUNTER, self._state.to_bytes(self.block_size, 'big')
+        else:
+            kind, state = _STATE_BLOCK, bytes(self._state)
+
+        mode = self._mode.encode('ascii')
+        flags = (self._pad is not None) | self._encrypting << 1
+        header = _CHECKPOINT_HEADER.pack(_CHECKPOINT_VERSION, self.block_size, len(mode), flags, kind, self._processed,
+                                         len(self._buffer))
+        return header + mode + state + bytes(self._buffer)
+
+    @staticmethod
+    def restore(checkpoint: bytes, encrypt: Callable[[bytes, Any], Tuple[bytes, Any]],
+                decrypt: Callable[[bytes, Any], Tuple[bytes, Any]], block_size: int = 16,
+                pad: Optional[Callable[[bytes, int], bytes]] = None, unpad: Optional[Callable[[bytes], bytes]] = None,
+                mode: str = '') -> 'CipherContext':
+        version, stored_block_size, mode_length, flags, kind, processed, buffer_length = \
+            _CHECKPOINT_HEADER.unpack_from(checkpoint)
+        assert version == _CHECKPOINT_VERSION
+        assert stored_block_size == block_size
+        offset = _CHECKPOINT_HEADER.size
+        assert checkpoint[offset:offset + mode_length] == mode.encode('ascii')
+        assert bool(flags & 1) == (pad is not None)
+        assert kind in (_STATE_NONE, _STATE_BLOCK, _STATE_COUNTER)
+
+        offset += mode_length
+        state_length = 0 if kind == _STATE_NONE else block_size
+        state = checkpoint[offset:offset + state_length]
+        buffer = checkpoint[offset + state_length:]
+        assert len(state) == state_length and len(buffer) == buffer_length <= block_size
+
+        if kind == _STATE_NONE:
+            state = None
+        elif kind == _STATE_COUNTER:
+            state = int.from_bytes(state, 'big')
+
+        encrypting = bool(flags & 2)
+        context = CipherContext(encrypt if encrypting else decrypt, state, encrypting, block_size, pad, unpad, mode)
+        context._processed = processed
+        context._buffer = bytes(buffer)
+        return context
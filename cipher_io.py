@@ -0,0 +1,115 @@
+import mmap
+import os
+import queue
+import threading
+from typing import List
+
+_CHUNK_SIZE = 1 << 20
+_QUEUE_SIZE = 4
+_DONE = object()
+
+
+def process_file(context, source_path: str, destination_path: str,
+                 chunk_size: int = _CHUNK_SIZE, queue_size: int = _QUEUE_SIZE) -> int:
+    block_size = context.block_size
+    assert chunk_size > 0 and chunk_size % block_size == 0
+    assert queue_size > 0
+
+    source_size = os.path.getsize(source_path)
+    capacity = source_size + block_size
+
+    with open(source_path, 'rb') as source, open(destination_path, 'w+b') as destination:
+        destination.truncate(capacity)
+        with mmap.mmap(destination.fileno(), capacity) as destination_map:
+            if source_size > 0:
+                with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as source_map:
+                    written = _pipeline(context, source_map, source_size, destination_map, chunk_size, queue_size)
+            else:
+                written = _pipeline(context, b'', 0, destination_map, chunk_size, queue_size)
+            destination_map.flush()
+        destination.truncate(written)
+
+    return written
+
+
+def decrypt_range(algorithm, iv: bytes, source_path: str, offset: int, length: int) -> bytes:
+    source_size = os.path.getsize(source_path)
+    assert 0 <= offset and 0 <= length and offset + length <= source_size
+    if length == 0:
+        return b''
+
+    with open(source_path, 'rb') as source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as source_map:
+        return algorithm.decrypt_range(source_map, iv, offset, length)
+
+
+def _pipeline(context, source, source_size: int, destination, chunk_size: int, queue_size: int) -> int:
+    read_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    written = [0]
+
+    reader = threading.Thread(target=_read_chunks, args=(source, source_size, chunk_size, read_queue, stop, errors))
+    writer = threading.Thread(target=_write_chunks, args=(destination, write_queue, written, stop, errors))
+    reader.start()
+    writer.start()
+
+    try:
+        while not stop.is_set():
+            chunk = read_queue.get()
+            if chunk is _DONE:
+                write_queue.put(context.finalize())
+                break
+            write_queue.put(context.update(chunk))
+    except BaseException as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        write_queue.put(_DONE)
+        _drain(read_queue, reader)
+        writer.join()
+
+    if errors:
+        raise errors[0]
+    return written[0]
+
+
+def _read_chunks(source, source_size: int, chunk_size: int, read_queue: queue.Queue, stop: threading.Event,
+                 errors: List[BaseException]) -> None:
+    try:
+        for offset in range(0, source_size, chunk_size):
+            if stop.is_set():
+                return
+            read_queue.put(source[offset:offset + chunk_size])
+    except BaseException as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        read_queue.put(_DONE)
+
+
+def _write_chunks(destination, write_queue: queue.Queue, written: List[int], stop: threading.Event,
+                  errors: List[BaseException]) -> None:
+    offset = 0
+    while True:
+        data = write_queue.get()
+        if data is _DONE:
+            break
+        if stop.is_set():
+            continue
+        try:
+            destination[offset:offset + len(data)] = data
+            offset += len(data)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+    written[0] = offset
+
+
+def _drain(read_queue: queue.Queue, reader: threading.Thread) -> None:
+    while reader.is_alive():
+        try:
+            read_queue.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    reader.join()
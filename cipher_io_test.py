@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+import aes
+import cipher_io
+import kalyna
+
+
+def _key() -> bytes:
+    return b'\x2b\x7e\x15\x16\x28\xae\xd2\xa6\xab\xf7\x15\x88\x09\xcf\x4f\x3c'
+
+
+def _iv() -> bytes:
+    return b'\x00\x01\x02\x03\x04\x05\x06\x07\x08\x09\x0a\x0b\x0c\x0d\x0e\x0f'
+
+
+class ProcessFileTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self._source = os.path.join(self._directory.name, 'source')
+        self._encrypted = os.path.join(self._directory.name, 'encrypted')
+        self._decrypted = os.path.join(self._directory.name, 'decrypted')
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def test_cbc(self):
+        self._helper_test_process_file(aes.AES_CBC(key=_key()), (_iv(),))
+
+    def test_ctr(self):
+        self._helper_test_process_file(aes.AES_CTR(key=_key()), (_iv(),))
+
+    def test_ecb(self):
+        self._helper_test_process_file(aes.AES_ECB(key=_key()), ())
+
+    def test_kalyna(self):
+        for block_size in (128, 256, 512):
+            key = bytes(range(block_size // 8))
+            self._helper_test_process_file(kalyna.Kalyna_CBC(block_size=block_size, key=key), (key,))
+            self._helper_test_process_file(kalyna.Kalyna_CTR(block_size=block_size, key=key), (key,))
+
+    def test_context_error(self):
+        self._write_source(b'a' * 100)
+        with self.assertRaises(AssertionError):
+            cipher_io.process_file(aes.AES_CBC(key=_key()).decryptor(_iv()), self._source, self._decrypted, 32)
+
+    def test_decrypt_range(self):
+        algorithm = aes.AES_CTR(key=_key())
+        content = os.urandom(5000)
+        self._write_source(algorithm.encrypt(content, _iv()))
+        for offset, length in ((0, 0), (0, 5000), (7, 100), (4096, 904)):
+            self.assertEqual(content[offset:offset + length],
+                             cipher_io.decrypt_range(algorithm, _iv(), self._source, offset, length))
+
+    def _helper_test_process_file(self, algorithm, args):
+        for length in (0, 1, 17, 100, 4097, 5000):
+            content = os.urandom(length)
+            self._write_source(content)
+            expected = algorithm.encrypt(content, *args)
+
+            written = cipher_io.process_file(algorithm.encryptor(*args), self._source, self._encrypted, 64, 2)
+            self.assertEqual(len(expected), written)
+            with open(self._encrypted, 'rb') as encrypted:
+                self.assertEqual(expected, encrypted.read())
+
+            cipher_io.process_file(algorithm.decryptor(*args), self._encrypted, self._decrypted, 1024)
+            with open(self._decrypted, 'rb') as decrypted:
+                self.assertEqual(content, decrypted.read())
+
+    def _write_source(self, content: bytes) -> None:
+        with open(self._source, 'wb') as source:
+            source.write(content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+from typing import List, Sequence, Tuple
+
+
+class GaloisField:
+    def __init__(self, polynomial: int, generator: int) -> None:
+        assert 0x100 <= polynomial < 0x200
+
+        self.polynomial = polynomial
+        self.exp, self.log = GaloisField._exp_log_tables(polynomial, generator)
+        self._table = self._multiplication_table()
+
+    def multiply(self, a: int, b: int) -> int:
+        return self._table[a][b]
+
+    def row(self, a: int) -> Tuple[int]:
+        return self._table[a]
+
+    def dot(self, vector: Sequence[int], coefficients: Sequence[int]) -> int:
+        table = self._table
+        result = 0
+        for value, coefficient in zip(vector, coefficients):
+            result ^= table[coefficient][value]
+        return result
+
+    def multiply_matrix(self, matrix: Sequence[Sequence[int]], vector: Sequence[int]) -> List[int]:
+        return [self.dot(vector, row) for row in matrix]
+
+    def _multiplication_table(self) -> Tuple[Tuple[int]]:
+        exp, log = self.exp, self.log
+        table = [tuple([0] * 256)]
+        for a in range(1, 256):
+            log_a = log[a]
+            table.append(tuple([0] + [exp[log_a + log[b]] for b in range(1, 256)]))
+        return tuple(table)
+
+    @staticmethod
+    def _exp_log_tables(polynomial: int, generator: int) -> Tuple[Tuple[int], Tuple[int]]:
+        exp = [0] * 510
+        log = [0] * 256
+        x = 1
+        for i in range(255):
+            exp[i] = x
+            log[x] = i
+            x = _multiply(x, generator, polynomial)
+        assert x == 1 and len(set(exp[:255])) == 255, 'generator does not generate the multiplicative group'
+        for i in range(255, 510):
+            exp[i] = exp[i - 255]
+        return tuple(exp), tuple(log)
+
+
+def _multiply(a: int, b: int, polynomial: int) -> int:
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        a <<= 1
+        if a & 0x100:
+            a ^= polynomial
+        b >>= 1
+    return result
+
+
+AES_FIELD = GaloisField(0x11b, 0x03)
+DSTU_FIELD = GaloisField(0x11d, 0x02)
@@ -0,0 +1,54 @@
+import unittest
+import galois
+
+
+def _bitwise_multiplication(a: int, b: int, polynomial: int) -> int:
+    p = 0
+    for _ in range(8):
+        if b & 1:
+            p ^= a
+        hi_bit_set = a & 0x80
+        a = (a << 1) & 0xff
+        if hi_bit_set:
+            a ^= polynomial & 0xff
+        b >>= 1
+    return p
+
+
+class GaloisFieldTest(unittest.TestCase):
+    def test_multiply_aes(self):
+        self._helper_test_multiply(galois.AES_FIELD)
+        self.assertEqual(0xc1, galois.AES_FIELD.multiply(0x57, 0x83))
+        self.assertEqual(0xfe, galois.AES_FIELD.multiply(0x57, 0x13))
+
+    def test_multiply_dstu(self):
+        self._helper_test_multiply(galois.DSTU_FIELD)
+
+    def test_dot(self):
+        field = galois.AES_FIELD
+        self.assertEqual(0x04, field.dot([0xd4, 0xbf, 0x5d, 0x30], [0x02, 0x03, 0x01, 0x01]))
+        self.assertEqual([0x04, 0x66, 0x81, 0xe5], field.multiply_matrix(
+            [[0x02, 0x03, 0x01, 0x01],
+             [0x01, 0x02, 0x03, 0x01],
+             [0x01, 0x01, 0x02, 0x03],
+             [0x03, 0x01, 0x01, 0x02]],
+            [0xd4, 0xbf, 0x5d, 0x30]
+        ))
+
+    def test_row(self):
+        for a in (0, 1, 2, 0x8d, 0xff):
+            self.assertEqual([galois.DSTU_FIELD.multiply(a, b) for b in range(256)], list(galois.DSTU_FIELD.row(a)))
+
+    def test_invalid_generator(self):
+        with self.assertRaises(AssertionError):
+            galois.GaloisField(0x11b, 0x02)
+
+    def _helper_test_multiply(self, field: galois.GaloisField):
+        for a in range(256):
+            for b in range(0, 256, 7):
+                self.assertEqual(_bitwise_multiplication(a, b, field.polynomial), field.multiply(a, b))
+                self.assertEqual(field.multiply(a, b), field.multiply(b, a))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,15 @@
-from typing import List, Tuple, Any
+from typing import List, Tuple, Any, Callable, Dict, Optional, Union
 import os
 
-_State = List[List[int]]
+import cipher_base
+import galois
+import xor
+
+_State = List[int]
 _SBox = Tuple
+_Buffer = Union[bytes, bytearray, memoryview]
+
+_MASK_64 = (1 << 64) - 1
 
 
 def _bytes_to_string(b: bytes):
@@ -11,9 +18,8 @@ def _bytes_to_string(b: bytes):
 
 
 def _print_state(state: _State):
-    hexes = [list(map(lambda x: hex(x), y)) for y in state]
     print()
-    print('\n'.join(list(map(str, hexes))))
+    print('\n'.join(hex(column) for column in state))
 
 
 def _state_to_str(state: _State):
@@ -23,16 +29,17 @@ def _state_to_str(state: _State):
     return ' '.join(reversed_parts)
 
 
-class Kalyna:
+class _BaseKalyna:
     _block_size_to_key_length = {128: {128, 256}, 256: {256, 512}, 512: {512}}
 
     def __init__(self, **kwargs) -> None:
         assert 'block_size' in kwargs
         self._block_size = kwargs['block_size']
+        assert self._block_size in self._block_size_to_key_length
 
         if 'key_length' in kwargs:
             key_length = kwargs['key_length']
-            assert key_length in self._block_size_to_key_length[key_length]
+            assert key_length in self._block_size_to_key_length[self._block_size]
             self._K = os.urandom(key_length // 8)
         else:
             assert 'key' in kwargs
@@ -43,6 +50,66 @@ class Kalyna:
         self._encryptor = _KalynaEncryptor(self._block_size, self._K)
         self._bytes_in_block = self._block_size // 8
 
+
+class _KalynaMode(_BaseKalyna, cipher_base.ParallelMixin):
+    _padded = False
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._init_workers(kwargs.get('workers'))
+
+    def _worker_kwargs(self) -> Dict[str, Any]:
+        return {'block_size': self._block_size, 'key': self._K}
+
+    def encrypt(self, plaintext: _Buffer, iv: bytes) -> bytes:
+        context = self.encryptor(iv)
+        return context.update(plaintext) + context.finalize()
+
+    def decrypt(self, ciphertext: _Buffer, iv: bytes) -> bytes:
+        context = self.decryptor(iv)
+        return context.update(ciphertext) + context.finalize()
+
+    def encryptor(self, iv: bytes) -> cipher_base.CipherContext:
+        return self._context(self._encrypt_blocks, self._initial_state(iv), True)
+
+    def decryptor(self, iv: bytes) -> cipher_base.CipherContext:
+        return self._context(self._decrypt_blocks, self._initial_state(iv), False)
+
+    def resume(self, checkpoint: bytes) -> cipher_base.CipherContext:
+        return cipher_base.CipherContext.restore(checkpoint, self._encrypt_blocks, self._decrypt_blocks,
+                                                 self._bytes_in_block, *self._padding(), type(self).__name__)
+
+    def _context(self, process: Callable[[_Buffer, Any], Tuple[bytes, Any]], state: Any,
+                 encrypting: bool) -> cipher_base.CipherContext:
+        return cipher_base.CipherContext(process, state, encrypting, self._bytes_in_block, *self._padding(),
+                                         type(self).__name__)
+
+    def _padding(self) -> Tuple[Optional[Callable[[bytes, int], bytes]], Optional[Callable[[bytes], bytes]]]:
+        return (self._pad_final, self._unpad) if self._padded else (None, None)
+
+    def _initial_state(self, iv: bytes) -> Any:
+        assert len(iv) == self._bytes_in_block
+        return bytes(iv)
+
+    def _blocks(self, data: _Buffer) -> List[_Buffer]:
+        n = self._bytes_in_block
+        return [data[i:i + n] for i in range(0, len(data), n)]
+
+    def _pad(self, plaintext: bytes) -> bytes:
+        padding_len = self._bytes_in_block - len(plaintext) % self._bytes_in_block
+        return bytes(plaintext) + b'\x80' + bytes(padding_len - 1)
+
+    def _pad_final(self, tail: bytes, processed: int) -> bytes:
+        return self._pad(tail)
+
+    def _unpad(self, plaintext: bytes) -> bytes:
+        assert len(plaintext) > 0 and len(plaintext) % self._bytes_in_block == 0
+        unpadded = plaintext.rstrip(b'\x00')
+        assert len(unpadded) > 0 and unpadded[-1] == 0x80 and len(plaintext) - len(unpadded) < self._bytes_in_block
+        return unpadded[:-1]
+
+
+class Kalyna(_BaseKalyna):
     def encrypt(self, plaintext: bytes) -> bytes:
         plaintext = self._pad(plaintext)
 
@@ -81,6 +148,87 @@ class Kalyna:
         return [plaintext[i:i + self._bytes_in_block] for i in range(0, len(plaintext), self._bytes_in_block)]
 
 
+class Kalyna_CBC(_KalynaMode):
+    _padded = True
+
+    def _encrypt_blocks(self, data: _Buffer, previous: bytes) -> Tuple[bytes, bytes]:
+        cipher = self._encryptor.cipher
+        blocks = []
+        for block in self._blocks(data):
+            previous = cipher(xor.xor_bytes(block, previous))
+            blocks.append(previous)
+        return b''.join(blocks), previous
+
+    def _decrypt_blocks(self, data: _Buffer, previous: bytes) -> Tuple[bytes, bytes]:
+        inv_cipher = self._encryptor.inv_cipher
+        blocks = []
+        for block in self._blocks(data):
+            blocks.append(xor.xor_bytes(inv_cipher(block), previous))
+            previous = bytes(block)
+        return b''.join(blocks), previous
+
+
+class Kalyna_CFB(_KalynaMode):
+    def _encrypt_blocks(self, data: _Buffer, previous: bytes) -> Tuple[bytes, bytes]:
+        cipher = self._encryptor.cipher
+        blocks = []
+        for block in self._blocks(data):
+            previous = xor.xor_bytes(block, cipher(previous))
+            blocks.append(previous)
+        return b''.join(blocks), previous
+
+    def _decrypt_blocks(self, data: _Buffer, previous: bytes) -> Tuple[bytes, bytes]:
+        cipher = self._encryptor.cipher
+        blocks = []
+        for block in self._blocks(data):
+            blocks.append(xor.xor_bytes(block, cipher(previous)))
+            previous = bytes(block)
+        return b''.join(blocks), previous
+
+
+class Kalyna_OFB(_KalynaMode):
+    def _encrypt_blocks(self, data: _Buffer, gamma: bytes) -> Tuple[bytes, bytes]:
+        cipher = self._encryptor.cipher
+        keystream = []
+        for _ in range(0, len(data), self._bytes_in_block):
+            gamma = cipher(gamma)
+            keystream.append(gamma)
+        return xor.xor_bytes(data, b''.join(keystream)), gamma
+
+    _decrypt_blocks = _encrypt_blocks
+
+
+class Kalyna_CTR(_KalynaMode):
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._counter_mask = (1 << self._block_size) - 1
+
+    def _initial_state(self, iv: bytes) -> int:
+        return int.from_bytes(self._encryptor.cipher(super()._initial_state(iv)), 'little')
+
+    def _encrypt_blocks(self, data: _Buffer, counter: int) -> Tuple[bytes, int]:
+        n = self._bytes_in_block
+        if self._parallel(len(data)):
+            chunk = max(n, cipher_base.PARALLEL_CHUNK // n * n)
+            tasks = ((bytes(data[i:i + chunk]), (counter + i // n) & self._counter_mask)
+                     for i in range(0, len(data), chunk))
+            out = bytearray(len(data))
+            self._map_workers_into('_ctr', tasks, memoryview(out))
+            output = bytes(out)
+        else:
+            output = self._ctr(data, counter)
+        return output, (counter + (len(data) + n - 1) // n) & self._counter_mask
+
+    _decrypt_blocks = _encrypt_blocks
+
+    def _ctr(self, data: _Buffer, counter: int) -> bytes:
+        n, mask, cipher = self._bytes_in_block, self._counter_mask, self._encryptor.cipher
+        keystream = b''.join(
+            cipher(((counter + i) & mask).to_bytes(n, 'little')) for i in range(1, (len(data) + n - 1) // n + 1)
+        )
+        return xor.xor_bytes(data, keystream)
+
+
 class _KalynaEncryptor:
     _n_rows = 8
 
@@ -262,11 +410,14 @@ class _KalynaEncryptor:
         self._nb = block_size // 64
         self._nk = len(key) // 8
 
-        self._cipher_S_boxes = [self._S_box_0, self._S_box_1, self._S_box_2, self._S_box_3]
-        self._inv_cipher_S_boxes = [self._inv_S_box_0, self._inv_S_box_1, self._inv_S_box_2, self._inv_S_box_3]
+        self._row_shifts = [(i * block_size) // 512 for i in range(_KalynaEncryptor._n_rows)]
+        self._sources = self._column_sources(self._row_shifts)
+        self._inv_sources = self._column_sources([-shift for shift in self._row_shifts])
+        self._identity_sources = self._column_sources([0] * _KalynaEncryptor._n_rows)
 
         self._round_keys = [[]] * (self._nr + 1)
         self._key_expansion(key)
+        self._inv_round_keys = self._inv_key_expansion()
 
     def _key_expansion(self, key: bytes) -> None:
         kt = self._key_expand_kt(key)
@@ -276,35 +427,22 @@ class _KalynaEncryptor:
     def _key_expand_kt(self, key: bytes) -> _State:
         key_state = self._in_to_state(key)
 
-        kt = [[0] * self._nb for _ in range(8)]
-        kt[0][0] += self._nb + self._nk + 1
+        kt = [0] * self._nb
+        kt[0] += self._nb + self._nk + 1
 
         if self._nb == self._nk:
-            k0 = [[key_state[i][j] for j in range(len(key_state[i]))] for i in range(len(key_state))]
-            k1 = [[key_state[i][j] for j in range(len(key_state[i]))] for i in range(len(key_state))]
+            k0 = list(key_state)
+            k1 = list(key_state)
         else:
-            k0 = [[key_state[i][j] for j in range(len(key_state[i]) // 2)] for i in range(len(key_state))]
-            k1 = [[key_state[i][j] for j in range(len(key_state[i]) // 2, len(key_state[i]))] for i in
-                  range(len(key_state))]
+            k0 = key_state[:self._nb]
+            k1 = key_state[self._nb:]
 
-        _state_to_str(k0)
         self._add_round_key_expand(k0, kt)
-
-        self._non_linear_bijective_mapping(kt)
-        self._right_circular_shift(kt)
-        self._linear_transformation_over_finite_field(kt)
-
+        self._round(kt)
         self._xor_round_key_expand(k1, kt)
-
-        self._non_linear_bijective_mapping(kt)
-        self._right_circular_shift(kt)
-        self._linear_transformation_over_finite_field(kt)
-
+        self._round(kt)
         self._add_round_key_expand(k0, kt)
-
-        self._non_linear_bijective_mapping(kt)
-        self._right_circular_shift(kt)
-        self._linear_transformation_over_finite_field(kt)
+        self._round(kt)
 
         return kt
 
@@ -321,29 +459,7 @@ class _KalynaEncryptor:
         round = 0
 
         while True:
-            current_key = [[kt[i][j] for j in range(self._nb)] for i in range(len(kt))]
-
-            self._add_round_key_expand(tmv, current_key)
-            kt_round = [[current_key[i][j] for j in range(self._nb)] for i in range(len(current_key))]
-
-            current_key = [[initial_data[i][j] for j in range(self._nb)] for i in range(len(initial_data))]
-
-            self._add_round_key_expand(kt_round, current_key)
-
-            self._non_linear_bijective_mapping(current_key)
-            self._right_circular_shift(current_key)
-            self._linear_transformation_over_finite_field(current_key)
-
-            self._xor_round_key_expand(kt_round, current_key)
-
-            self._non_linear_bijective_mapping(current_key)
-            self._right_circular_shift(current_key)
-            self._linear_transformation_over_finite_field(current_key)
-
-            self._add_round_key_expand(kt_round, current_key)
-
-            self._round_keys[round] = [[current_key[i][j] for j in range(self._nb)] for i in
-                                       range(len(current_key))]
+            self._round_keys[round] = self._expand_round_key(kt, tmv, initial_data[:self._nb])
 
             if self._nr == round:
                 break
@@ -352,59 +468,63 @@ class _KalynaEncryptor:
                 round += 2
 
                 self._shift_left(self._nb, tmv)
+                self._round_keys[round] = self._expand_round_key(kt, tmv, initial_data[self._nb:])
 
-                current_key = [[kt[i][j] for j in range(self._nb)] for i in range(len(kt))]
-                self._add_round_key_expand(tmv, current_key)
-                kt_round = [[current_key[i][j] for j in range(self._nb)] for i in range(len(current_key))]
-
-                current_key = [[initial_data[i][j] for j in range(len(initial_data[i]) // 2, len(initial_data[i]))]
-                               for i in range(len(initial_data))]
+                if self._nr == round:
+                    break
 
-                self._add_round_key_expand(kt_round, current_key)
+            round += 2
+            self._shift_left(self._nb, tmv)
+            self._rotate(initial_data)
 
-                self._non_linear_bijective_mapping(current_key)
-                self._right_circular_shift(current_key)
-                self._linear_transformation_over_finite_field(current_key)
+    def _expand_round_key(self, kt: _State, tmv: _State, current_key: _State) -> _State:
+        kt_round = list(kt)
+        self._add_round_key_expand(tmv, kt_round)
 
-                self._xor_round_key_expand(kt_round, current_key)
+        self._add_round_key_expand(kt_round, current_key)
+        self._round(current_key)
+        self._xor_round_key_expand(kt_round, current_key)
+        self._round(current_key)
+        self._add_round_key_expand(kt_round, current_key)
 
-                self._non_linear_bijective_mapping(current_key)
-                self._right_circular_shift(current_key)
-                self._linear_transformation_over_finite_field(current_key)
+        return current_key
 
-                self._add_round_key_expand(kt_round, current_key)
+    def _round(self, state: _State) -> None:
+        state[:] = self._lookup(state, _Te, self._sources, self._zero_key())
 
-                self._round_keys[round] = current_key
+    def _zero_key(self) -> _State:
+        return [0] * self._nb
 
-                if self._nr == round:
-                    break
+    def _column_sources(self, shifts: List[int]) -> List[Tuple[int, ...]]:
+        return [tuple((column + shift) % self._nb for shift in shifts) for column in range(self._nb)]
 
-            round += 2
-            self._shift_left(self._nb, tmv)
-            self._rotate(initial_data)
+    @staticmethod
+    def _lookup(state: _State, tables: Tuple[Tuple[int], ...], sources: List[Tuple[int, ...]],
+                round_key: _State) -> _State:
+        t0, t1, t2, t3, t4, t5, t6, t7 = tables
+        return [
+            t0[state[c0] & 0xff] ^ t1[(state[c1] >> 8) & 0xff] ^ t2[(state[c2] >> 16) & 0xff] ^
+            t3[(state[c3] >> 24) & 0xff] ^ t4[(state[c4] >> 32) & 0xff] ^ t5[(state[c5] >> 40) & 0xff] ^
+            t6[(state[c6] >> 48) & 0xff] ^ t7[state[c7] >> 56] ^ k
+            for (c0, c1, c2, c3, c4, c5, c6, c7), k in zip(sources, round_key)
+        ]
+
+    def _inv_key_expansion(self) -> List[_State]:
+        zero_key = self._zero_key()
+        return [self._lookup(round_key, _Tl, self._identity_sources, zero_key) for round_key in self._round_keys]
 
     @staticmethod
     def _shift_left(state_size: int, state_value: _State) -> None:
         for column in range(state_size):
-            state_column = [state_value[i][column] for i in range(8)]
-            state_column_int = _KalynaEncryptor._list_to_int(state_column)
-
-            columns_shift = _KalynaEncryptor._int_to_list(state_column_int << 1)
-            for i in range(8):
-                state_value[i][column] = columns_shift[i]
+            state_value[column] = (state_value[column] << 1) & _MASK_64
 
     @staticmethod
     def _rotate(state_value: _State) -> None:
-        for row in range(len(state_value)):
-            temp = state_value[row][0]
-            for column in range(1, len(state_value[0])):
-                state_value[row][column - 1] = state_value[row][column]
-            state_value[row][-1] = temp
+        state_value.append(state_value.pop(0))
 
     def _key_expand_odd(self) -> None:
         for i in range(1, self._nr, 2):
-            previous_key = self._round_keys[i - 1]
-            current_key = [[previous_key[i][j] for j in range(len(previous_key[i]))] for i in range(len(previous_key))]
+            current_key = list(self._round_keys[i - 1])
             self._rotate_left(self._nb, current_key)
 
             self._round_keys[i] = current_key
@@ -415,219 +535,99 @@ class _KalynaEncryptor:
         state_int = _KalynaEncryptor._state_to_int(state_value)
         state_int_bits = state_size * 64
         left_part = (state_int >> rotate_bits)
-        right_part = (state_int << (state_int_bits - rotate_bits)) \
-                     & _KalynaEncryptor._rotation_mask(len(state_value[0]))
-        rotated = left_part | right_part
-        rotated_state = _KalynaEncryptor._int_to_state(rotated, len(state_value[0]))
-        for i in range(len(rotated_state)):
-            for j in range(len(rotated_state[i])):
-                state_value[i][j] = rotated_state[i][j]
+        right_part = (state_int << (state_int_bits - rotate_bits)) & _KalynaEncryptor._rotation_mask(state_size)
+        state_value[:] = _KalynaEncryptor._int_to_state(left_part | right_part, state_size)
 
     @staticmethod
     def _state_to_int(state: _State) -> int:
         result = 0
-        for column in reversed(range(len(state[0]))):
-            column_values = [state[i][column] for i in range(len(state))]
-            result <<= 64
-            result |= _KalynaEncryptor._list_to_int(column_values)
+        for column in reversed(state):
+            result = result << 64 | column
         return result
 
     @staticmethod
     def _int_to_state(value: int, state_size) -> _State:
-        result = [[] for _ in range(_KalynaEncryptor._n_rows)]
-        for _ in range(state_size):
-            column_int = value & 0xffffffffffffffff
-            value >>= 64
-            column = _KalynaEncryptor._int_to_list(column_int)
-            for i, column_value in enumerate(column):
-                result[i].append(column_value)
-        return result
+        return [(value >> (64 * column)) & _MASK_64 for column in range(state_size)]
 
     @staticmethod
     def _rotation_mask(mask_length) -> int:
-        mask = '0x' + 'ffffffffffffffff' * mask_length
-        return int(mask, 16)
+        return (1 << (64 * mask_length)) - 1
 
     def cipher(self, _in: bytes) -> bytes:
-        state = self._in_to_state(_in)
+        assert len(_in) == 8 * self._nb
+        lookup, sources, round_keys = self._lookup, self._sources, self._round_keys
 
-        self._add_round_key_modulo_2_64(state, self._round_keys[0])
+        state = self._in_to_state(_in)
+        self._add_round_key_modulo_2_64(state, round_keys[0])
 
         for round in range(1, self._nr):
-            self._non_linear_bijective_mapping(state)
-            self._right_circular_shift(state)
-            self._linear_transformation_over_finite_field(state)
-
-            self._add_round_key_modulo_2(state, self._round_keys[round])
+            state = lookup(state, _Te, sources, round_keys[round])
 
-        self._non_linear_bijective_mapping(state)
-        self._right_circular_shift(state)
-        self._linear_transformation_over_finite_field(state)
-
-        self._add_round_key_modulo_2_64(state, self._round_keys[-1])
+        state = lookup(state, _Te, sources, self._zero_key())
+        self._add_round_key_modulo_2_64(state, round_keys[-1])
         return self._state_to_out(state)
 
     def inv_cipher(self, _in: bytes) -> bytes:
-        state = self._in_to_state(_in)
+        assert len(_in) == 8 * self._nb
+        lookup, sources, inv_round_keys = self._lookup, self._inv_sources, self._inv_round_keys
+        zero_key = self._zero_key()
 
+        state = self._in_to_state(_in)
         self._subtract_round_key_modulo_2_64(state, self._round_keys[-1])
+        state = lookup(state, _Tl, self._identity_sources, zero_key)
 
         for round in reversed(range(1, self._nr)):
-            self._inv_linear_transformation_over_finite_field(state)
-            self._left_circular_shift(state)
-            self._inv_non_linear_bijective_mapping(state)
-
-            self._add_round_key_modulo_2(state, self._round_keys[round])
-
-        self._inv_linear_transformation_over_finite_field(state)
-        self._left_circular_shift(state)
-        self._inv_non_linear_bijective_mapping(state)
+            state = lookup(state, _Td, sources, inv_round_keys[round])
 
+        state = lookup(state, _Ts, sources, zero_key)
         self._subtract_round_key_modulo_2_64(state, self._round_keys[0])
-
         return self._state_to_out(state)
 
     @staticmethod
     def _in_to_state(_in: bytes) -> _State:
-        result = list()
-        for i in range(_KalynaEncryptor._n_rows):
-            result.append(list())
-
-        for i in range(len(_in)):
-            result[i % _KalynaEncryptor._n_rows].append(_in[i])
-        return result
+        return [int.from_bytes(_in[i:i + 8], 'little') for i in range(0, len(_in), 8)]
 
     @staticmethod
     def _state_to_out(state: _State) -> bytes:
-        result = list()
-        for j in range(len(state[0])):
-            for i in range(_KalynaEncryptor._n_rows):
-                result.append(state[i][j])
-        return bytes(result)
+        return b''.join(column.to_bytes(8, 'little') for column in state)
 
     @staticmethod
     def _add_round_key_modulo_2_64(state: _State, w: _State) -> None:
-        for column in range(len(state[0])):
-            state_column = [state[i][column] for i in range(8)]
-            w_column = [w[i][column] for i in range(8)]
-            state_column_int = _KalynaEncryptor._list_to_int(state_column)
-            w_column_int = _KalynaEncryptor._list_to_int(w_column)
-            columns_sum = _KalynaEncryptor._int_to_list((state_column_int + w_column_int) % 2 ** 64)
-            for i in range(8):
-                state[i][column] = columns_sum[i]
+        for column in range(len(state)):
+            state[column] = (state[column] + w[column]) & _MASK_64
 
     @staticmethod
     def _subtract_round_key_modulo_2_64(state: _State, w: _State) -> None:
-        for column in range(len(state[0])):
-            state_column = [state[i][column] for i in range(8)]
-            w_column = [w[i][column] for i in range(8)]
-            state_column_int = _KalynaEncryptor._list_to_int(state_column)
-            w_column_int = _KalynaEncryptor._list_to_int(w_column)
-            columns_difference = _KalynaEncryptor._int_to_list((state_column_int - w_column_int) % 2 ** 64)
-            for i in range(8):
-                state[i][column] = columns_difference[i]
+        for column in range(len(state)):
+            state[column] = (state[column] - w[column]) & _MASK_64
 
     @staticmethod
     def _xor_round_key_modulo_2_64(state: _State, w: _State) -> None:
-        for column in range(len(state[0])):
-            state_column = [state[i][column] for i in range(8)]
-            w_column = [w[i][column] for i in range(8)]
-            state_column_int = _KalynaEncryptor._list_to_int(state_column)
-            w_column_int = _KalynaEncryptor._list_to_int(w_column)
-            columns_xor = _KalynaEncryptor._int_to_list((state_column_int ^ w_column_int) % 2 ** 64)
-            for i in range(8):
-                state[i][column] = columns_xor[i]
-
-    @staticmethod
-    def _list_to_int(a: List[int]) -> int:
-        result = 0
-        for i, value in enumerate(a):
-            result |= value << (8 * i)
-        return result
-
-    @staticmethod
-    def _int_to_list(a: int) -> List[int]:
-        result = list()
-        for i in range(8):
-            result.append(a & 0xff)
-            a >>= 8
-        return result
-
-    def _right_circular_shift(self, state: _State) -> None:
-        for i in range(len(state)):
-            shift = (i * self._block_size) // 512
-            state[i] = _KalynaEncryptor._do_shift(state[i], shift)
-
-    def _left_circular_shift(self, state: _State) -> None:
-        for i in range(len(state)):
-            state[i] = _KalynaEncryptor._do_shift(state[i], len(state[1]) - ((i * self._block_size) // 512))
-
-    @staticmethod
-    def _do_shift(sequence: List[Any], shift: int) -> List[Any]:
-        a = shift % len(sequence)
-        return sequence[a:] + sequence[:a]
-
-    @staticmethod
-    def _linear_transformation_over_finite_field(state: _State):
-        _KalynaEncryptor._multiply_by_matrix(state, _KalynaEncryptor._mds_matrix)
-
-    @staticmethod
-    def _inv_linear_transformation_over_finite_field(state: _State):
-        _KalynaEncryptor._multiply_by_matrix(state, _KalynaEncryptor._mds_inv_matrix)
-
-    @staticmethod
-    def _multiply_by_matrix(state: _State, matrix: _State) -> None:
-        result = [[0] * len(state[0]) for _ in range(len(state))]
-        for column in range(len(state[0])):
-            for row in reversed(range(8)):
-                product = 0
-                for b in reversed(range(8)):
-                    product ^= _KalynaEncryptor._galois_multiplication(state[b][column], matrix[row][b])
-                result[row][column] = product
-        for i in range(len(state)):
-            for j in range(len(state[0])):
-                state[i][j] = result[i][j]
-
-    @staticmethod
-    def _state_indices(state: _State, row: int, column: int):
-        i = (8 // len(state[0])) * column + (row // len(state[0]))
-        j = row % len(state[0])
-        return i, j
-
-    @staticmethod
-    def _reversed_state_indices(state: _State, row: int, column: int):
-        return _KalynaEncryptor._state_indices(state, 8 - row, len(state[0]) - column)
-
-    @staticmethod
-    def _galois_multiplication(x: int, y: int):
-        r = 0
-        for i in range(8):
-            if (y & 0x1) == 1:
-                r ^= x
-            hbit = x & 0x80
-            x <<= 1
-            if hbit == 0x80:
-                x ^= 0x011d
-            y >>= 1
-        return r
-
-    def _non_linear_bijective_mapping(self, state: _State):
-        _KalynaEncryptor._do_non_linear_bijective_mapping(state, self._cipher_S_boxes)
-
-    def _inv_non_linear_bijective_mapping(self, state: _State):
-        _KalynaEncryptor._do_non_linear_bijective_mapping(state, self._inv_cipher_S_boxes)
-
-    @staticmethod
-    def _do_non_linear_bijective_mapping(state: _State, S_boxes: List[_SBox]) -> None:
-        for i in range(len(state)):
-            for j in range(len(state[0])):
-                state[i][j] = S_boxes[i % len(S_boxes)][state[i][j]]
-
-    @staticmethod
-    def _add_round_key_modulo_2(state: _State, w: _State) -> None:
-        for i in range(len(state)):
-            for j in range(len(state[i])):
-                state[i][j] ^= w[i][j]
+        for column in range(len(state)):
+            state[column] ^= w[column]
+
+
+def _t_tables(S_boxes: List[_SBox], matrix: List[List[int]]) -> Tuple[Tuple[int], ...]:
+    g = galois.DSTU_FIELD.multiply
+    tables = []
+    for row in range(_KalynaEncryptor._n_rows):
+        S_box = S_boxes[row % len(S_boxes)]
+        tables.append(tuple(
+            sum(g(matrix[i][row], s) << (8 * i) for i in range(_KalynaEncryptor._n_rows)) for s in S_box
+        ))
+    return tuple(tables)
+
+
+_IDENTITY_S_BOX = tuple(range(256))
+_IDENTITY_MATRIX = [[int(i == j) for j in range(_KalynaEncryptor._n_rows)] for i in range(_KalynaEncryptor._n_rows)]
+
+_Te = _t_tables([_KalynaEncryptor._S_box_0, _KalynaEncryptor._S_box_1, _KalynaEncryptor._S_box_2,
+                 _KalynaEncryptor._S_box_3], _KalynaEncryptor._mds_matrix)
+_Td = _t_tables([_KalynaEncryptor._inv_S_box_0, _KalynaEncryptor._inv_S_box_1, _KalynaEncryptor._inv_S_box_2,
+                 _KalynaEncryptor._inv_S_box_3], _KalynaEncryptor._mds_inv_matrix)
+_Tl = _t_tables([_IDENTITY_S_BOX], _KalynaEncryptor._mds_inv_matrix)
+_Ts = _t_tables([_KalynaEncryptor._inv_S_box_0, _KalynaEncryptor._inv_S_box_1, _KalynaEncryptor._inv_S_box_2,
+                 _KalynaEncryptor._inv_S_box_3], _IDENTITY_MATRIX)
 
 
 if __name__ == '__main__':
@@ -1,4 +1,7 @@
 import unittest
+from unittest import mock
+
+import cipher_base
 import kalyna
 
 
@@ -35,6 +38,63 @@ def _default_key_256() -> bytes:
     return b'\x00\x01\x02\x03\x04\x05\x06\x07\x08\x09\x0A\x0B\x0C\x0D\x0E\x0F\x10\x11\x12\x13\x14\x15\x16\x17\x18\x19\x1A\x1B\x1C\x1D\x1E\x1F'
 
 
+_S_BOX_TABLES = kalyna._t_tables([kalyna._KalynaEncryptor._S_box_0, kalyna._KalynaEncryptor._S_box_1,
+                                   kalyna._KalynaEncryptor._S_box_2, kalyna._KalynaEncryptor._S_box_3],
+                                  kalyna._IDENTITY_MATRIX)
+_SHIFT_TABLES = kalyna._t_tables([kalyna._IDENTITY_S_BOX], kalyna._IDENTITY_MATRIX)
+_MDS_TABLES = kalyna._t_tables([kalyna._IDENTITY_S_BOX], kalyna._KalynaEncryptor._mds_matrix)
+
+
+def _apply(encryptor, state, tables, sources):
+    return encryptor._lookup(state, tables, sources, encryptor._zero_key())
+
+
+def _sub_bytes(encryptor, state):
+    return _apply(encryptor, state, _S_BOX_TABLES, encryptor._identity_sources)
+
+
+def _inv_sub_bytes(encryptor, state):
+    return _apply(encryptor, state, kalyna._Ts, encryptor._identity_sources)
+
+
+def _shift_rows(encryptor, state):
+    return _apply(encryptor, state, _SHIFT_TABLES, encryptor._sources)
+
+
+def _inv_shift_rows(encryptor, state):
+    return _apply(encryptor, state, _SHIFT_TABLES, encryptor._inv_sources)
+
+
+def _mix_columns(encryptor, state):
+    return _apply(encryptor, state, _MDS_TABLES, encryptor._identity_sources)
+
+
+def _inv_mix_columns(encryptor, state):
+    return _apply(encryptor, state, kalyna._Tl, encryptor._identity_sources)
+
+
+def _reference_cipher(encryptor, _in: bytes) -> bytes:
+    state = encryptor._in_to_state(_in)
+    encryptor._add_round_key_modulo_2_64(state, encryptor._round_keys[0])
+    for round in range(1, encryptor._nr + 1):
+        state = _mix_columns(encryptor, _shift_rows(encryptor, _sub_bytes(encryptor, state)))
+        if round < encryptor._nr:
+            encryptor._xor_round_key_modulo_2_64(state, encryptor._round_keys[round])
+    encryptor._add_round_key_modulo_2_64(state, encryptor._round_keys[-1])
+    return encryptor._state_to_out(state)
+
+
+def _reference_inv_cipher(encryptor, _in: bytes) -> bytes:
+    state = encryptor._in_to_state(_in)
+    encryptor._subtract_round_key_modulo_2_64(state, encryptor._round_keys[-1])
+    for round in reversed(range(encryptor._nr)):
+        state = _inv_sub_bytes(encryptor, _inv_shift_rows(encryptor, _inv_mix_columns(encryptor, state)))
+        if round > 0:
+            encryptor._xor_round_key_modulo_2_64(state, encryptor._round_keys[round])
+    encryptor._subtract_round_key_modulo_2_64(state, encryptor._round_keys[0])
+    return encryptor._state_to_out(state)
+
+
 class KalynaEncryptionDecryptionParametersTest(unittest.TestCase):
     _plaintext = b'aaaaaaaaaaaaaaaaaaaa'
 
@@ -85,6 +145,109 @@ class KalynaEncryptionDecryptionTest(unittest.TestCase):
             self.assertEqual(plaintext, algorithm.decrypt(algorithm.encrypt(plaintext)))
 
 
+class KalynaModesTest(unittest.TestCase):
+    _modes = (kalyna.Kalyna_CBC, kalyna.Kalyna_CFB, kalyna.Kalyna_OFB, kalyna.Kalyna_CTR)
+    _parameters = ((128, 128), (128, 256), (256, 256), (256, 512), (512, 512))
+    _data = bytes((i * 71 + 3) % 256 for i in range(1000))
+
+    def test_encrypt_decrypt(self):
+        for mode in self._modes:
+            for block_size, key_length in self._parameters:
+                n = block_size // 8
+                algorithm = mode(block_size=block_size, key=bytes(range(key_length // 8)))
+                iv = bytes(range(16, 16 + n))
+                for length in (0, 1, n - 1, n, n + 1, 3 * n + 5):
+                    plaintext = self._data[:length]
+                    ciphertext = algorithm.encrypt(plaintext, iv)
+                    self.assertEqual(plaintext, algorithm.decrypt(ciphertext, iv))
+                    if mode is kalyna.Kalyna_CBC:
+                        self.assertEqual((length // n + 1) * n, len(ciphertext))
+                    else:
+                        self.assertEqual(length, len(ciphertext))
+
+    def test_known_answers(self):
+        key, iv = _default_key_128(), bytes(range(0x10, 0x20))
+        plaintext = bytes(range(0x20, 0x50))
+
+        ctr = kalyna.Kalyna_CTR(block_size=128, key=key)
+        self.assertEqual(bytes.fromhex(
+            'A90A6B9780ABDFDFF64D14F5439E88F266DC50EDD341528DD5E698E2F000CE21F872DAF9FE1811844A'
+        ), ctr.encrypt(plaintext[:41], iv))
+
+        cfb = kalyna.Kalyna_CFB(block_size=128, key=key)
+        self.assertEqual(bytes.fromhex(
+            'A19E3E5E53BE8A07C9E0C01298FF83291F8EE6212110BE3FA5C72C88A082520B265570FE28680719D9B4465E169BC37A'
+        ), cfb.encrypt(plaintext, iv))
+
+        ofb = kalyna.Kalyna_OFB(block_size=128, key=key)
+        self.assertEqual(bytes.fromhex(
+            'A19E3E5E53BE8A07C9E0C01298FF832953205C661BD85A51F3A94113BC785CAB634B36E89A8FDD16A12E4467F5CC5A26'
+        ), ofb.encrypt(plaintext, iv))
+
+        encryptor = kalyna.Kalyna_CBC(block_size=128, key=key).encryptor(iv)
+        self.assertEqual(bytes.fromhex(
+            'A73625D7BE994E85469A9FAABCEDAAB6DBC5F65DD77BB35E06BD7D1D8EAFC8624D6CB31CE189C82B8979F2936DE9BF14'
+        ), encryptor.update(plaintext))
+
+    def test_ecb_has_no_streaming_api(self):
+        algorithm = kalyna.Kalyna(block_size=128, key=_default_key_128())
+        self.assertFalse(hasattr(algorithm, 'encryptor'))
+        self.assertFalse(hasattr(algorithm, 'decryptor'))
+
+    def test_streaming(self):
+        iv = bytes(range(16, 48))
+        for mode in self._modes:
+            algorithm = mode(block_size=256, key=_default_key_256())
+            ciphertext = algorithm.encrypt(self._data, iv)
+            for chunk_size in (1, 31, 32, 100):
+                encryptor, decryptor = algorithm.encryptor(iv), algorithm.decryptor(iv)
+                encrypted, decrypted = [], []
+                for i in range(0, len(ciphertext), chunk_size):
+                    encrypted.append(encryptor.update(self._data[i:i + chunk_size]))
+                    decrypted.append(decryptor.update(ciphertext[i:i + chunk_size]))
+                encrypted.append(encryptor.finalize())
+                decrypted.append(decryptor.finalize())
+                self.assertEqual(ciphertext, b''.join(encrypted))
+                self.assertEqual(self._data, b''.join(decrypted))
+
+    def test_checkpoint(self):
+        for mode in self._modes:
+            for block_size, key_length in self._parameters:
+                n = block_size // 8
+                key, iv = bytes(range(key_length // 8)), bytes(range(16, 16 + n))
+                ciphertext = mode(block_size=block_size, key=key).encrypt(self._data, iv)
+                encryptor = mode(block_size=block_size, key=key).encryptor(iv)
+                head = encryptor.update(self._data[:3 * n + 5])
+                resumed = mode(block_size=block_size, key=key).resume(encryptor.checkpoint())
+                self.assertEqual(ciphertext, head + resumed.update(self._data[3 * n + 5:]) + resumed.finalize())
+
+        checkpoint = kalyna.Kalyna_CBC(block_size=128, key=_default_key_128()).encryptor(bytes(16)).checkpoint()
+        with self.assertRaises(AssertionError):
+            kalyna.Kalyna_CFB(block_size=128, key=_default_key_128()).resume(checkpoint)
+        with self.assertRaises(AssertionError):
+            kalyna.Kalyna_CBC(block_size=256, key=_default_key_256()).resume(checkpoint)
+
+    def test_parallel_ctr(self):
+        iv = bytes(range(16, 32))
+        ciphertext = kalyna.Kalyna_CTR(block_size=128, key=_default_key_128()).encrypt(self._data, iv)
+        with mock.patch.object(cipher_base, 'PARALLEL_CHUNK', 64), \
+                kalyna.Kalyna_CTR(block_size=128, key=_default_key_128(), workers=2) as parallel:
+            self.assertEqual(ciphertext, parallel.encrypt(self._data, iv))
+            self.assertEqual(self._data, parallel.decrypt(ciphertext, iv))
+            self.assertIsNotNone(parallel._pool)
+
+    def test_invalid_arguments(self):
+        algorithm = kalyna.Kalyna_CBC(block_size=128, key=_default_key_128())
+        with self.assertRaises(AssertionError):
+            algorithm.encrypt(b'a', b'a' * 32)
+        with self.assertRaises(AssertionError):
+            algorithm.decrypt(b'a' * 20, b'a' * 16)
+        with self.assertRaises(AssertionError):
+            algorithm.decrypt(algorithm._encryptor.cipher(bytes(16)), bytes(16))
+        with self.assertRaises(AssertionError):
+            kalyna.Kalyna_CTR(block_size=256, key=_default_key_128())
+
+
 class KalynaEncryptorCipherTest(unittest.TestCase):
     def test_kalyna_cipher(self):
         self.helper_test_kalyna_cipher(
@@ -115,6 +278,31 @@ class KalynaEncryptorInvCipherTest(unittest.TestCase):
         self.assertEqual(expected_out, algorithm.inv_cipher(_in))
 
 
+class KalynaEncryptorTablesTest(unittest.TestCase):
+    _parameters = ((128, 128), (128, 256), (256, 256), (256, 512), (512, 512))
+
+    def test_round(self):
+        for block_size, key_length in self._parameters:
+            algorithm = kalyna._KalynaEncryptor(block_size, bytes(range(key_length // 8)))
+            state = algorithm._in_to_state(bytes((i * 37 + 5) % 256 for i in range(block_size // 8)))
+            expected = _mix_columns(algorithm, _shift_rows(algorithm, _sub_bytes(algorithm, state)))
+            algorithm._round(state)
+            self.assertEqual(expected, state)
+
+    def test_cipher(self):
+        for block_size, key_length in self._parameters:
+            algorithm = kalyna._KalynaEncryptor(block_size, bytes(range(key_length // 8)))
+            for seed in range(5):
+                _in = bytes((i * 53 + seed * 11) % 256 for i in range(block_size // 8))
+                self.assertEqual(_reference_cipher(algorithm, _in), algorithm.cipher(_in))
+                self.assertEqual(_reference_inv_cipher(algorithm, _in), algorithm.inv_cipher(_in))
+                self.assertEqual(_in, algorithm.inv_cipher(algorithm.cipher(_in)))
+
+    def test_block_length(self):
+        with self.assertRaises(AssertionError):
+            kalyna._KalynaEncryptor(256, _default_key_256()).cipher(b'a' * 16)
+
+
 class KalynaEncryptorCipherInvCipherTest(unittest.TestCase):
     def test_cipher_inv_cipher(self):
         algorithm = kalyna._KalynaEncryptor(128, _default_key_128())
@@ -144,7 +332,7 @@ class KalynaEncryptorUtilityTest(unittest.TestCase):
         for key_index in range(len(expected_keys)):
             expected_key = kalyna._KalynaEncryptor._in_to_state(expected_keys[key_index])
             actual_key = algorithm._round_keys[key_index]
-            if len(expected_key[0]) > 0:
+            if len(expected_key) > 0:
                 self.assertEqual(expected_key, actual_key)
 
     def test_key_expansion_128_256(self):
@@ -173,7 +361,7 @@ class KalynaEncryptorUtilityTest(unittest.TestCase):
             print(f'key_index: {key_index}')
             expected_key = kalyna._KalynaEncryptor._in_to_state(expected_keys[key_index])
             actual_key = algorithm._round_keys[key_index]
-            if len(expected_key[0]) > 0:
+            if len(expected_key) > 0:
                 self.assertEqual(expected_key, actual_key)
 
     def test_round_key_expand_128(self):
@@ -203,29 +391,11 @@ class KalynaEncryptorUtilityTest(unittest.TestCase):
         self.assertEqual(out_state, state)
 
     def test_state_to_int(self):
-        state = [
-            [0, 8],
-            [1, 9],
-            [2, 10],
-            [3, 11],
-            [4, 12],
-            [5, 13],
-            [6, 14],
-            [7, 15]
-        ]
+        state = [0x0706050403020100, 0x0f0e0d0c0b0a0908]
         self.assertEqual(0x0f0e0d0c0b0a09080706050403020100, kalyna._KalynaEncryptor._state_to_int(state))
 
     def test_int_to_state(self):
-        expected_state = [
-            [0, 8],
-            [1, 9],
-            [2, 10],
-            [3, 11],
-            [4, 12],
-            [5, 13],
-            [6, 14],
-            [7, 15]
-        ]
+        expected_state = [0x0706050403020100, 0x0f0e0d0c0b0a0908]
         self.assertEqual(expected_state, kalyna._KalynaEncryptor._int_to_state(0x0f0e0d0c0b0a09080706050403020100, 2))
 
     def test_rotation_mask(self):
@@ -238,30 +408,12 @@ class KalynaEncryptorUtilityTest(unittest.TestCase):
     def test_in_to_state(self):
         algorithm = kalyna._KalynaEncryptor(128, _default_key_128())
         _in = b'\x10\x11\x12\x13\x14\x15\x16\x17\x18\x19\x1A\x1B\x1C\x1D\x1E\x1F'
-        expected_state = [
-            [0x10, 0x18],
-            [0x11, 0x19],
-            [0x12, 0x1A],
-            [0x13, 0x1B],
-            [0x14, 0x1C],
-            [0x15, 0x1D],
-            [0x16, 0x1E],
-            [0x17, 0x1F]
-        ]
+        expected_state = [0x1716151413121110, 0x1F1E1D1C1B1A1918]
         self.assertEqual(expected_state, algorithm._in_to_state(_in))
 
     def test_state_to_out(self):
         algorithm = kalyna._KalynaEncryptor(128, _default_key_128())
-        state = [
-            [0x10, 0x18],
-            [0x11, 0x19],
-            [0x12, 0x1A],
-            [0x13, 0x1B],
-            [0x14, 0x1C],
-            [0x15, 0x1D],
-            [0x16, 0x1E],
-            [0x17, 0x1F]
-        ]
+        state = [0x1716151413121110, 0x1F1E1D1C1B1A1918]
         expected_out = b'\x10\x11\x12\x13\x14\x15\x16\x17\x18\x19\x1A\x1B\x1C\x1D\x1E\x1F'
         self.assertEqual(expected_out, algorithm._state_to_out(state))
 
@@ -309,16 +461,14 @@ class KalynaEncryptorUtilityTest(unittest.TestCase):
         algorithm = kalyna._KalynaEncryptor(128, _default_key_128())
         _in = b'\x9A\x2B\x1E\xAC\x76\xEE\x89\x1B\x91\x4A\xCF\x17\x7C\x98\xDD\x3D'
         _expected_out = b'\x9A\x2B\x1E\xAC\x7C\x98\xDD\x3D\x91\x4A\xCF\x17\x76\xEE\x89\x1B'
-        state = algorithm._in_to_state(_in)
-        algorithm._right_circular_shift(state)
+        state = _shift_rows(algorithm, algorithm._in_to_state(_in))
         self.assertEqual(_expected_out, algorithm._state_to_out(state))
 
     def test_left_circular_shift(self):
         algorithm = kalyna._KalynaEncryptor(128, _default_key_128())
         _in = b'\x9A\x2B\x1E\xAC\x7C\x98\xDD\x3D\x91\x4A\xCF\x17\x76\xEE\x89\x1B'
         _expected_out = b'\x9A\x2B\x1E\xAC\x76\xEE\x89\x1B\x91\x4A\xCF\x17\x7C\x98\xDD\x3D'
-        state = algorithm._in_to_state(_in)
-        algorithm._left_circular_shift(state)
+        state = _inv_shift_rows(algorithm, algorithm._in_to_state(_in))
         self.assertEqual(_expected_out, algorithm._state_to_out(state))
 
     def test_linear_transformation_over_finite_field(self):
@@ -333,8 +483,7 @@ class KalynaEncryptorUtilityTest(unittest.TestCase):
 
     def helper_test_linear_transformation_over_finite_field(self, _in: bytes, expected_out: bytes):
         algorithm = kalyna._KalynaEncryptor(128, _default_key_128())
-        state = algorithm._in_to_state(_in)
-        algorithm._linear_transformation_over_finite_field(state)
+        state = _mix_columns(algorithm, algorithm._in_to_state(_in))
         out = algorithm._state_to_out(state)
         self.assertEqual(expected_out, out)
 
@@ -350,63 +499,41 @@ class KalynaEncryptorUtilityTest(unittest.TestCase):
 
     def helper_test_inverse_linear_transformation_over_finite_field(self, _in: bytes, expected_out: bytes):
         algorithm = kalyna._KalynaEncryptor(128, _default_key_128())
-        state = algorithm._in_to_state(_in)
-        algorithm._inv_linear_transformation_over_finite_field(state)
+        state = _inv_mix_columns(algorithm, algorithm._in_to_state(_in))
         out = algorithm._state_to_out(state)
         self.assertEqual(expected_out, out)
 
-    def test_state_indices(self):
-        state = [[0, 0] for _ in range(8)]
-        self.assertEqual((0, 0), kalyna._KalynaEncryptor._state_indices(state, 0, 0))
-        self.assertEqual((0, 1), kalyna._KalynaEncryptor._state_indices(state, 1, 0))
-        self.assertEqual((1, 0), kalyna._KalynaEncryptor._state_indices(state, 2, 0))
-        self.assertEqual((1, 1), kalyna._KalynaEncryptor._state_indices(state, 3, 0))
-        self.assertEqual((2, 0), kalyna._KalynaEncryptor._state_indices(state, 4, 0))
-        self.assertEqual((2, 1), kalyna._KalynaEncryptor._state_indices(state, 5, 0))
-        self.assertEqual((3, 0), kalyna._KalynaEncryptor._state_indices(state, 6, 0))
-        self.assertEqual((3, 1), kalyna._KalynaEncryptor._state_indices(state, 7, 0))
-        self.assertEqual((4, 0), kalyna._KalynaEncryptor._state_indices(state, 0, 1))
-        self.assertEqual((4, 1), kalyna._KalynaEncryptor._state_indices(state, 1, 1))
-        self.assertEqual((5, 0), kalyna._KalynaEncryptor._state_indices(state, 2, 1))
-        self.assertEqual((5, 1), kalyna._KalynaEncryptor._state_indices(state, 3, 1))
-        self.assertEqual((6, 0), kalyna._KalynaEncryptor._state_indices(state, 4, 1))
-        self.assertEqual((6, 1), kalyna._KalynaEncryptor._state_indices(state, 5, 1))
-        self.assertEqual((7, 0), kalyna._KalynaEncryptor._state_indices(state, 6, 1))
-        self.assertEqual((7, 1), kalyna._KalynaEncryptor._state_indices(state, 7, 1))
-
     def test_non_linear_bijective_mapping(self):
         algorithm = kalyna._KalynaEncryptor(128, _default_key_128())
         _in = b'\x26\x61\x70\x7E\xAF\x4F\xC7\xFD\x9E\x74\x91\xF7\xFC\x9F\xBE\x13'
         _expected_out = b'\x9A\x2B\x1E\xAC\x76\xEE\x89\x1B\x91\x4A\xCF\x17\x7C\x98\xDD\x3D'
-        state = algorithm._in_to_state(_in)
-        algorithm._non_linear_bijective_mapping(state)
+        state = _sub_bytes(algorithm, algorithm._in_to_state(_in))
         self.assertEqual(_expected_out, algorithm._state_to_out(state))
 
     def test_inv_non_linear_bijective_mapping(self):
         algorithm = kalyna._KalynaEncryptor(128, _default_key_128())
         _in = b'\x9A\x2B\x1E\xAC\x76\xEE\x89\x1B\x91\x4A\xCF\x17\x7C\x98\xDD\x3D'
         _expected_out = b'\x26\x61\x70\x7E\xAF\x4F\xC7\xFD\x9E\x74\x91\xF7\xFC\x9F\xBE\x13'
-        state = algorithm._in_to_state(_in)
-        algorithm._inv_non_linear_bijective_mapping(state)
+        state = _inv_sub_bytes(algorithm, algorithm._in_to_state(_in))
         self.assertEqual(_expected_out, algorithm._state_to_out(state))
 
-    def test_add_round_key_modulo_2(self):
-        self.helper_test_add_round_key_modulo_2(
+    def test_xor_round_key_modulo_2_64(self):
+        self.helper_test_xor_round_key_modulo_2_64(
             b'\x16\xCE\xDE\xE8\xD9\x99\x0F\x9E\x25\xB5\x06\xF0\x42\xD3\xB3\x05',
             b'\xE6\x86\x5B\x77\xDC\xE0\x82\xA0\xF4\x16\x50\x5E\x6B\x9B\x3A\xB1',
             b'\xF0\x48\x85\x9F\x05\x79\x8D\x3E\xD1\xA3\x56\xAE\x29\x48\x89\xB4'
         )
-        self.helper_test_add_round_key_modulo_2(
+        self.helper_test_xor_round_key_modulo_2_64(
             b'\x17\xaf\x69\xba\x9a\x05\x47\xeb\x25\x9b\xc2\x3a\x88\x13\xbd\xb0',
             b'\x24\x79\xf9\x50\xb5\x21\x87\xe2\xae\x8b\xd6\x5c\xcc\x74\x52\xd0',
             b'\x33\xd6\x90\xea\x2f\x24\xc0\x09\x8b\x10\x14\x66\x44\x67\xef\x60'
         )
 
-    def helper_test_add_round_key_modulo_2(self, state_bytes: bytes, key_bytes: bytes, expected_out: bytes):
+    def helper_test_xor_round_key_modulo_2_64(self, state_bytes: bytes, key_bytes: bytes, expected_out: bytes):
         algorithm = kalyna._KalynaEncryptor(128, _default_key_128())
         state = algorithm._in_to_state(state_bytes)
         key = algorithm._in_to_state(key_bytes)
-        algorithm._add_round_key_modulo_2(state, key)
+        algorithm._xor_round_key_modulo_2_64(state, key)
         self.assertEqual(expected_out, algorithm._state_to_out(state))
 
 
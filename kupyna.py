@@ -1,5 +1,7 @@
 from typing import List
 
+import galois
+
 _BITS_IN_BYTE = 8
 _ROWS = 8
 _BYTES_64 = 8
@@ -205,28 +207,9 @@ class Kupyna:
                 state[j][i] = s_boxes[i % 4][state[j][i]]
 
     def _mix_columns(self, state: List[List[int]]):
-        result = [0] * _ROWS
+        multiply_matrix = galois.DSTU_FIELD.multiply_matrix
         for col in range(self._c):
-            for row in reversed(range(8)):
-                product = 0
-                for b in reversed(range(8)):
-                    product ^= Kupyna._galois_multiplication(state[col][b], Kupyna.mds_matrix[row][b])
-                result[row] = product
-            for i in range(_ROWS):
-                state[col][i] = result[i]
-
-    @staticmethod
-    def _galois_multiplication(x: int, y: int):
-        r = 0
-        for i in range(8):
-            if (y & 0x1) == 1:
-                r ^= x
-            hbit = x & 0x80
-            x <<= 1
-            if hbit == 0x80:
-                x ^= 0x011d
-            y >>= 1
-        return r
+            state[col] = multiply_matrix(Kupyna.mds_matrix, state[col])
 
     def _p(self, state: List[List[int]]):
         for i in range(self._t):
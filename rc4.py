@@ -1,5 +1,8 @@
+from itertools import islice
 from typing import List
 
+import xor
+
 
 class RC4:
     def __init__(self, key):
@@ -8,10 +11,15 @@ class RC4:
         self._encryptor = RC4._pseudo_random_generation_algorithm(self._S)
 
     def encrypt(self, text: bytes):
-        return bytes([byte ^ next(self._encryptor) for byte in text])
+        return xor.xor_bytes(text, bytes(islice(self._encryptor, len(text))))
 
     decrypt = encrypt
 
+    def encrypt_inplace(self, buffer) -> None:
+        xor.xor_keystream_into(buffer, self._encryptor)
+
+    decrypt_inplace = encrypt_inplace
+
     @staticmethod
     def _key_scheduling_algorithm(key) -> List[int]:
         keylength = len(key)
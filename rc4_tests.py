@@ -27,6 +27,20 @@ class RC4Test(unittest.TestCase):
             b'\x45\xA0\x1F\x64\x5F\xC3\x5B\x38\x35\x52\x54\x4B\x9B\xF5'
         )
 
+    def test_encrypt_inplace(self):
+        plaintext = bytes(i % 251 for i in range(10000))
+        expected = rc4.RC4(b'Key').encrypt(plaintext)
+
+        buffer = bytearray(plaintext)
+        rc4.RC4(b'Key').encrypt_inplace(buffer)
+        self.assertEqual(expected, bytes(buffer))
+
+        rc4.RC4(b'Key').decrypt_inplace(memoryview(buffer))
+        self.assertEqual(plaintext, bytes(buffer))
+
+        with self.assertRaises(AssertionError):
+            rc4.RC4(b'Key').encrypt_inplace(plaintext)
+
     def _helper_test_encrypt_decrypt(self,
                                      key: bytes,
                                      key_stream: bytes,
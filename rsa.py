@@ -3,6 +3,7 @@ import math
 import random
 import kupyna
 import sympy
+import xor
 
 from typing import List
 from miller_rabin import MillerRabin
@@ -208,7 +209,7 @@ class RSA_OAEP:
     @staticmethod
     def _xor(a: bytes, b: bytes) -> bytes:
         assert len(a) == len(b)
-        return bytes([b1 ^ b2 for b1, b2 in zip(a, b)])
+        return xor.xor_bytes(a, b)
 
 
 if __name__ == '__main__':
@@ -1,3 +1,8 @@
+from itertools import islice
+
+import xor
+
+
 class Salsa20:
     def __init__(self, key: bytes, nonce: bytes, block_counter: bytes, rounds: int) -> None:
         assert len(key) == 32
@@ -9,10 +14,15 @@ class Salsa20:
         self._encryptor = self._byte_generator(key, nonce, block_counter, rounds)
 
     def encrypt(self, text):
-        return bytes([byte ^ next(self._encryptor) for byte in text])
+        return xor.xor_bytes(text, bytes(islice(self._encryptor, len(text))))
 
     decrypt = encrypt
 
+    def encrypt_inplace(self, buffer) -> None:
+        xor.xor_keystream_into(buffer, self._encryptor)
+
+    decrypt_inplace = encrypt_inplace
+
     def _byte_generator(self, key: bytes, nonce: bytes, block_counter: bytes, rounds: int):
         kw = [self._byte_to_int_32(key[4 * i:4 * i + 4]) for i in range(8)]
         nw = [self._byte_to_int_32(nonce[4 * i:4 * i + 4]) for i in range(2)]
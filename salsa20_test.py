@@ -29,6 +29,21 @@ class Salsa20Test(unittest.TestCase):
             b'\xbe\xce\x70\x84\x35\x76\x77\xca\xfe'
         )
 
+    def test_encrypt_inplace(self):
+        plaintext = bytes(i % 251 for i in range(5000))
+        expected = self._salsa20().encrypt(plaintext)
+
+        buffer = bytearray(plaintext)
+        self._salsa20().encrypt_inplace(buffer)
+        self.assertEqual(expected, bytes(buffer))
+
+        self._salsa20().decrypt_inplace(memoryview(buffer))
+        self.assertEqual(plaintext, bytes(buffer))
+
+    @staticmethod
+    def _salsa20() -> salsa20.Salsa20:
+        return salsa20.Salsa20(_salsa20_key(), _salsa20_nonce(), _salsa20_block_counter(), _salsa20_rounds())
+
     def _helper_test_encrypt_decrypt(self,
                                      key: bytes,
                                      nonce: bytes,
@@ -0,0 +1,52 @@
+from itertools import islice
+from typing import Iterator, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_VECTORIZED_THRESHOLD = 1024
+_KEYSTREAM_CHUNK = 1 << 12
+
+_Buffer = Union[bytes, bytearray, memoryview]
+
+
+def xor_bytes(a: _Buffer, b: _Buffer) -> bytes:
+    a, b = _byte_view(a), _byte_view(b)
+    length = min(len(a), len(b))
+    if np is not None and length >= _VECTORIZED_THRESHOLD:
+        return np.bitwise_xor(_array(a, length), _array(b, length)).tobytes()
+    return _xor_int(a[:length], b[:length])
+
+
+def xor_into(target: _Buffer, source: _Buffer) -> None:
+    target, source = _byte_view(target), _byte_view(source)
+    assert not target.readonly
+    length = min(len(target), len(source))
+    if np is not None and length >= _VECTORIZED_THRESHOLD:
+        array = _array(target, length)
+        np.bitwise_xor(array, _array(source, length), out=array)
+    else:
+        target[:length] = _xor_int(target[:length], source[:length])
+
+
+def xor_keystream_into(target: _Buffer, keystream: Iterator[int]) -> None:
+    target = _byte_view(target)
+    assert not target.readonly
+    for i in range(0, len(target), _KEYSTREAM_CHUNK):
+        chunk = target[i:i + _KEYSTREAM_CHUNK]
+        xor_into(chunk, bytes(islice(keystream, len(chunk))))
+
+
+def _xor_int(a: _Buffer, b: _Buffer) -> bytes:
+    return (int.from_bytes(a, 'big') ^ int.from_bytes(b, 'big')).to_bytes(len(a), 'big')
+
+
+def _byte_view(buffer: _Buffer) -> memoryview:
+    view = memoryview(buffer)
+    return view if view.format == 'B' and view.ndim == 1 else view.cast('B')
+
+
+def _array(buffer: memoryview, length: int):
+    return np.frombuffer(buffer, dtype=np.uint8, count=length)
@@ -0,0 +1,59 @@
+import unittest
+from unittest import mock
+
+import xor
+
+
+class XorTest(unittest.TestCase):
+    _a = bytes((i * 17 + 3) % 256 for i in range(3000))
+    _b = bytes((i * 101 + 7) % 256 for i in range(3000))
+
+    def test_xor_bytes(self):
+        for length in (0, 1, 15, 16, 1023, 1024, 3000):
+            self.assertEqual(self._expected(length), xor.xor_bytes(self._a[:length], self._b[:length]))
+
+    def test_xor_bytes_truncates(self):
+        self.assertEqual(self._expected(10), xor.xor_bytes(self._a[:10], self._b))
+        self.assertEqual(self._expected(2000), xor.xor_bytes(memoryview(self._a), bytearray(self._b[:2000])))
+
+    def test_xor_into(self):
+        for length in (0, 1, 16, 1024, 3000):
+            target = bytearray(self._a[:length])
+            xor.xor_into(target, self._b[:length])
+            self.assertEqual(self._expected(length), bytes(target))
+
+            target = bytearray(self._a)
+            xor.xor_into(memoryview(target)[5:5 + length], memoryview(self._b)[:length])
+            self.assertEqual(self._a[:5] + self._expected_slice(5, length) + self._a[5 + length:], bytes(target))
+
+    def test_xor_into_readonly(self):
+        with self.assertRaises(AssertionError):
+            xor.xor_into(self._a, self._b)
+
+    def test_xor_keystream_into(self):
+        for length in (0, 1, 1000, 1001, 2500):
+            keystream = iter(self._b)
+            target = bytearray(self._a[:length])
+            with mock.patch.object(xor, '_KEYSTREAM_CHUNK', 1000):
+                xor.xor_keystream_into(target, keystream)
+            self.assertEqual(self._expected(length), bytes(target))
+            self.assertEqual(self._b[length], next(keystream))
+
+    def test_xor_keystream_into_readonly(self):
+        with self.assertRaises(AssertionError):
+            xor.xor_keystream_into(self._a, iter(self._b))
+
+    def test_int_backend(self):
+        with mock.patch.object(xor, 'np', None):
+            self.test_xor_bytes()
+            self.test_xor_into()
+
+    def _expected(self, length: int) -> bytes:
+        return bytes(x ^ y for x, y in zip(self._a[:length], self._b[:length]))
+
+    def _expected_slice(self, offset: int, length: int) -> bytes:
+        return bytes(x ^ y for x, y in zip(self._a[offset:offset + length], self._b[:length]))
+
+
+if __name__ == '__main__':
+    unittest.main()